@@ -0,0 +1,368 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Add parent directory to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+try:
+    from benchmarks.synthetic import TOPICS, channel_metadata, video_metadata
+    from utils.llm_backends import percentile
+except ImportError:
+    from benchmarks.synthetic import TOPICS, channel_metadata, video_metadata
+    from utils.llm_backends import percentile
+
+# Replies that normalize_category() cannot map to any category.
+MALFORMED_REPLIES = (
+    "",
+    "Sorry, I can't tell from the metadata.",
+    "Sports",
+    "Category: ???",
+    "Entertainment / vlog",
+)
+
+
+def parse_latency(spec):
+    """
+    Latency distribution from a short spec, in seconds:
+    "0.05" (fixed), "uniform:0.01:0.2", "exp:0.1" (mean),
+    "lognormal:0.2:0.8" (median, sigma; long tail).
+    """
+    spec = (spec or "0").strip()
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(":") if v]
+    if not args:
+        fixed = float(kind)
+        return lambda rng: fixed
+    if kind == "uniform":
+        low, high = values
+        return lambda rng: rng.uniform(low, high)
+    if kind == "exp":
+        mean = values[0]
+        return lambda rng: rng.expovariate(1 / mean) if mean > 0 else 0.0
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"Unknown latency spec '{spec}'")
+
+
+class Faults:
+    """
+    What a fake server does to each request: sleep for a latency drawn from
+    the distribution, answer 429 during bursts (burst_length requests out of
+    every burst_every), fail with a random 5xx at error_rate, and (LLM only)
+    reply with an unusable category at malformed_rate.
+    """
+
+    def __init__(self, latency="0", error_rate=0.0, burst_every=0, burst_length=0,
+                 retry_after=1, malformed_rate=0.0, seed=0):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def draw(self):
+        """(delay seconds, error status or None, malformed?) for the next request."""
+        with self._lock:
+            n = self._count
+            self._count += 1
+            delay = max(self.latency(self._rng), 0.0)
+            if self.burst_every and n % self.burst_every < self.burst_length:
+                return delay, 429, False
+            if self._rng.random() < self.error_rate:
+                return delay, self._rng.choice((500, 502, 503)), False
+            return delay, None, self._rng.random() < self.malformed_rate
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, faults):
+        super().__init__(address, handler)
+        self.faults = faults
+        self.lock = threading.Lock()
+        self.statuses = Counter()
+        self.latencies = []
+        self.started_at = time.perf_counter()
+        self.key_quota = 0
+        self.invalid_keys = set()
+        self.key_units = Counter()
+        self.weak_models = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, status, seconds):
+        with self.lock:
+            self.statuses[status] += 1
+            self.latencies.append(seconds)
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            statuses = dict(self.statuses)
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "requests": len(latencies),
+            "statuses": {str(k): v for k, v in sorted(statuses.items())},
+            "requests_per_second": len(latencies) / elapsed if elapsed > 0 else 0.0,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "latency_p99": percentile(latencies, 99),
+            "key_units": dict(self.key_units),
+        }
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real APIs (the openai backend reuses connections).
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_faults(self):
+        """Applies the configured faults; returns (start time, malformed?) or None if an error was sent."""
+        start = time.perf_counter()
+        delay, status, malformed = self.server.faults.draw()
+        if delay:
+            time.sleep(delay)
+        if status == 429:
+            retry_after = str(self.server.faults.retry_after)
+            self.send_json(429, {"error": {"message": "Rate limit reached", "code": 429}}, {"Retry-After": retry_after})
+        elif status:
+            self.send_json(status, {"error": {"message": "Injected server error", "code": status}})
+        if status:
+            self.server.record(status, time.perf_counter() - start)
+            return None
+        return start, malformed
+
+    def serve_stats(self):
+        if self.path.rstrip("/") == "/__stats":
+            self.send_json(200, self.server.stats())
+            return True
+        return False
+
+
+class FakeYouTubeHandler(FakeHandler):
+    """
+    GET /youtube/v3/videos and /youtube/v3/channels with synthetic metadata.
+    Keys in server.invalid_keys get 400 keyInvalid; a key that used up
+    server.key_quota units (0 = unlimited) gets 403 quotaExceeded.
+    """
+
+    def check_key(self, key):
+        """Sends the API's error for an unusable key; returns True if the request may proceed."""
+        server = self.server
+        if key in server.invalid_keys:
+            reason, status, message = "keyInvalid", 400, "API key not valid. Please pass a valid API key."
+        else:
+            with server.lock:
+                allowed = not server.key_quota or server.key_units[key] < server.key_quota
+                if allowed:
+                    server.key_units[key] += 1
+            if allowed:
+                return True
+            reason, status, message = "quotaExceeded", 403, "The request cannot be completed because you have exceeded your quota."
+        self.send_json(status, {"error": {"code": status, "message": message, "errors": [{"reason": reason}]}})
+        server.record(status, 0.0)
+        return False
+
+    def do_GET(self):
+        if self.serve_stats():
+            return
+        parsed = urlparse(self.path)
+        if not parsed.path.endswith(("/videos", "/channels")):
+            self.send_json(404, {"error": {"message": "Not found", "code": 404}})
+            return
+        query = parse_qs(parsed.query)
+        if not self.check_key(query.get("key", [""])[0]):
+            return
+        outcome = self.handle_faults()
+        if outcome is None:
+            return
+        start, _ = outcome
+        ids = [i for i in query.get("id", [""])[0].split(",") if i]
+        if parsed.path.endswith("/channels"):
+            items = [channel_metadata(cid) for cid in ids]
+        else:
+            items = [video_metadata(vid) for vid in ids]
+        self.send_json(200, {"items": [item for item in items if item]})
+        self.server.record(200, time.perf_counter() - start)
+
+
+def category_for_prompt(prompt):
+    """The synthetic topic whose keywords best match the prompt's title line."""
+    title = prompt.split("Title:", 1)[-1].split("\n", 1)[0].lower()
+    scores = {topic: sum(word in title for word in words) for topic, words in TOPICS.items()}
+    best = max(scores, key=scores.get)
+    return best if scores[best] else "Other"
+
+
+def weak_reply(prompt, category):
+    """A wrong or unusable reply, fixed per prompt so reruns see the same mistakes."""
+    h = zlib.crc32(prompt.encode("utf-8"))
+    if h % 2:
+        return MALFORMED_REPLIES[h % len(MALFORMED_REPLIES)]
+    others = [c for c in list(TOPICS) + ["Other"] if c != category]
+    return others[h % len(others)]
+
+
+class FakeLLMHandler(FakeHandler):
+    """
+    POST .../chat/completions in the OpenAI/Groq response format. Models in
+    server.weak_models get a wrong or unusable answer for that share of
+    prompts, to stand in for a small model in cascade mode.
+    """
+
+    def do_GET(self):
+        if not self.serve_stats():
+            self.send_json(404, {"error": {"message": "Not found", "code": 404}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": "Not found", "code": 404}})
+            return
+        outcome = self.handle_faults()
+        if outcome is None:
+            return
+        start, malformed = outcome
+        try:
+            request = json.loads(body or b"{}")
+            prompt = request["messages"][-1]["content"]
+        except (ValueError, KeyError, IndexError):
+            self.send_json(400, {"error": {"message": "Invalid request", "code": 400}})
+            self.server.record(400, time.perf_counter() - start)
+            return
+        if malformed:
+            content = MALFORMED_REPLIES[len(prompt) % len(MALFORMED_REPLIES)]
+        else:
+            content = category_for_prompt(prompt)
+            weak_rate = self.server.weak_models.get(request.get("model"))
+            if weak_rate and zlib.crc32(prompt.encode("utf-8")) % 1000 < weak_rate * 1000:
+                content = weak_reply(prompt, content)
+        self.send_json(200, {
+            "id": f"chatcmpl-fake-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 2, "total_tokens": len(prompt) // 4 + 2},
+        })
+        self.server.record(200, time.perf_counter() - start)
+
+
+def start_youtube(port=0, faults=None, host="127.0.0.1", key_quota=0, invalid_keys=()):
+    server = FakeServer((host, port), FakeYouTubeHandler, faults or Faults())
+    server.key_quota = key_quota
+    server.invalid_keys = set(invalid_keys)
+    return server.start()
+
+
+def start_llm(port=0, faults=None, host="127.0.0.1", weak_models=None):
+    server = FakeServer((host, port), FakeLLMHandler, faults or Faults())
+    server.weak_models = dict(weak_models or {})
+    return server.start()
+
+
+def add_fault_arguments(parser, prefix, llm=False):
+    """--<prefix>-latency, -error-rate, -burst-every, -burst-length, -retry-after (and -malformed-rate)."""
+    parser.add_argument(f"--{prefix}-latency", default="0", help="Latency spec, e.g. 0.05, exp:0.1, lognormal:0.2:0.8")
+    parser.add_argument(f"--{prefix}-error-rate", type=float, default=0.0, help="Share of requests failing with 5xx")
+    parser.add_argument(f"--{prefix}-burst-every", type=int, default=0, help="Start a 429 burst every N requests")
+    parser.add_argument(f"--{prefix}-burst-length", type=int, default=0, help="Requests per 429 burst")
+    parser.add_argument(f"--{prefix}-retry-after", type=float, default=1, help="Retry-After seconds sent with 429s")
+    if llm:
+        parser.add_argument(f"--{prefix}-malformed-rate", type=float, default=0.0, help="Share of unusable category replies")
+        parser.add_argument(f"--{prefix}-weak-model", help="Model name that answers wrongly at --llm-weak-error-rate")
+        parser.add_argument(f"--{prefix}-weak-error-rate", type=float, default=0.2, help="Share of wrong or unusable replies from the weak model")
+    else:
+        parser.add_argument(f"--{prefix}-key-quota", type=int, default=0, help="Units per API key before 403 quotaExceeded (0 = unlimited)")
+
+
+def faults_from_args(args, prefix, seed=0):
+    key = prefix.replace("-", "_")
+    return Faults(
+        latency=getattr(args, f"{key}_latency"),
+        error_rate=getattr(args, f"{key}_error_rate"),
+        burst_every=getattr(args, f"{key}_burst_every"),
+        burst_length=getattr(args, f"{key}_burst_length"),
+        retry_after=getattr(args, f"{key}_retry_after"),
+        malformed_rate=getattr(args, f"{key}_malformed_rate", 0.0),
+        seed=seed,
+    )
+
+
+def weak_models_from_args(args):
+    return {args.llm_weak_model: args.llm_weak_error_rate} if args.llm_weak_model else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-ins for the YouTube Data API and Groq chat completions.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--youtube-port", type=int, default=8901)
+    parser.add_argument("--llm-port", type=int, default=8902)
+    parser.add_argument("--seed", type=int, default=0)
+    add_fault_arguments(parser, "youtube")
+    add_fault_arguments(parser, "llm", llm=True)
+    args = parser.parse_args()
+
+    youtube = start_youtube(
+        args.youtube_port, faults_from_args(args, "youtube", args.seed), args.host, key_quota=args.youtube_key_quota
+    )
+    llm = start_llm(
+        args.llm_port, faults_from_args(args, "llm", args.seed + 1), args.host, weak_models=weak_models_from_args(args)
+    )
+    print("Fake servers running. Point the pipeline at them with:")
+    print(f"  export YOUTUBE_API_BASE_URL={youtube.url}/youtube/v3")
+    print(f"  export GROQ_BASE_URL={llm.url}            # LLM_BACKEND=groq")
+    print(f"  export LLM_BASE_URL={llm.url}/openai/v1   # LLM_BACKEND=openai")
+    print(f"Stats: {youtube.url}/__stats and {llm.url}/__stats. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    for server in (youtube, llm):
+        server.shutdown()
+    print(json.dumps({"youtube": youtube.stats(), "llm": llm.stats()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
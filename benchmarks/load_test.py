@@ -0,0 +1,213 @@
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+try:
+    from benchmarks.fake_servers import (
+        add_fault_arguments, faults_from_args, start_llm, start_youtube, weak_models_from_args,
+    )
+    from benchmarks.synthetic import write_history
+except ImportError:
+    from benchmarks.fake_servers import (
+        add_fault_arguments, faults_from_args, start_llm, start_youtube, weak_models_from_args,
+    )
+    from benchmarks.synthetic import write_history
+
+# Client-side counters worth comparing between runs.
+REPORTED_COUNTERS = (
+    "rows_in",
+    "api_calls",
+    "retries",
+    "api_errors",
+    "rate_limit_waits",
+    "rate_limit_wait_seconds",
+    "key_failovers",
+    "invalid_responses",
+    "videos_missing",
+    "labeled_by_llm_small",
+    "labeled_by_llm",
+    "cascade_escalations",
+    "llm_small_requests",
+    "llm_small_latency_p50",
+    "llm_small_latency_p95",
+    "llm_errors",
+    "llm_throughput_rps",
+    "llm_latency_p50",
+    "llm_latency_p95",
+    "llm_latency_p99",
+)
+
+
+def run_script(script, workdir, env, log):
+    """Runs a pipeline script as the pipeline would; returns (wall seconds, exit code)."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, os.path.join(PROJECT_ROOT, script)],
+        cwd=workdir,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    return time.perf_counter() - start, result.returncode
+
+
+def read_step_metrics(metrics_dir, step):
+    path = os.path.join(metrics_dir, f"{step}.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("counters", {})
+
+
+def api_keys(args):
+    """--api-keys working keys, then --invalid-api-keys keys the fake server rejects."""
+    return (
+        [f"load-test-{i}" for i in range(1, args.api_keys + 1)]
+        + [f"invalid-{i}" for i in range(1, args.invalid_api_keys + 1)]
+    )
+
+
+def pipeline_env(workdir, youtube, llm, args):
+    """
+    Environment for the pipeline scripts. The fake-server settings are also
+    written to <workdir>/.env, which load_env() applies after the project
+    .env, so a real key or endpoint there cannot leak into the load test.
+    """
+    env = dict(os.environ)
+    env.pop("SHARED_CACHE_PATH", None)
+    overrides = {
+        "YOU_TUBE_API_KEY": "",
+        "YOU_TUBE_API_KEYS": ",".join(api_keys(args)),
+        "YOUTUBE_API_BASE_URL": f"{youtube.url}/youtube/v3",
+        "YOUTUBE_QUOTA_LEDGER": os.path.join(workdir, "data", "youtube_quota.json"),
+        "YOUTUBE_QUOTA_CEILING": str(10 ** 9),
+        # With --youtube-key-quota every key can run dry; stop instead of waiting for the reset.
+        "YOUTUBE_QUOTA_ON_CEILING": "stop",
+        "LLM_CONCURRENCY": str(args.llm_concurrency),
+        "LLM_CASCADE_MODEL": args.cascade_model,
+        "LOCAL_CLASSIFIER": "off",
+        "KEYWORD_RULES": "off",
+        "NEAR_DUPLICATE_THRESHOLD": "off",
+        "WAREHOUSE_PATH": os.path.join("data", "warehouse.sqlite"),
+    }
+    # The real Groq SDK when it is installed, otherwise the same endpoint through the openai backend.
+    backend = args.llm_backend
+    if backend == "auto":
+        backend = "groq" if importlib.util.find_spec("groq") else "openai"
+    if backend == "groq":
+        overrides.update({"LLM_BACKEND": "groq", "GROQ_API_KEY": "load-test", "GROQ_BASE_URL": llm.url})
+    else:
+        overrides.update({
+            "LLM_BACKEND": "openai",
+            "LLM_BASE_URL": f"{llm.url}/openai/v1",
+            "LLM_MODEL": "fake-model",
+            "LLM_API_KEY": "load-test",
+        })
+    with open(os.path.join(workdir, ".env"), "w", encoding="utf-8") as f:
+        f.writelines(f"{key}={value}\n" for key, value in overrides.items())
+    env.update(overrides)
+    env["PIPELINE_METRICS_DIR"] = os.path.join(workdir, "metrics")
+    return env, backend
+
+
+def print_report(report):
+    print(f"\nLoad test: {report['rows']} history rows, LLM backend {report['llm_backend']}")
+    for step in report["steps"]:
+        rows = step["counters"].get("rows_in", 0)
+        rate = rows / step["wall_seconds"] if step["wall_seconds"] else 0.0
+        print(f"\n{step['name']}: {step['wall_seconds']:.2f}s, {rate:.1f} rows/s, exit {step['exit_code']}")
+        for name in REPORTED_COUNTERS:
+            if name in step["counters"] and name != "rows_in":
+                value = step["counters"][name]
+                print(f"  {name}: {value:.3f}" if isinstance(value, float) else f"  {name}: {value}")
+    for name, stats in report["servers"].items():
+        print(
+            f"\n{name} server: {stats['requests']} requests ({stats['requests_per_second']:.1f}/s), "
+            f"statuses {stats['statuses']}, latency p50 {stats['latency_p50'] * 1000:.0f}ms "
+            f"p95 {stats['latency_p95'] * 1000:.0f}ms p99 {stats['latency_p99'] * 1000:.0f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the real Steps 4 and 5 against local fake YouTube and LLM servers."
+    )
+    parser.add_argument("--rows", type=int, default=2000, help="Synthetic history rows to generate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--llm-backend", choices=("auto", "groq", "openai"), default="auto")
+    parser.add_argument("--cascade-model", default="", help="Small first-tier model for Step 5 (LLM_CASCADE_MODEL)")
+    parser.add_argument("--api-keys", type=int, default=1, help="YouTube API keys in the pool (YOU_TUBE_API_KEYS)")
+    parser.add_argument("--invalid-api-keys", type=int, default=0, help="Extra pool keys the fake server rejects")
+    parser.add_argument("--stream", action="store_true", help="Run Steps 4 and 5 overlapped (steps/04_05_stream.py)")
+    parser.add_argument("--output", help="Also write the report as JSON to this path")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory (data, logs, metrics)")
+    add_fault_arguments(parser, "youtube")
+    add_fault_arguments(parser, "llm", llm=True)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="yt_load_")
+    youtube = start_youtube(
+        faults=faults_from_args(args, "youtube", args.seed),
+        key_quota=args.youtube_key_quota,
+        invalid_keys=[key for key in api_keys(args) if key.startswith("invalid-")],
+    )
+    llm = start_llm(faults=faults_from_args(args, "llm", args.seed + 1), weak_models=weak_models_from_args(args))
+    env, backend = pipeline_env(workdir, youtube, llm, args)
+    report = {"rows": args.rows, "llm_backend": backend, "stream": args.stream, "steps": [], "servers": {}}
+
+    try:
+        print(f"Generating {args.rows} synthetic history rows in {workdir}...")
+        write_history(os.path.join(workdir, "data", "01_raw_history.csv"), args.rows, seed=args.seed)
+        scripts = ["steps/02_extract_ids.py", "steps/03_deduplicate.py"]
+        if args.stream:
+            scripts.append("steps/04_05_stream.py")
+        else:
+            scripts += ["steps/04_enrich_metadata.py", "steps/05_video_categorizer.py"]
+
+        log_path = os.path.join(workdir, "pipeline.log")
+        with open(log_path, "w", encoding="utf-8") as log:
+            for script in scripts:
+                print(f"Running {script}...")
+                wall, code = run_script(script, workdir, env, log)
+                name = os.path.splitext(os.path.basename(script))[0]
+                parts = ["04_enrich_metadata", "05_video_categorizer"] if args.stream and name == "04_05_stream" else [name]
+                for part in parts:
+                    if part.startswith(("02", "03")):
+                        continue
+                    report["steps"].append({
+                        "name": part if len(parts) == 1 else f"{part} (streamed)",
+                        "wall_seconds": wall,
+                        "exit_code": code,
+                        "counters": read_step_metrics(env["PIPELINE_METRICS_DIR"], part),
+                    })
+                if code:
+                    print(f"{script} failed with exit code {code}; see {log_path}")
+                    break
+        report["servers"] = {"YouTube": youtube.stats(), "LLM": llm.stats()}
+    finally:
+        youtube.shutdown()
+        llm.shutdown()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport saved to {args.output}")
+    if args.keep:
+        print(f"Work directory kept at {workdir}")
+
+
+if __name__ == "__main__":
+    main()
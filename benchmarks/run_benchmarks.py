@@ -0,0 +1,246 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+# Add parent directory to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+try:
+    from benchmarks.synthetic import channel_metadata, video_category, video_metadata, write_history
+    from utils.llm_backends import LLMBackend
+    from utils.step_loader import load_step
+except ImportError:
+    from benchmarks.synthetic import channel_metadata, video_category, video_metadata, write_history
+    from utils.llm_backends import LLMBackend
+    from utils.step_loader import load_step
+
+STEPS = {
+    "2": ("02_extract_ids", "01_raw_history.csv"),
+    "3": ("03_deduplicate", "02_video_ids.csv"),
+    "4": ("04_enrich_metadata", "03_unique_ids.csv"),
+    "5": ("05_video_categorizer", "04_enriched.csv"),
+    "6": ("06_visualize", "05_categorized.csv"),
+}
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+
+class FakeVideosResponse(io.BytesIO):
+    headers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeVideosAPI:
+    """
+    Stands in for urllib's urlopen against the YouTube Data API (`videos` and
+    `channels`). Video metadata is generated up front so the timed step only
+    pays for parsing the responses.
+    """
+
+    def __init__(self, video_ids):
+        self.items = {vid: video_metadata(vid) for vid in video_ids}
+
+    def __call__(self, request, *args, **kwargs):
+        from urllib.parse import parse_qs, urlparse
+
+        url = request.full_url if hasattr(request, "full_url") else request
+        parsed = urlparse(url)
+        ids = parse_qs(parsed.query).get("id", [""])[0].split(",")
+        if parsed.path.endswith("/channels"):
+            items = [channel_metadata(cid) for cid in ids]
+            payload = {"items": [item for item in items if item]}
+        else:
+            payload = {"items": [self.items[vid] for vid in ids if vid in self.items]}
+        return FakeVideosResponse(json.dumps(payload).encode("utf-8"))
+
+
+def read_column(path, column):
+    import csv
+
+    with open(path, "r", encoding="utf-8") as f:
+        return [row[column] for row in csv.DictReader(f)]
+
+
+class FakeLLMBackend(LLMBackend):
+    """Answers with the synthetic ground-truth category, without network."""
+
+    name = "fake"
+
+    def __init__(self):
+        super().__init__("synthetic")
+        self._video_by_title = {}
+
+    def _send(self, prompt, max_tokens, temperature, top_p):
+        title = prompt.split("Title: ", 1)[1].split("\n", 1)[0]
+        return self._video_by_title.get(title, "Other")
+
+
+def count_rows(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def run_child(step_key, workdir):
+    """Runs one step in this process with network mocked and prints a JSON result line."""
+    module_name, input_name = STEPS[step_key]
+    os.chdir(workdir)
+    os.environ.setdefault("YOU_TUBE_API_KEY", "benchmark")
+    os.environ["LOCAL_CLASSIFIER"] = "off"
+    rows_in = count_rows(os.path.join("data", input_name))
+
+    patches = [mock.patch("time.sleep", lambda *_: None)]
+    try:
+        step = load_step(module_name)
+        if hasattr(step, "load_dependencies"):
+            step.load_dependencies()
+    except ImportError as e:
+        print(json.dumps({"status": "skipped", "reason": str(e), "rows_in": rows_in}))
+        return
+
+    input_path = os.path.join("data", input_name)
+    if step_key == "4":
+        patches.append(mock.patch("urllib.request.urlopen", FakeVideosAPI(read_column(input_path, "VideoID"))))
+    if step_key == "5":
+        backend = FakeLLMBackend()
+        titles = read_column(input_path, "Title")
+        for title, vid in zip(titles, read_column(input_path, "VideoID")):
+            backend._video_by_title[title] = video_category(vid)
+        patches.append(mock.patch.object(step, "setup_llm_backend", lambda: backend))
+
+    entry = getattr(step, "main", None) or getattr(step, "scrape_history")
+    with contextlib.ExitStack() as stack:
+        for patch in patches:
+            stack.enter_context(patch)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            entry()
+            wall = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024
+    print(json.dumps({
+        "status": "ok",
+        "rows_in": rows_in,
+        "wall_seconds": wall,
+        "peak_rss_mb": peak_kb / 1024,
+    }))
+
+
+def run_step_subprocess(step_key, workdir):
+    # A fresh interpreter per step keeps peak RSS attributable to that step.
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", step_key, "--workdir", workdir],
+        capture_output=True,
+        text=True,
+    )
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        return {"status": "failed", "error": (proc.stderr or proc.stdout)[-500:]}
+    return json.loads(lines[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["rows"], r["step"]): r for r in baseline["results"] if r.get("status") == "ok"}
+    print(f"\nComparison against {baseline.get('commit')} ({baseline_path}):")
+    for r in results:
+        old = previous.get((r["rows"], r["step"]))
+        if not old or r.get("status") != "ok":
+            continue
+        delta = (r["wall_seconds"] - old["wall_seconds"]) / old["wall_seconds"] * 100 if old["wall_seconds"] else 0
+        mem = r["peak_rss_mb"] - old["peak_rss_mb"]
+        print(f"  step {r['step']} @ {r['rows']:>8} rows: wall {delta:+6.1f}%  peak RSS {mem:+8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for pipeline steps 2-6 on synthetic history.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES, help="History sizes (1000 to 1000000)")
+    parser.add_argument("--steps", default="2,3,4,5,6", help="Comma-separated step numbers")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/<commit>_<time>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to diff against")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directories")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.workdir)
+        return 0
+
+    step_keys = [s.strip() for s in args.steps.split(",") if s.strip()]
+    results = []
+    for rows in args.rows:
+        workdir = tempfile.mkdtemp(prefix=f"yt_bench_{rows}_")
+        print(f"\nGenerating {rows} synthetic history rows in {workdir}...")
+        write_history(os.path.join(workdir, "data", "01_raw_history.csv"), rows, seed=args.seed)
+
+        for key in step_keys:
+            result = run_step_subprocess(key, workdir)
+            result.update({"rows": rows, "step": key, "name": STEPS[key][0]})
+            if result.get("status") == "ok":
+                result["rows_per_second"] = result["rows_in"] / result["wall_seconds"] if result["wall_seconds"] else 0.0
+                print(
+                    f"  step {key}: {result['wall_seconds']:8.3f}s  {result['rows_per_second']:>12,.0f} rows/s  "
+                    f"peak RSS {result['peak_rss_mb']:.1f} MB"
+                )
+            else:
+                print(f"  step {key}: {result['status']} {result.get('reason') or result.get('error', '')}")
+            results.append(result)
+
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"{commit}_{datetime.datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
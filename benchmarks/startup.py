@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(PROJECT_ROOT, "benchmarks", "startup_budget.json")
+
+# Entry points, each started with --help: that path imports everything the
+# script imports at module level and nothing else.
+ENTRY_POINTS = [
+    "main.py",
+    "daemon.py",
+    "steps/01_scrape_history.py",
+    "steps/02_extract_ids.py",
+    "steps/03_deduplicate.py",
+    "steps/04_enrich_metadata.py",
+    "steps/05_video_categorizer.py",
+    "steps/04_05_stream.py",
+    "steps/06_visualize.py",
+    "tools/query.py",
+    "tools/train_classifier.py",
+    "tools/check_prompt_compaction.py",
+    "tools/evaluate_cascade.py",
+]
+
+# --update-budget sets each budget to the measured time times this, plus
+# BUDGET_SLACK_MS, so machine noise does not fail the check.
+BUDGET_HEADROOM = 2
+BUDGET_SLACK_MS = 15
+
+
+def import_profile(args):
+    """
+    Starts a fresh interpreter with -X importtime; returns (total import ms,
+    imported module names, exit code). Totals sum the top-level entries, so
+    nested imports are counted once.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2]
+        modules.add(name.strip())
+        if not name.startswith("  "):
+            total_us += int(parts[1])
+    return total_us / 1000, modules, result.returncode
+
+
+def measure(args, runs):
+    times = []
+    modules = set()
+    code = 0
+    for _ in range(runs):
+        total, modules, code = import_profile(args)
+        times.append(total)
+    # The fastest run is the least disturbed by other load on the machine.
+    return min(times), modules, code
+
+
+def load_budget():
+    if not os.path.exists(BUDGET_FILE):
+        return {"budget_ms": {}, "heavy_modules": []}
+    with open(BUDGET_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure each entry point's cold import time (with --help) against the startup budget."
+    )
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters per entry point (the fastest counts)")
+    parser.add_argument("--update-budget", action="store_true", help=f"Rewrite {os.path.relpath(BUDGET_FILE, PROJECT_ROOT)} from this run")
+    parser.add_argument("--output", help="Also write the measurements as JSON to this path")
+    args = parser.parse_args()
+
+    budget = load_budget()
+    heavy = set(budget.get("heavy_modules", []))
+    # Interpreter startup imports (encodings, site, ...) are not the scripts' cost.
+    baseline, baseline_modules, _ = measure(["-c", "pass"], args.runs)
+    print(f"Interpreter baseline: {baseline:.1f} ms of imports")
+
+    results = {}
+    failures = []
+    for script in ENTRY_POINTS:
+        total, modules, code = measure([script, "--help"], args.runs)
+        elapsed = max(total - baseline, 0.0)
+        heavy_loaded = sorted(
+            name for name in modules - baseline_modules if name.split(".")[0] in heavy
+        )
+        limit = budget["budget_ms"].get(script)
+        results[script] = {"import_ms": round(elapsed, 1), "budget_ms": limit, "heavy_modules": heavy_loaded}
+
+        status = "ok"
+        if code != 0:
+            status = f"FAILED (exit {code})"
+        elif heavy_loaded:
+            status = f"FAILED (imports {', '.join(sorted({n.split('.')[0] for n in heavy_loaded}))})"
+        elif limit is not None and elapsed > limit and not args.update_budget:
+            status = "OVER BUDGET"
+        if status != "ok":
+            failures.append(script)
+        budget_text = f"budget {limit:.0f} ms" if limit is not None else "no budget"
+        print(f"  {script:36s} {elapsed:7.1f} ms  ({budget_text})  {status}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"baseline_ms": round(baseline, 1), "entry_points": results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.update_budget:
+        budget["budget_ms"] = {
+            script: round(result["import_ms"] * BUDGET_HEADROOM + BUDGET_SLACK_MS)
+            for script, result in results.items()
+        }
+        with open(BUDGET_FILE, "w", encoding="utf-8") as f:
+            json.dump(budget, f, indent=2)
+            f.write("\n")
+        print(f"Budget updated in {BUDGET_FILE}")
+
+    if failures:
+        print(f"\nStartup budget check failed for: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import csv
+import datetime
+import hashlib
+import os
+import random
+
+# Valid YouTube IDs are 11 base64url chars; the last one only carries 4 bits.
+ID_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+ID_LAST_CHARS = "AEIMQUYcgkosw048"
+
+TOPICS = {
+    "AI and coding": ("gpt", "python", "llm", "agent", "cursor", "coding", "openai", "rust", "prompt"),
+    "F1": ("grand prix", "verstappen", "qualifying", "pit stop", "ferrari", "monaco", "onboard"),
+    "Football": ("premier league", "goal", "arsenal", "messi", "transfer", "highlights", "derby"),
+    "Basketball": ("nba", "lebron", "dunk", "playoffs", "lakers", "buzzer beater"),
+    "News": ("breaking", "election", "report", "interview", "sanctions", "economy"),
+    "Humor": ("stand-up", "prank", "sketch", "roast", "funny moments"),
+    "Popular Science": ("physics", "space", "black hole", "biology", "experiment"),
+    "History": ("ancient rome", "ww2", "empire", "medieval", "documentary"),
+    "Superheroes": ("marvel", "batman", "avengers", "spider-man", "trailer breakdown"),
+    "Other": ("vlog", "travel", "cooking", "review", "unboxing", "workout"),
+}
+
+# (language code, share of channels); roughly what our own histories look like.
+LANGUAGES = (("en", 0.55), ("ru", 0.33), ("de", 0.04), ("es", 0.04), ("", 0.04))
+
+BOILERPLATE = (
+    "Subscribe for more videos! https://www.youtube.com/@channel?sub_confirmation=1 "
+    "Follow me on Instagram https://instagram.com/someone and Twitter https://twitter.com/someone. "
+    "Sponsored by NordVPN, use code SAVE20 at https://nordvpn.com/offer. "
+    "Business inquiries: contact@example.com "
+)
+
+
+def make_video_id(rng):
+    return "".join(rng.choice(ID_ALPHABET) for _ in range(10)) + rng.choice(ID_LAST_CHARS)
+
+
+def _seeded(*parts):
+    digest = hashlib.md5("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def build_channels(count=2000, seed=7):
+    """Channel pool with a topic and language each."""
+    rng = random.Random(seed)
+    weights = [share for _, share in LANGUAGES]
+    channels = []
+    for i in range(count):
+        topic = rng.choice(list(TOPICS))
+        language = rng.choices([code for code, _ in LANGUAGES], weights=weights)[0]
+        channels.append({
+            "name": f"{topic.split()[0]} Channel {i}",
+            "id": "UC" + "".join(rng.choice(ID_ALPHABET) for _ in range(22)),
+            "topic": topic,
+            "language": language,
+        })
+    return channels
+
+
+CHANNELS = build_channels()
+# Zipf-like popularity: a few channels dominate a history, with a long tail.
+CHANNEL_WEIGHTS = [1 / (rank + 1) ** 1.1 for rank in range(len(CHANNELS))]
+
+
+def _iso_duration(seconds):
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    out = "PT"
+    if h:
+        out += f"{h}H"
+    if m:
+        out += f"{m}M"
+    if s or out == "PT":
+        out += f"{s}S"
+    return out
+
+
+def video_metadata(video_id):
+    """
+    Deterministic fake YouTube Data API `videos` item for a VideoID, so every
+    run (and every mock server) returns the same metadata.
+    """
+    rng = _seeded("video", video_id)
+    channel = rng.choices(CHANNELS, weights=CHANNEL_WEIGHTS)[0]
+    words = TOPICS[channel["topic"]]
+    title = " ".join(rng.sample(words, min(3, len(words)))).title() + f" #{rng.randint(1, 999)}"
+
+    # Log-normal durations: median ~11 minutes, with some long streams.
+    seconds = int(min(max(rng.lognormvariate(6.5, 0.9), 20), 6 * 3600))
+
+    description = " ".join(rng.choice(words) for _ in range(rng.randint(20, 120)))
+    description += " 00:00 Intro 01:30 Main part 10:00 Outro. " + BOILERPLATE * rng.randint(1, 4)
+    tags = rng.sample(words, min(len(words), rng.randint(2, 6)))
+
+    snippet = {
+        "channelId": channel["id"],
+        "channelTitle": channel["name"],
+        "title": title,
+        "description": description,
+        "tags": tags,
+        "localized": {"title": title, "description": description},
+        "thumbnails": {"default": {"url": f"https://i.ytimg.com/vi/{video_id}/default.jpg"}},
+    }
+    if channel["language"]:
+        snippet["defaultAudioLanguage"] = channel["language"]
+    return {
+        "id": video_id,
+        "snippet": snippet,
+        "contentDetails": {"duration": _iso_duration(seconds), "definition": "hd"},
+    }
+
+
+TOPIC_URLS = {
+    "AI and coding": "Technology",
+    "F1": "Motorsport",
+    "Football": "Association_football",
+    "Basketball": "Basketball",
+    "News": "Politics",
+    "Humor": "Humour",
+    "Popular Science": "Knowledge",
+    "History": "Knowledge",
+    "Superheroes": "Film",
+    "Other": "Lifestyle_(sociology)",
+}
+CHANNELS_BY_ID = {c["id"]: c for c in CHANNELS}
+
+
+def channel_metadata(channel_id):
+    """Fake `channels` item for a synthetic channel ID, or None if unknown."""
+    channel = CHANNELS_BY_ID.get(channel_id)
+    if channel is None:
+        return None
+    rng = _seeded("channel", channel_id)
+    return {
+        "id": channel_id,
+        "snippet": {"title": channel["name"], "country": {"ru": "RU", "de": "DE", "es": "ES"}.get(channel["language"], "US")},
+        "statistics": {"subscriberCount": str(int(rng.paretovariate(1.2) * 1000)), "hiddenSubscriberCount": False},
+        "topicDetails": {"topicCategories": [f"https://en.wikipedia.org/wiki/{TOPIC_URLS[channel['topic']]}"]},
+    }
+
+
+def video_category(video_id):
+    """The 'true' label used by fake LLMs: the topic of the video's channel."""
+    return _seeded("video", video_id).choices(CHANNELS, weights=CHANNEL_WEIGHTS)[0]["topic"]
+
+
+def generate_history_rows(count, seed=42, end_date=None, days=30, rewatch_rate=0.15, shorts_rate=0.08):
+    """
+    Yields rows shaped like data/01_raw_history.csv, newest first. A share of
+    rows re-use an earlier VideoID to model rewatches.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or datetime.date.today()
+    seen = []
+    for i in range(count):
+        if seen and rng.random() < rewatch_rate:
+            video_id = rng.choice(seen)
+        else:
+            video_id = make_video_id(rng)
+            seen.append(video_id)
+        day_offset = int(i * days / max(count, 1))
+        date = end_date - datetime.timedelta(days=day_offset)
+        if rng.random() < shorts_rate:
+            link = f"https://www.youtube.com/shorts/{video_id}"
+        else:
+            link = f"https://www.youtube.com/watch?v={video_id}"
+        yield {
+            "Date": date.isoformat(),
+            "Title": video_metadata(video_id)["snippet"]["title"],
+            "Link": link,
+        }
+
+
+def write_history(path, count, seed=42, **kwargs):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["Date", "Title", "Link"])
+        writer.writeheader()
+        writer.writerows(generate_history_rows(count, seed=seed, **kwargs))
@@ -0,0 +1,123 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add parent directory to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+try:
+    from utils.text_store import INDEX_TYPECODES
+    from utils.video_ids import VideoIdMap, decode
+except ImportError:
+    from utils.text_store import INDEX_TYPECODES
+    from utils.video_ids import VideoIdMap, decode
+
+
+def synthetic_index(count, seed):
+    """VideoID -> (block offset, block length, slot), laid out like a real text store."""
+    rng = random.Random(seed)
+    entries = {}
+    while len(entries) < count:
+        slot = len(entries) % 64
+        block = len(entries) // 64
+        entries[decode(rng.getrandbits(64))] = (block * 9000, 9000, slot)
+    return entries
+
+
+def load_json_index(path):
+    """The old index.json layout: {VideoID: [offset, length, slot]}."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["index"]
+
+
+def load_array_index(path):
+    """The index.bin layout (TextStore._load_index)."""
+    with open(path, "rb") as f:
+        f.readline()
+        return VideoIdMap.load(f)
+
+
+def measure(load, path, probes):
+    """(loaded MB, load seconds, microseconds per lookup)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = load(path)
+    load_seconds = time.perf_counter() - start
+    loaded_mb = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for video_id in probes:
+        index.get(video_id)
+    lookup_seconds = time.perf_counter() - start
+
+    # Timed again without tracemalloc, which slows allocation-heavy loads.
+    del index
+    gc.collect()
+    start = time.perf_counter()
+    index = load(path)
+    load_seconds = min(load_seconds, time.perf_counter() - start)
+    return loaded_mb, load_seconds, lookup_seconds / len(probes) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the text store's array index (index.bin) with the old index.json."
+    )
+    parser.add_argument("--videos", type=int, default=500000)
+    parser.add_argument(
+        "--lookup-share",
+        type=float,
+        default=0.1,
+        help="Share of the history a step looks up (Steps 4 and 5 read the text of new videos only)",
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    entries = synthetic_index(args.videos, args.seed)
+    probes = list(entries)
+    random.Random(args.seed).shuffle(probes)
+
+    with tempfile.TemporaryDirectory(prefix="yt_index_bench_") as workdir:
+        json_path = os.path.join(workdir, "index.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"index": {vid: list(entry) for vid, entry in entries.items()}, "dead": 0}, f)
+        array_path = os.path.join(workdir, "index.bin")
+        index = VideoIdMap(INDEX_TYPECODES)
+        for video_id, entry in entries.items():
+            index.set(video_id, *entry)
+        with open(array_path, "wb") as f:
+            f.write(b'{"dead": 0}\n')
+            index.dump(f)
+        del index, entries
+
+        lookups = int(args.videos * args.lookup_share)
+        print(f"Text store index, {args.videos} videos; a step looking up {lookups} of them:")
+        results = []
+        for name, load, path in (
+            ("index.json (str dict)", load_json_index, json_path),
+            ("index.bin (VideoIdMap)", load_array_index, array_path),
+        ):
+            loaded_mb, load_seconds, lookup_us = measure(load, path, probes)
+            results.append((load_seconds, lookup_us))
+            print(
+                f"  {name:24} file {os.path.getsize(path) / 1e6:6.1f} MB  memory {loaded_mb:6.1f} MB  "
+                f"load {load_seconds:5.2f}s  lookup {lookup_us:4.2f} us  "
+                f"step total {load_seconds + lookups * lookup_us / 1e6:5.2f}s"
+            )
+        (json_load, json_lookup), (array_load, array_lookup) = results
+        if array_lookup > json_lookup:
+            even = (json_load - array_load) / ((array_lookup - json_lookup) / 1e6)
+            print(f"  index.bin is faster overall below {max(0, int(even))} lookups per load.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
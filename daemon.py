@@ -0,0 +1,356 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from main import STEPS, collect_step_metrics, write_run_metrics
+from utils.metrics import METRICS_DIR_ENV, get_metrics
+
+SOCKET_ENV = "DAEMON_SOCKET"
+# Settings the warm LLM backend is built from; a job that changes any of
+# them gets a new backend.
+BACKEND_ENV = (
+    "LLM_BACKEND", "GROQ_API_KEY", "GROQ_MODEL", "GROQ_BASE_URL", "LLM_MODEL", "LLM_BASE_URL",
+    "LLM_API_KEY", "LLM_CONCURRENCY", "LLM_TIMEOUT", "LLM_RATE_LIMIT", "LLM_RATE_BURST", "RATE_LIMIT_DIR",
+)
+DEFAULT_SOCKET = os.path.join("data", "daemon.sock")
+
+STEP_NAMES = [os.path.splitext(os.path.basename(step))[0] for step in STEPS]
+
+
+def resolve_steps(names):
+    """'1', '01', '01_scrape_history' -> step module names, in pipeline order."""
+    if not names:
+        return list(STEP_NAMES)
+    selected = []
+    for name in names:
+        matches = [s for s in STEP_NAMES if s == name or s.split("_", 1)[0] == name.zfill(2)]
+        if not matches:
+            raise ValueError(f"Unknown step '{name}' (expected one of {', '.join(STEP_NAMES)})")
+        selected.extend(m for m in matches if m not in selected)
+    return [s for s in STEP_NAMES if s in selected]
+
+
+class SocketWriter(io.TextIOBase):
+    """stdout replacement that streams a job's output to the client as JSON lines."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.lock = threading.Lock()
+        self.connected = True
+
+    def send(self, message):
+        if not self.connected:
+            return
+        with self.lock:
+            try:
+                self.wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            except OSError:
+                # Client went away; let the job finish anyway.
+                self.connected = False
+
+    def write(self, text):
+        if text:
+            self.send({"out": text})
+        return len(text)
+
+
+@contextlib.contextmanager
+def job_context(cwd, env, out):
+    """Runs a job as if started from the client: its cwd, its environment, its terminal."""
+    old_cwd = os.getcwd()
+    old_env = dict(os.environ)
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(env)
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            yield
+    finally:
+        os.chdir(old_cwd)
+        os.environ.clear()
+        os.environ.update(old_env)
+
+
+class WarmState:
+    """
+    Everything that is expensive to start and safe to reuse between jobs:
+    imported step modules (pandas, matplotlib, selenium, groq), the LLM
+    backend and its HTTP client, and a logged-in Chrome session.
+    """
+
+    def __init__(self, browser=False):
+        self.started_at = time.time()
+        self.jobs = 0
+        self.modules = {}
+        self.import_errors = {}
+        self._backend = None
+        self._backend_env = None
+        self._driver = None
+
+        from utils.step_loader import load_step
+
+        for name in STEP_NAMES:
+            start = time.perf_counter()
+            try:
+                module = load_step(name)
+                # Steps import their heavy dependencies lazily; the daemon wants them warm.
+                if hasattr(module, "load_dependencies"):
+                    module.load_dependencies()
+                self.modules[name] = module
+                print(f"Loaded {name} in {time.perf_counter() - start:.2f}s")
+            except ImportError as e:
+                self.import_errors[name] = str(e)
+                print(f"Warning: could not load {name}: {e}")
+        if browser:
+            self.driver()
+
+    def driver(self):
+        """The warm Chrome session, restarted if it was closed or crashed."""
+        if self._driver is not None:
+            try:
+                self._driver.current_url
+            except Exception:
+                print("Browser session lost; starting a new one.")
+                self._driver = None
+        if self._driver is None:
+            self._driver = self.modules["01_scrape_history"].setup_driver()
+        return self._driver
+
+    def backend(self):
+        """The warm LLM backend, rebuilt when the job's settings differ from the ones it was built with."""
+        step5 = self.modules["05_video_categorizer"]
+        step5.load_env()
+        backend_env = {name: os.getenv(name) for name in BACKEND_ENV}
+        if self._backend is not None and backend_env != self._backend_env:
+            print("LLM settings changed; rebuilding the LLM backend.")
+            self._backend.close()
+            self._backend = None
+        if self._backend is None:
+            self._backend = step5.setup_llm_backend()
+            self._backend_env = backend_env
+        self._backend.reset_stats()
+        return self._backend
+
+    def run_step(self, name):
+        if name in self.import_errors:
+            raise RuntimeError(f"{name} is unavailable in the daemon: {self.import_errors[name]}")
+        module = self.modules[name]
+        if name == "01_scrape_history":
+            module.scrape_history(driver=self.driver())
+        elif name == "05_video_categorizer":
+            module.main(backend=self.backend())
+        else:
+            module.main()
+
+    def status(self):
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": time.time() - self.started_at,
+            "jobs": self.jobs,
+            "steps_loaded": sorted(self.modules),
+            "import_errors": self.import_errors,
+            "browser": self._driver is not None,
+            "llm_backend": self._backend.name if self._backend else None,
+        }
+
+    def close(self):
+        if self._driver is not None:
+            with contextlib.suppress(Exception):
+                self._driver.quit()
+        if self._backend is not None:
+            self._backend.close()
+
+
+def run_job(state, request, out):
+    """Runs the requested steps in-process; returns the exit code."""
+    steps = resolve_steps(request.get("steps"))
+    env = request.get("env") or dict(os.environ)
+    metrics_dir = tempfile.mkdtemp(prefix="yt_metrics_")
+    env[METRICS_DIR_ENV] = metrics_dir
+    run = {"started_at": time.time(), "steps": [], "status": "ok"}
+    exit_code = 0
+    state.jobs += 1
+
+    with job_context(request.get("cwd") or os.getcwd(), env, out):
+        for name in steps:
+            print(f"\n{'='*50}\nRunning: {name} (daemon)\n{'='*50}\n")
+            step_start = time.time()
+            status = "ok"
+            try:
+                state.run_step(name)
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    status = "failed"
+                    exit_code = e.code if isinstance(e.code, int) else 1
+            except Exception:
+                traceback.print_exc()
+                status = "failed"
+                exit_code = 1
+            get_metrics().flush()
+            elapsed = time.time() - step_start
+            print(f"\nStep {'completed' if status == 'ok' else 'failed'} in {elapsed:.2f} seconds.")
+            run["steps"].append(collect_step_metrics(metrics_dir, name, elapsed, status))
+            if status != "ok":
+                run["status"] = "failed"
+                break
+
+        run["finished_at"] = time.time()
+        run["elapsed_seconds"] = run["finished_at"] - run["started_at"]
+        if not request.get("steps"):
+            # Full pipeline runs record run metrics just like main.py.
+            write_run_metrics(run, request.get("metrics_dir") or "metrics", env.get("PIPELINE_PROMETHEUS_FILE"))
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    return exit_code
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        out = SocketWriter(self.wfile)
+        try:
+            request = json.loads(line)
+            command = request.get("cmd")
+            if command == "run":
+                start = time.perf_counter()
+                code = run_job(self.server.state, request, out)
+                out.send({"exit": code, "elapsed_seconds": time.perf_counter() - start})
+            elif command == "status":
+                out.send({"status": self.server.state.status(), "exit": 0})
+            elif command == "stop":
+                out.send({"out": "Daemon stopping.\n", "exit": 0})
+                # shutdown() waits for serve_forever, which is running this handler.
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                out.send({"out": f"Unknown command {command!r}\n", "exit": 2})
+        except Exception as e:
+            out.send({"out": f"Daemon error: {e}\n", "exit": 1})
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    # One job at a time: steps share the daemon's cwd, environment and stdout.
+    allow_reuse_address = True
+
+
+def socket_path(args):
+    return os.path.abspath(args.socket or os.getenv(SOCKET_ENV, DEFAULT_SOCKET))
+
+
+def is_running(path):
+    with contextlib.suppress(OSError), socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        return True
+    return False
+
+
+def serve(args):
+    path = socket_path(args)
+    if is_running(path):
+        print(f"A daemon is already listening on {path}.")
+        return 1
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    print("Starting pipeline daemon (warming up)...")
+    start = time.perf_counter()
+    state = WarmState(browser=args.browser)
+    # Jobs run with the caller's environment (API keys included): the socket
+    # is created owner-only, with no window where others could connect.
+    old_umask = os.umask(0o077)
+    try:
+        server = DaemonServer(path, DaemonHandler)
+    finally:
+        os.umask(old_umask)
+    server.state = state
+    print(f"Ready in {time.perf_counter() - start:.1f}s; listening on {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        state.close()
+        with contextlib.suppress(OSError):
+            os.remove(path)
+    print("Daemon stopped.")
+    return 0
+
+
+def send(args, request):
+    """Sends one request and relays the streamed output; returns the job's exit code."""
+    path = socket_path(args)
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+    except OSError:
+        print(f"No daemon listening on {path}. Start one with: python daemon.py serve")
+        return 1
+    with sock, sock.makefile("rwb") as stream:
+        stream.write((json.dumps(request) + "\n").encode("utf-8"))
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            if "out" in message:
+                sys.stdout.write(message["out"])
+                sys.stdout.flush()
+            if "status" in message:
+                print(json.dumps(message["status"], indent=2))
+            if "exit" in message:
+                if "elapsed_seconds" in message:
+                    print(f"\nDaemon job finished in {message['elapsed_seconds']:.2f}s (exit {message['exit']}).")
+                return message["exit"]
+    print("Connection to the daemon closed unexpectedly.")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keep pipeline dependencies, the LLM client and a logged-in browser warm between runs."
+    )
+    parser.add_argument("--socket", help=f"Unix socket path (default: ${SOCKET_ENV} or {DEFAULT_SOCKET})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="Start the daemon in the foreground")
+    serve_parser.add_argument("--browser", action="store_true", help="Launch Chrome right away (for step 1)")
+
+    run_parser = sub.add_parser("run", help="Run the pipeline, or only the given steps, in the daemon")
+    run_parser.add_argument("steps", nargs="*", help="Steps to run, e.g. 4 5 (default: all)")
+    run_parser.add_argument("--metrics-dir", default="metrics", help="Directory for per-run JSON metrics")
+
+    sub.add_parser("status", help="Show what the daemon has warm")
+    sub.add_parser("stop", help="Stop the daemon")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        return serve(args)
+    if args.command == "run":
+        try:
+            resolve_steps(args.steps)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 2
+        return send(args, {
+            "cmd": "run",
+            "steps": args.steps,
+            "cwd": os.getcwd(),
+            "env": dict(os.environ),
+            "metrics_dir": args.metrics_dir,
+        })
+    return send(args, {"cmd": args.command})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,45 @@
-
+import argparse
+import datetime
+import json
 import subprocess
 import sys
 import os
+import shutil
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import METRICS_DIR_ENV, format_prometheus, write_atomic
+from utils.profiling import MODES, PROFILE_DIR_ENV, PROFILE_ENV, PROFILE_STEPS_ENV
+from utils.rate_limiter import RATE_LIMIT_DIR_ENV
+from utils.sampling import DEFAULT_PREVIEW_SIZE, PREVIEW_ENV, draw_sample
+from utils.shared_cache import SHARED_CACHE_ENV
+
+# Global limits shared by all accounts in batch mode, unless set in the environment.
+BATCH_DEFAULT_LIMITS = {
+    "YOUTUBE_RATE_LIMIT": "5",
+    "LLM_RATE_LIMIT": "0.5",
+}
+
+
+STEPS = [
+    "steps/01_scrape_history.py",
+    "steps/02_extract_ids.py",
+    "steps/03_deduplicate.py",
+    "steps/04_enrich_metadata.py",
+    "steps/05_video_categorizer.py",
+    "steps/06_visualize.py"
+]
+
+# Steps run on the sample in preview mode; steps 1-3 must have run before.
+PREVIEW_STEPS = STEPS[3:]
+
+# --stream runs steps 4 and 5 overlapped in one process instead.
+STREAM_STEP = "steps/04_05_stream.py"
+STREAMED_STEPS = ["steps/04_enrich_metadata.py", "steps/05_video_categorizer.py"]
+
 
-def run_step(script_path):
+def run_step(script_path, env=None):
     print(f"\n{'='*50}")
     print(f"Running: {script_path}")
     print(f"{'='*50}\n")
@@ -12,38 +47,249 @@ def run_step(script_path):
     start_time = time.time()
     try:
         # Use the same python executable
-        result = subprocess.run([sys.executable, script_path], check=True)
+        result = subprocess.run([sys.executable, script_path], check=True, env=env)
         elapsed = time.time() - start_time
         print(f"\nStep completed in {elapsed:.2f} seconds.")
+        return elapsed
     except subprocess.CalledProcessError as e:
         print(f"\nStep failed with return code {e.returncode}.")
-        sys.exit(e.returncode)
+        raise
     except Exception as e:
         print(f"\nAn error occurred: {e}")
+        raise
+
+
+def collect_step_metrics(metrics_dir, step, elapsed, status):
+    """Reads a step's flushed metrics; elapsed=None keeps the step's own timing (streamed steps overlap)."""
+    name = os.path.splitext(os.path.basename(step))[0]
+    path = os.path.join(metrics_dir, f"{name}.json")
+    data = {"step": name, "counters": {}, "phases": {}}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    if elapsed is not None:
+        data["elapsed_seconds"] = elapsed
+    data["status"] = status
+    return data
+
+
+def write_run_metrics(run, metrics_dir, prometheus_file):
+    os.makedirs(metrics_dir, exist_ok=True)
+    stamp = datetime.datetime.fromtimestamp(run["started_at"]).strftime("%Y%m%d_%H%M%S")
+    json_path = os.path.join(metrics_dir, f"run_{stamp}.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+    print(f"Run metrics saved to {json_path}")
+    if prometheus_file:
+        write_atomic(prometheus_file, format_prometheus(run))
+        print(f"Prometheus metrics saved to {prometheus_file}")
+
+
+def list_accounts(accounts_dir, names):
+    if names:
+        return names
+    # Directories starting with "_" (like the shared state) are not accounts.
+    return sorted(
+        name for name in os.listdir(accounts_dir)
+        if os.path.isdir(os.path.join(accounts_dir, name)) and not name.startswith("_")
+    )
+
+
+def run_account(name, account_dir, env, extra_args):
+    """Runs the full pipeline with `account_dir` as the working directory; output goes to pipeline.log."""
+    log_path = os.path.join(account_dir, "pipeline.log")
+    start = time.time()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__)] + extra_args,
+            cwd=account_dir,
+            env=dict(env, BATCH_ACCOUNT=name),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    return {"account": name, "returncode": proc.returncode, "elapsed_seconds": time.time() - start, "log": log_path}
+
+
+def run_batch(args, extra_args):
+    """
+    Runs the pipeline for several accounts concurrently. Each account has its
+    own working directory (`<accounts-dir>/<name>` with its chrome_data/,
+    data/, output/ and optional .env). Video metadata and categories are
+    shared through one cache, and API/LLM rate limits and the YouTube quota
+    ledger are enforced across all of them.
+    """
+    accounts_dir = os.path.abspath(args.accounts_dir)
+    if not os.path.isdir(accounts_dir):
+        print(f"Error: accounts directory {accounts_dir} not found.")
+        sys.exit(1)
+    names = list_accounts(accounts_dir, args.batch)
+    if not names:
+        print(f"No accounts found in {accounts_dir}.")
+        return
+
+    shared_dir = os.path.join(accounts_dir, "_shared")
+    os.makedirs(shared_dir, exist_ok=True)
+    env = dict(os.environ)
+    env.setdefault(SHARED_CACHE_ENV, os.path.join(shared_dir, "shared_cache.sqlite"))
+    env.setdefault(RATE_LIMIT_DIR_ENV, os.path.join(shared_dir, "rate_limits"))
+    env.setdefault("YOUTUBE_QUOTA_LEDGER", os.path.join(shared_dir, "youtube_quota.json"))
+    for key, value in BATCH_DEFAULT_LIMITS.items():
+        env.setdefault(key, value)
+
+    parallel = max(1, min(args.parallel, len(names)))
+    print(f"Running {len(names)} accounts ({parallel} at a time): {', '.join(names)}")
+    print(f"Shared cache: {env[SHARED_CACHE_ENV]}")
+
+    jobs = []
+    for name in names:
+        account_dir = os.path.join(accounts_dir, name)
+        if not os.path.isdir(account_dir):
+            print(f"Error: account directory {account_dir} not found.")
+            sys.exit(1)
+        jobs.append((name, account_dir))
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = [executor.submit(run_account, name, path, env, extra_args) for name, path in jobs]
+        results = []
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            status = "ok" if result["returncode"] == 0 else f"failed ({result['returncode']})"
+            print(f"  {result['account']}: {status} in {result['elapsed_seconds']:.1f}s, log: {result['log']}")
+
+    failed = [r["account"] for r in results if r["returncode"] != 0]
+    if failed:
+        print(f"\nBatch finished with failures: {', '.join(failed)}")
         sys.exit(1)
+    print("\nBatch finished successfully.")
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the YouTube History Analysis pipeline.")
+    parser.add_argument("--metrics-dir", default="metrics", help="Directory for per-run JSON metrics")
+    parser.add_argument(
+        "--prometheus-file",
+        default=os.getenv("PIPELINE_PROMETHEUS_FILE"),
+        help="Also write metrics in Prometheus text format (e.g. for the node exporter textfile collector)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cprofile",
+        choices=MODES,
+        help="Profile steps with cProfile + tracemalloc (default) or a low-overhead stack sampler",
+    )
+    parser.add_argument("--profile-steps", help="Only profile these steps, e.g. 01,05")
+    parser.add_argument("--profile-dir", default="profiles", help="Where .prof and allocation reports go")
+    parser.add_argument(
+        "--batch",
+        nargs="*",
+        metavar="ACCOUNT",
+        help="Run the pipeline for several accounts under --accounts-dir (all of them when no names are given)",
+    )
+    parser.add_argument("--accounts-dir", default="accounts", help="One working directory per account for --batch")
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=int(os.getenv("BATCH_PARALLEL", "2")),
+        help="How many accounts --batch runs at once",
+    )
+    parser.add_argument(
+        "--preview",
+        nargs="?",
+        type=int,
+        const=int(os.getenv("PREVIEW_SAMPLE_SIZE", DEFAULT_PREVIEW_SIZE)),
+        metavar="SIZE",
+        help="Run steps 4-6 on a stratified sample of Step 3 output and chart estimates with confidence intervals",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=os.getenv("PIPELINE_STREAM", "0") == "1",
+        help="Overlap steps 4 and 5: categorize each enriched batch while the next one is fetched",
+    )
+    args = parser.parse_args()
+
+    if args.batch is not None:
+        # Per-account runs get the same metrics/profiling options.
+        extra_args = ["--metrics-dir", args.metrics_dir]
+        if args.preview:
+            extra_args += ["--preview", str(args.preview)]
+        if args.stream:
+            extra_args.append("--stream")
+        if args.profile:
+            extra_args += [f"--profile={args.profile}", "--profile-dir", args.profile_dir]
+            if args.profile_steps:
+                extra_args += ["--profile-steps", args.profile_steps]
+        run_batch(args, extra_args)
+        return
+
     print("Starting YouTube History Analysis Pipeline...")
     
-    steps = [
-        "steps/01_scrape_history.py",
-        "steps/02_extract_ids.py",
-        "steps/03_deduplicate.py",
-        "steps/04_enrich_metadata.py",
-        "steps/05_video_categorizer.py",
-        "steps/06_visualize.py"
-    ]
+    steps = STEPS
     
     root_dir = os.path.dirname(os.path.abspath(__file__))
+
+    step_metrics_dir = tempfile.mkdtemp(prefix="yt_metrics_")
+    env = dict(os.environ, **{METRICS_DIR_ENV: step_metrics_dir})
+    if args.preview:
+        source = os.path.join("data", "03_unique_ids.csv")
+        if not os.path.exists(source):
+            print(f"Preview needs {source}. Run the full pipeline (or steps 1-3) first.")
+            sys.exit(1)
+        env[PREVIEW_ENV] = "1"
+        # Steps 4-6 read and write the data/*_preview.csv files (utils/sampling.data_file).
+        sample_file = os.path.join("data", "03_unique_ids_preview.csv")
+        population, sampled, strata = draw_sample(
+            source, sample_file, args.preview, seed=os.getenv("PREVIEW_SEED", "preview")
+        )
+        print(f"Preview: sampled {sampled} of {population} videos across {strata} strata into {sample_file}.")
+        steps = PREVIEW_STEPS
+    if args.stream:
+        steps = [STREAM_STEP if step == STREAMED_STEPS[0] else step for step in steps if step != STREAMED_STEPS[1]]
+    if args.profile:
+        env[PROFILE_ENV] = args.profile
+        env[PROFILE_DIR_ENV] = args.profile_dir
+        if args.profile_steps:
+            env[PROFILE_STEPS_ENV] = args.profile_steps
+    run = {"started_at": time.time(), "steps": [], "status": "ok"}
+    exit_code = 0
     
     for step in steps:
         script_path = os.path.join(root_dir, step)
         if not os.path.exists(script_path):
             print(f"Error: Script not found: {script_path}")
             sys.exit(1)
-            
-        run_step(script_path)
+
+        # The streamed script reports as steps 4 and 5, each with its own timing.
+        streamed = step == STREAM_STEP
+        reported = STREAMED_STEPS if streamed else [step]
+        step_start = time.time()
+        try:
+            elapsed = run_step(script_path, env=env)
+            for name in reported:
+                run["steps"].append(collect_step_metrics(step_metrics_dir, name, None if streamed else elapsed, "ok"))
+        except Exception as e:
+            elapsed = time.time() - step_start
+            for name in reported:
+                run["steps"].append(
+                    collect_step_metrics(step_metrics_dir, name, None if streamed else elapsed, "failed")
+                )
+            run["status"] = "failed"
+            exit_code = getattr(e, "returncode", 1) or 1
+            break
+
+    run["finished_at"] = time.time()
+    run["elapsed_seconds"] = run["finished_at"] - run["started_at"]
+    write_run_metrics(run, args.metrics_dir, args.prometheus_file)
+    shutil.rmtree(step_metrics_dir, ignore_errors=True)
+    if exit_code:
+        sys.exit(exit_code)
         
+    if args.preview:
+        print("\n\nPreview completed. Estimated charts and estimates.csv are in 'output/preview'.")
+        print("Run without --preview for exact numbers.")
+        return
     print("\n\nPipeline execution completed successfully!")
     print(f"Check the 'output' directory for results.")
 
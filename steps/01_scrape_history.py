@@ -3,23 +3,38 @@ import time
 import csv
 import os
 import sys
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 
 # Add parent directory to path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from utils.date_utils import parse_relative_date, get_last_month_range
+    from utils.metrics import step_metrics
+    from utils.profiling import run_entry
 except ImportError:
     # Fallback if running from root
     from utils.date_utils import parse_relative_date, get_last_month_range
+    from utils.metrics import step_metrics
+    from utils.profiling import run_entry
+
+# selenium and webdriver_manager are imported on first use (load_dependencies),
+# so --help and tools that load this step do not pay for them.
+webdriver = By = Service = Options = WebDriverWait = EC = ChromeDriverManager = None
+
+
+def load_dependencies():
+    global webdriver, By, Service, Options, WebDriverWait, EC, ChromeDriverManager
+    if webdriver is not None:
+        return
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from webdriver_manager.chrome import ChromeDriverManager
 
 def setup_driver():
+    load_dependencies()
     options = Options()
     # Use a local profile to persist login cookies
     user_data_dir = os.path.join(os.getcwd(), "chrome_data")
@@ -45,12 +60,21 @@ def setup_driver():
     
     return driver
 
-def scrape_history():
+def scrape_history(driver=None):
+    """
+    Scrapes last month's history. A running `driver` (e.g. the daemon's
+    logged-in browser) can be passed in; it is then left open afterwards.
+    """
     print("Starting YouTube History Scraper (Step 1)...")
+    load_dependencies()
     start_date, end_date = get_last_month_range()
     print(f"Targeting range: {start_date} to {end_date}")
+    metrics = step_metrics("01_scrape_history")
 
-    driver = setup_driver()
+    owns_driver = driver is None
+    if owns_driver:
+        with metrics.phase("setup_driver"):
+            driver = setup_driver()
     
     try:
         driver.get("https://www.youtube.com/feed/history")
@@ -92,8 +116,10 @@ def scrape_history():
         loop_count = 0
         max_loops = 100 # Safety limit
         
+        scrape_start = time.perf_counter()
         while not reached_end:
             loop_count += 1
+            metrics.incr("scroll_loops")
             if loop_count > max_loops:
                 print("Max loops reached.")
                 break
@@ -196,6 +222,8 @@ def scrape_history():
                  print(f"Last section date {last_section_date_val} is older than start date {start_date}")
                  reached_end = True
 
+        metrics.record_phase("scrape", time.perf_counter() - scrape_start)
+        metrics.set("rows_out", len(collected_videos))
         print(f"Scraping complete. Found {len(collected_videos)} videos.")
         
         output_file = os.path.join("data", "01_raw_history.csv")
@@ -211,7 +239,8 @@ def scrape_history():
     except Exception as e:
         print(f"Error: {e}")
     finally:
-        driver.quit()
+        if owns_driver:
+            driver.quit()
 
 if __name__ == "__main__":
-    scrape_history()
+    run_entry(scrape_history, "01_scrape_history")
@@ -2,8 +2,18 @@
 import csv
 import os
 import re
+import sys
 from urllib.parse import urlparse, parse_qs
 
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from utils.metrics import step_metrics
+    from utils.profiling import run_entry
+except ImportError:
+    from utils.metrics import step_metrics
+    from utils.profiling import run_entry
+
 def extract_video_id(url):
     """
     Extracts the video ID from a YouTube URL.
@@ -30,6 +40,7 @@ def extract_video_id(url):
 
 def main():
     print("Starting ID Extraction (Step 2)...")
+    metrics = step_metrics("02_extract_ids")
     
     input_file = os.path.join("data", "01_raw_history.csv")
     output_file = os.path.join("data", "02_video_ids.csv")
@@ -48,6 +59,7 @@ def main():
         writer.writeheader()
         
         for row in reader:
+            metrics.incr("rows_in")
             link = row.get('Link', '')
             video_id = extract_video_id(link)
             
@@ -59,8 +71,9 @@ def main():
                 # Could be a channel link or something else
                 pass
 
+    metrics.set("rows_out", processed_count)
     print(f"Extracted IDs for {processed_count} videos.")
     print(f"Saved to {output_file}")
 
 if __name__ == "__main__":
-    main()
+    run_entry(main, "02_extract_ids")
@@ -1,42 +1,214 @@
-
 import csv
+import heapq
 import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from utils.date_utils import iso_day
+    from utils.metrics import step_metrics
+    from utils.profiling import run_entry
+    from utils.warehouse import open_warehouse
+except ImportError:
+    from utils.date_utils import iso_day
+    from utils.metrics import step_metrics
+    from utils.profiling import run_entry
+    from utils.warehouse import open_warehouse
+
+AGGREGATE_FIELDS = ['ViewCount', 'FirstWatched', 'LastWatched', 'WatchDates']
+SPILL_FIELDS = ['_order'] + AGGREGATE_FIELDS
+
+# Rough per-entry cost of a dict row plus bookkeeping, used to decide when to spill.
+ENTRY_OVERHEAD_BYTES = 600
+DATE_OVERHEAD_BYTES = 70
+
+
+class VideoAggregate:
+    __slots__ = ('order', 'row', 'count', 'first', 'last', 'dates')
+
+    def __init__(self, order, row):
+        self.order = order
+        self.row = row
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.dates = []
+
+    def add(self, date):
+        self.count += 1
+        if date:
+            self.dates.append(date)
+            if self.first is None or date < self.first:
+                self.first = date
+            if self.last is None or date > self.last:
+                self.last = date
+
+    def merge(self, other):
+        # Keep the row seen first in the input (the most recent view).
+        if other.order < self.order:
+            self.order, self.row = other.order, other.row
+        self.count += other.count
+        self.dates.extend(other.dates)
+        for date in (other.first, other.last):
+            if date:
+                if self.first is None or date < self.first:
+                    self.first = date
+                if self.last is None or date > self.last:
+                    self.last = date
+
+    def to_row(self):
+        row = dict(self.row)
+        row['ViewCount'] = self.count
+        row['FirstWatched'] = self.first or ''
+        row['LastWatched'] = self.last or ''
+        row['WatchDates'] = ';'.join(sorted(self.dates))
+        return row
+
+    def to_spill_row(self):
+        return dict(self.to_row(), _order=self.order)
+
+    @classmethod
+    def from_spill_row(cls, row):
+        agg = cls(int(row.pop('_order')), row)
+        agg.count = int(row.pop('ViewCount'))
+        agg.first = row.pop('FirstWatched') or None
+        agg.last = row.pop('LastWatched') or None
+        dates = row.pop('WatchDates')
+        agg.dates = dates.split(';') if dates else []
+        return agg
+
+
+def write_run(aggregates, fieldnames, spill_dir):
+    """Writes one sorted run to a temp CSV and returns its path."""
+    fd, path = tempfile.mkstemp(suffix='.csv', dir=spill_dir)
+    with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames + SPILL_FIELDS)
+        writer.writeheader()
+        for agg in aggregates:
+            writer.writerow(agg.to_spill_row())
+    return path
+
+
+def read_run(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield VideoAggregate.from_spill_row(row)
+
+
+def merge_runs(paths):
+    """K-way merges runs sorted by VideoID, combining records of the same video."""
+    current = None
+    for agg in heapq.merge(*(read_run(p) for p in paths), key=lambda a: a.row['VideoID']):
+        if current is not None and current.row['VideoID'] == agg.row['VideoID']:
+            current.merge(agg)
+            continue
+        if current is not None:
+            yield current
+        current = agg
+    if current is not None:
+        yield current
+
+
+def sort_by_order(aggregates, fieldnames, spill_dir, limit_bytes):
+    """External sort of merged aggregates back into first-seen (input) order."""
+    runs = []
+    buffer = []
+    used = 0
+    for agg in aggregates:
+        buffer.append(agg)
+        used += ENTRY_OVERHEAD_BYTES + DATE_OVERHEAD_BYTES * len(agg.dates)
+        if used >= limit_bytes:
+            buffer.sort(key=lambda a: a.order)
+            runs.append(write_run(buffer, fieldnames, spill_dir))
+            buffer, used = [], 0
+    if buffer:
+        buffer.sort(key=lambda a: a.order)
+        runs.append(write_run(buffer, fieldnames, spill_dir))
+    return runs, heapq.merge(*(read_run(p) for p in runs), key=lambda a: a.order)
+
 
 def main():
     print("Starting Deduplication (Step 3)...")
-    
+    metrics = step_metrics("03_deduplicate")
+
     input_file = os.path.join("data", "02_video_ids.csv")
     output_file = os.path.join("data", "03_unique_ids.csv")
-    
+
     if not os.path.exists(input_file):
         print(f"Input file {input_file} not found. Run step 2 first.")
         return
 
-    unique_ids = set()
-    unique_rows = []
-    
-    # Read all rows
-    # Assuming input is roughly sorted by date (newest first) from Step 1.
-    # We want to keep the most recent view of a video.
-    
-    with open(input_file, 'r', encoding='utf-8') as f_in:
-        reader = csv.DictReader(f_in)
-        fieldnames = reader.fieldnames
-        
-        for row in reader:
-            vid = row['VideoID']
-            if vid not in unique_ids:
-                unique_ids.add(vid)
-                unique_rows.append(row)
-                
-    print(f"Found {len(unique_ids)} unique videos out of all entries.")
-    
-    with open(output_file, 'w', newline='', encoding='utf-8') as f_out:
-        writer = csv.DictWriter(f_out, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(unique_rows)
+    limit_bytes = int(float(os.getenv("DEDUPE_MEMORY_LIMIT_MB", "256")) * 1024 * 1024)
+    # Spill runs live in a temporary directory that is removed however the step ends.
+    with tempfile.TemporaryDirectory(prefix="yt_dedupe_") as spill_dir:
+        spill_runs = []
+
+        # Single streaming pass: aggregate every view of a video instead of
+        # dropping repeats. Input is roughly newest first (Step 1), so the first
+        # row seen per VideoID is kept as the video's row.
+        # When the working set passes the memory limit, the aggregates are
+        # spilled to disk as a run sorted by VideoID and merged at the end.
+        aggregates = {}
+        used = 0
+        order = 0
+
+        with open(input_file, 'r', encoding='utf-8') as f_in:
+            reader = csv.DictReader(f_in)
+            fieldnames = [f for f in reader.fieldnames if f not in AGGREGATE_FIELDS]
+
+            for row in reader:
+                metrics.incr("rows_in")
+                vid = row['VideoID']
+                agg = aggregates.get(vid)
+                if agg is None:
+                    agg = VideoAggregate(order, row)
+                    aggregates[vid] = agg
+                    used += ENTRY_OVERHEAD_BYTES
+                order += 1
+                agg.add(iso_day(row.get('Date', '')))
+                used += DATE_OVERHEAD_BYTES
+
+                if used >= limit_bytes:
+                    run = sorted(aggregates.values(), key=lambda a: a.row['VideoID'])
+                    spill_runs.append(write_run(run, fieldnames, spill_dir))
+                    metrics.incr("spills")
+                    aggregates = {}
+                    used = 0
+
+        if spill_runs:
+            if aggregates:
+                run = sorted(aggregates.values(), key=lambda a: a.row['VideoID'])
+                spill_runs.append(write_run(run, fieldnames, spill_dir))
+            aggregates = {}
+            print(f"Working set exceeded the memory limit; merging {len(spill_runs)} spilled runs...")
+            _, results = sort_by_order(merge_runs(spill_runs), fieldnames, spill_dir, limit_bytes)
+        else:
+            # Dict insertion order is already first-seen order.
+            results = aggregates.values()
+
+        warehouse = open_warehouse()
+        unique_count = 0
+        rewatched = 0
+        with open(output_file, 'w', newline='', encoding='utf-8') as f_out:
+            writer = csv.DictWriter(f_out, fieldnames=fieldnames + AGGREGATE_FIELDS)
+            writer.writeheader()
+            for agg in results:
+                writer.writerow(agg.to_row())
+                unique_count += 1
+                rewatched += agg.count > 1
+                if warehouse:
+                    warehouse.upsert_watches(
+                        agg.row['VideoID'], agg.row.get('Title', ''), agg.row.get('Link', ''), agg.dates
+                    )
+        if warehouse:
+            warehouse.close()
 
+    metrics.set("rows_out", unique_count)
+    metrics.set("rewatched_videos", rewatched)
+    print(f"Found {unique_count} unique videos out of {order} entries ({rewatched} watched more than once).")
     print(f"Saved to {output_file}")
 
 if __name__ == "__main__":
-    main()
+    run_entry(main, "03_deduplicate")
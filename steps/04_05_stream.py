@@ -0,0 +1,158 @@
+import os
+import queue
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from utils.step_loader import load_step
+    from utils.profiling import run_entry
+    from utils.records import count_records
+    from utils.sampling import data_file
+    from utils.text_store import TEXT_FIELDS
+except ImportError:
+    from utils.step_loader import load_step
+    from utils.profiling import run_entry
+    from utils.records import count_records
+    from utils.sampling import data_file
+    from utils.text_store import TEXT_FIELDS
+
+_DONE = object()
+
+
+class StreamAborted(Exception):
+    pass
+
+
+class BatchQueue:
+    """
+    Bounded hand-over of enriched batches from Step 4 (producer thread) to
+    Step 5 (consumer). A full queue blocks Step 4 (backpressure); batches come
+    out in the order Step 4 wrote them, so 05_categorized.csv keeps the
+    row order of a sequential run.
+    """
+
+    def __init__(self, max_batches):
+        self.queue = queue.Queue(maxsize=max_batches)
+        self.fieldnames = None
+        self.failed = None
+        self.finished = False
+        self.stopped = threading.Event()
+        self.waited_seconds = 0.0
+
+    def put(self, fieldnames, rows):
+        start = time.perf_counter()
+        while True:
+            if self.stopped.is_set():
+                raise StreamAborted("Step 5 stopped; aborting enrichment.")
+            try:
+                self.queue.put((fieldnames, rows), timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        self.waited_seconds += time.perf_counter() - start
+
+    def close(self, error=None):
+        self.failed = error
+        self.queue.put(_DONE)
+
+    def first(self):
+        """Blocks until Step 4 produced its first batch; returns its fieldnames (None if it produced nothing)."""
+        item = self.queue.get()
+        if item is _DONE:
+            self.queue.put(_DONE)
+            return None
+        self.fieldnames = item[0]
+        self._head = item[1]
+        return self.fieldnames
+
+    def rows(self):
+        yield from self._head
+        self._head = None
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                break
+            yield from item[1]
+        self.finished = True
+        if self.failed:
+            # Step 5 must not publish a partial 05_categorized.csv.
+            raise StreamAborted(f"Step 4 failed: {self.failed}")
+
+
+def produce(enrich, batches):
+    error = None
+    try:
+        enrich.main(sink=batches.put)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            error = f"exit code {e.code}"
+    except BaseException as e:
+        error = str(e) or type(e).__name__
+        if not isinstance(e, StreamAborted):
+            print(f"Step 4 error: {error}")
+    finally:
+        batches.close(error)
+
+
+def remove_partial(*paths):
+    for path in paths:
+        tmp = f"{path}.tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def main():
+    """
+    Runs Step 4 and Step 5 overlapped: each enriched batch goes straight to
+    the categorizer through a bounded queue, so YouTube API and LLM waits
+    overlap and the wall time approaches that of the slower step.
+    """
+    print("Starting streamed enrichment + categorization (Steps 4 and 5)...")
+    enrich = load_step("04_enrich_metadata")
+    categorize = load_step("05_video_categorizer")
+
+    input_file = data_file("03_unique_ids.csv")
+    if not os.path.exists(input_file):
+        print(f"Input file {input_file} not found. Run step 3 first.")
+        return
+    total = count_records(input_file)
+
+    max_batches = max(1, int(os.getenv("STREAM_QUEUE_BATCHES", "8")))
+    batches = BatchQueue(max_batches)
+    producer = threading.Thread(target=produce, args=(enrich, batches), name="step4", daemon=True)
+    start = time.perf_counter()
+    producer.start()
+
+    fieldnames = batches.first()
+    failed = False
+    if fieldnames is None:
+        producer.join()
+        print("Step 4 produced no rows; nothing to categorize.")
+        failed = batches.failed is not None
+    else:
+        try:
+            # Step 4 keeps Description and Tags on its rows; Step 5 reads them
+            # inline instead of from the text store Step 4 is still writing.
+            categorize.main(source=(fieldnames + list(TEXT_FIELDS), batches.rows(), total))
+        except StreamAborted as e:
+            print(f"Error: {e}")
+        finally:
+            # Unblocks Step 4 if Step 5 stopped early.
+            batches.stopped.set()
+            producer.join()
+        failed = not batches.finished or batches.failed is not None
+
+    if failed:
+        remove_partial(data_file("04_enriched.csv"), data_file("05_categorized.csv"))
+        sys.exit(1)
+    print(
+        f"Streamed Steps 4 and 5 in {time.perf_counter() - start:.2f}s "
+        f"(Step 4 waited {batches.waited_seconds:.2f}s on a full queue of {max_batches} batches)."
+    )
+
+
+if __name__ == "__main__":
+    run_entry(main, "04_05_stream")
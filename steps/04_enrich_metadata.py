@@ -1,12 +1,11 @@
 
 import csv
+import gzip
 import os
 import sys
 import json
 import re
-import urllib.request
 import urllib.parse
-import urllib.error
 import time
 import re
 
@@ -14,8 +13,48 @@ import re
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from utils.env_loader import load_env
+    from utils.metrics import get_metrics, step_metrics
+    from utils.profiling import run_entry
+    from utils.quota_ledger import RATE_REASONS, ApiKeyPool, NoUsableApiKey, QuotaCeilingReached
+    from utils.channel_store import ChannelStore, topic_name
+    from utils.warehouse import open_warehouse
+    from utils.shared_cache import open_shared_cache
+    from utils.rate_limiter import get_rate_limiter
+    from utils.records import chunked, read_records
+    from utils.text_store import TEXT_FIELDS, TextStore
+    from utils.sampling import SAMPLE_FIELDS, data_file
 except ImportError:
     from utils.env_loader import load_env
+    from utils.metrics import get_metrics, step_metrics
+    from utils.profiling import run_entry
+    from utils.quota_ledger import RATE_REASONS, ApiKeyPool, NoUsableApiKey, QuotaCeilingReached
+    from utils.channel_store import ChannelStore, topic_name
+    from utils.warehouse import open_warehouse
+    from utils.shared_cache import open_shared_cache
+    from utils.rate_limiter import get_rate_limiter
+    from utils.records import chunked, read_records
+    from utils.text_store import TEXT_FIELDS, TextStore
+    from utils.sampling import SAMPLE_FIELDS, data_file
+
+API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+# Transient HTTP errors worth retrying (rate limiting and server-side failures).
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Partial responses: only the fields we actually read below.
+VIDEO_FIELDS = (
+    "items(id,"
+    "snippet(channelId,channelTitle,title,description,tags,defaultAudioLanguage,defaultLanguage),"
+    "contentDetails(duration))"
+)
+CHANNEL_FIELDS = (
+    "items(id,snippet(country),statistics(subscriberCount,hiddenSubscriberCount),"
+    "topicDetails(topicCategories))"
+)
+# Google only serves gzip to clients whose User-Agent mentions it.
+REQUEST_HEADERS = {
+    "Accept-Encoding": "gzip",
+    "User-Agent": "youtube-history-analyzer (gzip)",
+}
 
 def parse_iso_duration(duration_str):
     """
@@ -50,145 +89,433 @@ def clean_text(value):
     text = re.sub(r"\s+", " ", text)
     return text.strip()
 
-def fetch_video_details_batch(video_ids, api_key):
+def read_response(response):
+    """Returns (decoded JSON, wire bytes, decompressed bytes) for an API response."""
+    body = response.read()
+    wire_bytes = len(body)
+    if (response.headers.get("Content-Encoding") or "").lower() == "gzip":
+        body = gzip.decompress(body)
+    return json.loads(body.decode('utf-8')), wire_bytes, len(body)
+
+
+def error_reasons(error):
+    """The API's error reasons (e.g. {"quotaExceeded"}) from an HTTPError response body."""
+    try:
+        body = error.read()
+        if (error.headers.get("Content-Encoding") or "").lower() == "gzip":
+            body = gzip.decompress(body)
+        detail = json.loads(body.decode("utf-8")).get("error", {})
+    except (OSError, ValueError, AttributeError):
+        return set()
+    items = (detail.get("errors") or []) + (detail.get("details") or [])
+    return {item.get("reason") for item in items if isinstance(item, dict) and item.get("reason")}
+
+
+def api_get(resource, params, keys):
+    """
+    GETs a YouTube Data API resource (e.g. "videos") and returns the decoded
+    JSON, or None on HTTP errors. Each call goes to a key from `keys` (an
+    ApiKeyPool) and is charged to that key's quota ledger.
+    """
+    # Imported on first call: runs served from the warehouse never need an HTTP client.
+    import urllib.error
+    import urllib.request
+
+    # YOUTUBE_API_BASE_URL points the step at another server, e.g. benchmarks/fake_servers.py.
+    base_url = os.getenv("YOUTUBE_API_BASE_URL", API_BASE_URL).rstrip("/")
+    metrics = get_metrics()
+    max_attempts = 1 + max(0, int(os.getenv("YOUTUBE_MAX_RETRIES", "3")))
+    attempt = 0
+
+    while True:
+        entry, cost = keys.acquire(f"{resource}.list")
+        metrics.incr("quota_units", cost)
+        url = f"{base_url}/{resource}?{urllib.parse.urlencode(dict(params, key=entry.key))}"
+        # YOUTUBE_RATE_LIMIT (requests/second), shared by batch-mode pipelines.
+        limiter = get_rate_limiter("youtube")
+        if limiter:
+            limiter.acquire()
+
+        try:
+            metrics.incr("api_calls")
+            request = urllib.request.Request(url, headers=REQUEST_HEADERS)
+            with urllib.request.urlopen(request) as response:
+                data, wire_bytes, raw_bytes = read_response(response)
+            metrics.incr("bytes_downloaded", wire_bytes)
+            keys.record_bytes(entry, wire_bytes, raw_bytes)
+            return data
+        except urllib.error.HTTPError as e:
+            metrics.incr("api_errors")
+            reasons = error_reasons(e)
+            # Out of quota or rejected: the same call goes to another key, not counted as a retry.
+            if keys.drop(entry, reasons):
+                metrics.incr("key_failovers")
+                continue
+            attempt += 1
+            rate_limited = e.code == 429 or bool(reasons & RATE_REASONS)
+            if not (rate_limited or e.code in RETRY_STATUSES) or attempt >= max_attempts:
+                print(f"Error fetching {resource} batch: {e}")
+                return None
+            metrics.incr("retries")
+            wait_time = min(2 ** attempt, 30)
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            if retry_after:
+                try:
+                    wait_time = min(float(retry_after), 60)
+                except ValueError:
+                    pass
+            if rate_limited:
+                metrics.incr("rate_limit_waits")
+                metrics.incr("rate_limit_wait_seconds", wait_time)
+                # Other keys carry on meanwhile; with one key this is a plain backoff.
+                keys.cool_down(entry, wait_time)
+                if len(keys) > 1:
+                    print(f"{resource} request rate-limited on key {entry.label}; cooling it down {wait_time:.1f}s...")
+                    continue
+            print(f"{resource} request failed ({e.code}); retrying in {wait_time:.1f}s ({attempt}/{max_attempts})...")
+            if not rate_limited:
+                time.sleep(wait_time)
+
+
+def fetch_video_details_batch(video_ids, keys):
     """
-    Fetches details for a list of video IDs (max 50) using YouTube Data API.
+    Fetches details for a list of video IDs (max 50) using YouTube Data API,
+    with a key from the ApiKeyPool `keys`.
     """
     if not video_ids:
         return {}
         
-    base_url = "https://www.googleapis.com/youtube/v3/videos"
     params = {
         "part": "snippet,contentDetails",
+        "fields": VIDEO_FIELDS,
         "id": ",".join(video_ids),
-        "key": api_key
     }
-    
-    url = f"{base_url}?{urllib.parse.urlencode(params)}"
-    
-    try:
-        with urllib.request.urlopen(url) as response:
-            data = json.loads(response.read().decode('utf-8'))
+    data = api_get("videos", params, keys)
+    if data is None:
+        return {}
+
+    results = {}
+    if "items" in data:
+        for item in data["items"]:
+            vid = item["id"]
+            snippet = item.get("snippet", {})
+            content_details = item.get("contentDetails", {})
             
-        results = {}
-        if "items" in data:
-            for item in data["items"]:
-                vid = item["id"]
-                snippet = item.get("snippet", {})
-                content_details = item.get("contentDetails", {})
-                
-                tags_list = snippet.get("tags") or []
-                tags_text = "; ".join(tags_list)
-
-                results[vid] = {
-                    "Channel": clean_text(snippet.get("channelTitle")),
-                    "Duration": parse_iso_duration(content_details.get("duration")), # Converted from ISO 8601
-                    "OriginalLanguage": clean_text(
-                        snippet.get("defaultAudioLanguage") or snippet.get("defaultLanguage") or "Unknown"
-                    ),
-                    "Title": clean_text(snippet.get("title")), # Update title from API as it's cleaner than scraped
-                    "Description": clean_text(snippet.get("description") or ""),
-                    "Tags": clean_text(tags_text)
-                }
-        return results
-        
-    except urllib.error.HTTPError as e:
-        print(f"Error fetching batch: {e}")
+            tags_list = snippet.get("tags") or []
+            tags_text = "; ".join(tags_list)
+
+            results[vid] = {
+                "Channel": clean_text(snippet.get("channelTitle")),
+                "ChannelID": snippet.get("channelId", ""),
+                "Duration": parse_iso_duration(content_details.get("duration")), # Converted from ISO 8601
+                "OriginalLanguage": clean_text(
+                    snippet.get("defaultAudioLanguage") or snippet.get("defaultLanguage") or "Unknown"
+                ),
+                "Title": clean_text(snippet.get("title")), # Update title from API as it's cleaner than scraped
+                "Description": clean_text(snippet.get("description") or ""),
+                "Tags": clean_text(tags_text)
+            }
+    return results
+
+
+def fetch_channel_details_batch(channel_ids, keys):
+    """
+    Fetches subscriber count, country and topic categories for up to 50
+    channel IDs in one channels.list call. None if the call failed.
+    """
+    if not channel_ids:
         return {}
 
-def main():
+    params = {
+        "part": "snippet,statistics,topicDetails",
+        "fields": CHANNEL_FIELDS,
+        "id": ",".join(channel_ids),
+    }
+    data = api_get("channels", params, keys)
+    if data is None:
+        return None
+
+    results = {}
+    for item in data.get("items", []):
+        statistics = item.get("statistics", {})
+        hidden = statistics.get("hiddenSubscriberCount")
+        topics = item.get("topicDetails", {}).get("topicCategories") or []
+        results[item["id"]] = {
+            "subscribers": "" if hidden else statistics.get("subscriberCount", ""),
+            "country": item.get("snippet", {}).get("country", ""),
+            "topics": [topic_name(t) for t in topics],
+        }
+    return results
+
+
+def enrich_channels(channel_ids, keys, batch_size=50, store=None, deferred=None, flush=False):
+    """
+    Fetches unknown channels into the persistent channel store, one
+    channels.list call per 50 distinct channels.
+
+    Channels that are only stale keep their stored data for now and wait in
+    `deferred` (a dict used as an ordered set, shared across chunks). They
+    fill the free slots of calls made for unknown channels, or go out once a
+    full batch is waiting; `flush` fetches whatever is left. IDs the API does
+    not return are stored as missing, so later chunks and runs skip them.
+    """
+    store = store or ChannelStore()
+    metrics = get_metrics()
+    deferred = {} if deferred is None else deferred
+    unknown = []
+    for channel_id in store.stale_ids(channel_ids):
+        if store.get(channel_id) is None:
+            unknown.append(channel_id)
+        else:
+            deferred[channel_id] = None
+    metrics.incr("cache_hits", len(channel_ids) - len(unknown))
+
+    waiting = list(deferred)
+    if flush:
+        count = len(waiting)
+    else:
+        fill = min(len(waiting), -len(unknown) % batch_size)
+        count = fill + (len(waiting) - fill) // batch_size * batch_size
+    for channel_id in waiting[:count]:
+        del deferred[channel_id]
+    queue = unknown + waiting[:count]
+    if channel_ids or queue:
+        print(
+            f"Channels: {len(channel_ids)} distinct, {len(unknown)} not in the channel store; "
+            f"refreshing {count} stale, {len(deferred)} stale waiting for a full batch."
+        )
+
+    for i in range(0, len(queue), batch_size):
+        batch = queue[i:i + batch_size]
+        with metrics.phase("fetch_channels"):
+            results = fetch_channel_details_batch(batch, keys)
+        if results is None:
+            continue
+        for channel_id in batch:
+            if channel_id in results:
+                store.update(channel_id, results[channel_id])
+            else:
+                store.mark_missing(channel_id)
+        metrics.incr("channels_fetched", len(results))
+        metrics.incr("channels_missing", len(batch) - len(results))
+        time.sleep(0.5)
+
+    if queue:
+        store.save()
+    return store
+
+# Description and Tags go to the text store (utils/text_store.py), not the CSV.
+OUTPUT_FIELDS = [
+    'Date',
+    'Title',
+    'Channel',
+    'Duration',
+    'OriginalLanguage',
+    'VideoID',
+    'Link',
+    'ViewCount',
+    'FirstWatched',
+    'LastWatched',
+    'WatchDates',
+    'ChannelID',
+    'ChannelSubscribers',
+    'ChannelCountry',
+    'ChannelTopics'
+]
+
+
+def merge_details(row, details, channel_store):
+    """Fills the output columns of one row from its video details and the channel store."""
+    metrics = get_metrics()
+    if details:
+        metrics.incr("videos_enriched")
+        # Update/Add fields
+        row['Channel'] = details.get('Channel', '')
+        row['Duration'] = details.get('Duration', '')
+        row['OriginalLanguage'] = details.get('OriginalLanguage', '')
+        # Optional: Overwrite title if API title is preferred
+        row['Title'] = details.get('Title', row['Title'])
+        row['Description'] = details.get('Description', '')
+        row['Tags'] = details.get('Tags', '')
+        row['ChannelID'] = details.get('ChannelID', '')
+    else:
+        metrics.incr("videos_missing")
+        # Maybe deleted video or private?
+        row['Channel'] = "Unknown"
+        row['Duration'] = ""
+        row['OriginalLanguage'] = "Unknown"
+        row['Description'] = ""
+        row['Tags'] = ""
+        row['ChannelID'] = ""
+
+    channel = channel_store.get(row['ChannelID']) if row['ChannelID'] else None
+    row['ChannelSubscribers'] = channel.get('subscribers', '') if channel else ''
+    row['ChannelCountry'] = channel.get('country', '') if channel else ''
+    row['ChannelTopics'] = "; ".join(channel.get('topics', [])) if channel else ''
+
+    # Ensure key text fields are single-line and clean
+    row['Title'] = clean_text(row.get('Title', ''))
+    row['Channel'] = clean_text(row.get('Channel', ''))
+    row['OriginalLanguage'] = clean_text(row.get('OriginalLanguage', ''))
+    row['Description'] = clean_text(row.get('Description', ''))
+    row['Tags'] = clean_text(row.get('Tags', ''))
+
+
+def main(sink=None):
+    """
+    Enriches Step 3 output. With a `sink` (steps/04_05_stream.py), every
+    enriched chunk is also handed over as sink(fieldnames, rows) once written,
+    so Step 5 can start on it right away.
+    """
     print("Starting Metadata Enrichment (Step 4)...")
+    metrics = step_metrics("04_enrich_metadata")
     load_env()
-    api_key = os.getenv("YOU_TUBE_API_KEY")
+    # YOU_TUBE_API_KEYS (comma-separated) and/or YOU_TUBE_API_KEY.
+    keys = ApiKeyPool.from_env()
     
-    if not api_key:
-        print("Error: YOU_TUBE_API_KEY not found in .env")
+    if not keys:
+        print("Error: YOU_TUBE_API_KEY (or YOU_TUBE_API_KEYS) not found in .env")
         return
 
-    input_file = os.path.join("data", "03_unique_ids.csv")
-    output_file = os.path.join("data", "04_enriched.csv")
+    # In preview mode (main.py --preview) these are the _preview sample files.
+    input_file = data_file("03_unique_ids.csv")
+    output_file = data_file("04_enriched.csv")
     
     if not os.path.exists(input_file):
         print("Input file not found.")
         return
-        
-    # Read unique IDs
-    videos_to_process = [] # List of dicts
-    with open(input_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        videos_to_process = list(reader)
-        
-    enrichment_map = {}
-    
-    # Process in batches of 50
+
+    refresh = os.getenv("WAREHOUSE_REFRESH", "0") == "1"
+    warehouse = open_warehouse()
+    # In batch mode other accounts may already have fetched the same videos.
+    shared_cache = open_shared_cache()
+    key_text = f" across {len(keys)} API keys" if len(keys) > 1 else ""
+    print(f"YouTube quota remaining today before ceiling: {keys.remaining()} units{key_text}")
+    channel_store = ChannelStore()
+    refresh_channels = True
+    # Stale channels waiting to be refreshed in a full channels.list batch.
+    deferred_channels = {}
+    text_store = TextStore()
+    if warehouse:
+        moved = warehouse.move_text_to(text_store)
+        if moved:
+            print(f"Moved descriptions and tags of {moved} videos from the warehouse to {text_store.path}.")
+
+    # Rows are streamed through in chunks: look up, fetch, merge and write one
+    # chunk before reading the next, so memory does not grow with the history.
+    # When streaming into Step 5, a chunk is one videos.list batch by default.
+    chunk_size = max(50, int(os.getenv("ENRICH_CHUNK_SIZE", "50" if sink else "2000")))
     batch_size = 50
-    total_videos = len(videos_to_process)
-    
-    print(f"Processing {total_videos} videos in batches of {batch_size}...")
-    
-    for i in range(0, total_videos, batch_size):
-        batch = videos_to_process[i:i+batch_size]
-        batch_ids = [v['VideoID'] for v in batch]
-        
-        print(f"  Fetching batch {i//batch_size + 1} ({len(batch_ids)} videos)...")
-        results = fetch_video_details_batch(batch_ids, api_key)
-        enrichment_map.update(results)
-        
-        # Rate limit helpfulness
-        time.sleep(0.5)
-        
-    # Merge data
-    enriched_rows = []
-    
-    for row in videos_to_process:
-        vid = row['VideoID']
-        details = enrichment_map.get(vid)
-        
-        if details:
-            # Update/Add fields
-            row['Channel'] = details.get('Channel', '')
-            row['Duration'] = details.get('Duration', '')
-            row['OriginalLanguage'] = details.get('OriginalLanguage', '')
-            # Optional: Overwrite title if API title is preferred
-            row['Title'] = details.get('Title', row['Title'])
-            row['Description'] = details.get('Description', '')
-            row['Tags'] = details.get('Tags', '')
-        else:
-            # Maybe deleted video or private?
-            row['Channel'] = "Unknown"
-            row['Duration'] = ""
-            row['OriginalLanguage'] = "Unknown"
-            row['Description'] = ""
-            row['Tags'] = ""
-
-        # Ensure key text fields are single-line and clean
-        row['Title'] = clean_text(row.get('Title', ''))
-        row['Channel'] = clean_text(row.get('Channel', ''))
-        row['OriginalLanguage'] = clean_text(row.get('OriginalLanguage', ''))
-        row['Description'] = clean_text(row.get('Description', ''))
-        row['Tags'] = clean_text(row.get('Tags', ''))
-        
-        enriched_rows.append(row)
-        
-    # Write output
-    fieldnames = [
-        'Date',
-        'Title',
-        'Channel',
-        'Duration',
-        'OriginalLanguage',
-        'VideoID',
-        'Link',
-        'Description',
-        'Tags'
-    ]
-    
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(enriched_rows)
+    rows_in = 0
+    new_total = 0
+    tmp_output = f"{output_file}.tmp"
+
+    # The text store is saved however the loop ends (quota stop, aborted stream):
+    # chunks already upserted into the warehouse are never fetched again, so
+    # their buffered descriptions and tags must not be lost.
+    try:
+        with open(input_file, 'r', encoding='utf-8', newline='') as f_in, \
+                open(tmp_output, 'w', newline='', encoding='utf-8') as f_out:
+            header, records = read_records(f_in, extra_fields=OUTPUT_FIELDS + list(TEXT_FIELDS))
+            # Preview samples carry their stratum and weight through to Step 6.
+            fieldnames = OUTPUT_FIELDS + [name for name in SAMPLE_FIELDS if name in header]
+            writer = csv.DictWriter(f_out, fieldnames=fieldnames, extrasaction='ignore')
+            writer.writeheader()
+
+            for chunk in chunked(records, chunk_size):
+                rows_in += len(chunk)
+                ids_to_fetch = [row['VideoID'] for row in chunk]
+                enrichment_map = {}
+                # Videos new to this warehouse, whether fetched now or found in the shared cache.
+                new_ids = set()
+
+                # Only fetch videos the warehouse has never enriched (the delta).
+                if warehouse and not refresh:
+                    known = warehouse.enriched(ids_to_fetch)
+                    enrichment_map.update(known)
+                    ids_to_fetch = [vid for vid in ids_to_fetch if vid not in known]
+                    metrics.incr("warehouse_hits", len(known))
+                if shared_cache and ids_to_fetch and not refresh:
+                    shared = shared_cache.video_details(ids_to_fetch)
+                    enrichment_map.update(shared)
+                    ids_to_fetch = [vid for vid in ids_to_fetch if vid not in shared]
+                    new_ids.update(shared)
+                    metrics.incr("shared_cache_hits", len(shared))
+
+                print(
+                    f"Rows {rows_in - len(chunk) + 1}-{rows_in}: {len(chunk) - len(ids_to_fetch)} known, "
+                    f"fetching {len(ids_to_fetch)} in batches of {batch_size}..."
+                )
+                for i in range(0, len(ids_to_fetch), batch_size):
+                    batch_ids = ids_to_fetch[i:i+batch_size]
+                    try:
+                        with metrics.phase("fetch"):
+                            results = fetch_video_details_batch(batch_ids, keys)
+                    except (QuotaCeilingReached, NoUsableApiKey) as e:
+                        if isinstance(e, NoUsableApiKey):
+                            print(f"Error: {e}. Check YOU_TUBE_API_KEY / YOU_TUBE_API_KEYS.")
+                        else:
+                            print(f"Error: {e}. Stopping before the daily limit; rerun after the quota resets.")
+                        f_out.close()
+                        os.remove(tmp_output)
+                        sys.exit(1)
+                    enrichment_map.update(results)
+                    new_ids.update(results)
+                    if shared_cache:
+                        shared_cache.store_video_details(results)
+
+                    # Rate limit helpfulness
+                    with metrics.phase("rate_limit_sleep"):
+                        time.sleep(0.5)
+
+                channel_ids = list(dict.fromkeys(
+                    d["ChannelID"] for d in enrichment_map.values() if d.get("ChannelID")
+                ))
+                if refresh_channels:
+                    try:
+                        enrich_channels(channel_ids, keys, store=channel_store, deferred=deferred_channels)
+                    except (QuotaCeilingReached, NoUsableApiKey) as e:
+                        print(f"Warning: {e}. Skipping channel refresh; using stored channel data.")
+                        refresh_channels = False
+
+                # Merge data
+                for row in chunk:
+                    merge_details(row, enrichment_map.get(row['VideoID']), channel_store)
+                    if row['VideoID'] in new_ids:
+                        text_store.put(row['VideoID'], row['Description'], row['Tags'], replace=refresh)
+                with metrics.phase("write"):
+                    writer.writerows(chunk)
+
+                if warehouse and new_ids:
+                    with metrics.phase("warehouse"):
+                        warehouse.upsert_enrichment(
+                            row.to_dict() for row in chunk if row['VideoID'] in new_ids
+                        )
+                    new_total += len(new_ids)
+                if sink:
+                    sink(fieldnames, chunk)
+
+            if refresh_channels and deferred_channels:
+                try:
+                    enrich_channels([], keys, store=channel_store, deferred=deferred_channels, flush=True)
+                except (QuotaCeilingReached, NoUsableApiKey) as e:
+                    print(f"Warning: {e}. Stale channels will be refreshed on the next run.")
+    finally:
+        with metrics.phase("text_store"):
+            text_store.close()
+
+    os.replace(tmp_output, output_file)
+    metrics.set("rows_in", rows_in)
+    metrics.set("rows_out", rows_in)
+    print(keys.summary())
+
+    if shared_cache:
+        shared_cache.close()
+    if warehouse:
+        warehouse.close()
+        print(f"Warehouse updated with {new_total} newly enriched videos.")
         
     print(f"Enriched data saved to {output_file}")
 
 if __name__ == "__main__":
-    main()
+    run_entry(main, "04_enrich_metadata")
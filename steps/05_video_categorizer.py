@@ -1,32 +1,54 @@
+import contextlib
 import csv
+import json
 import os
 import sys
 import time
 import re
-
-from groq import Groq
+from collections import Counter
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from utils.env_loader import load_env
+    from utils.categories import VALID_CATEGORIES, VALID_CATEGORY_MAP, load_channel_categories
+    from utils.local_classifier import DEFAULT_THRESHOLD, load_classifier
+    from utils.keyword_rules import load_rule_engine
+    from utils.prompt_compaction import PromptStats, compact_description, compact_tags
+    from utils.llm_backends import create_backend, create_cascade_backend
+    from utils.metrics import get_metrics, step_metrics
+    from utils.warehouse import open_warehouse
+    from utils.shared_cache import open_shared_cache
+    from utils.records import chunked, count_records, read_records, remap_records
+    from utils.text_store import TEXT_FIELDS, TextStore
+    from utils.minhash import load_near_duplicate_index
+    from utils.sampling import data_file
+    from utils.profiling import run_entry
 except ImportError:
     from utils.env_loader import load_env
-
-VALID_CATEGORIES = [
-    "AI and coding",
-    "F1",
-    "Football",
-    "Basketball",
-    "News",
-    "Humor",
-    "Popular Science",
-    "History",
-    "Superheroes",
-    "Other",
-]
-
-VALID_CATEGORY_MAP = {c.lower(): c for c in VALID_CATEGORIES}
+    from utils.categories import VALID_CATEGORIES, VALID_CATEGORY_MAP, load_channel_categories
+    from utils.local_classifier import DEFAULT_THRESHOLD, load_classifier
+    from utils.keyword_rules import load_rule_engine
+    from utils.prompt_compaction import PromptStats, compact_description, compact_tags
+    from utils.llm_backends import create_backend, create_cascade_backend
+    from utils.metrics import get_metrics, step_metrics
+    from utils.warehouse import open_warehouse
+    from utils.shared_cache import open_shared_cache
+    from utils.records import chunked, count_records, read_records, remap_records
+    from utils.text_store import TEXT_FIELDS, TextStore
+    from utils.minhash import load_near_duplicate_index
+    from utils.sampling import data_file
+    from utils.profiling import run_entry
+
+# Cascade mode (LLM_CASCADE_MODEL): the small model's answer is kept unless it
+# is unusable or a cheap local signal confidently disagrees with it. A channel
+# listed in channel_categories.json is a signal; any other channel becomes one
+# once CASCADE_CHANNEL_MIN_VIDEOS of its videos are labeled in the run and
+# CASCADE_CHANNEL_MIN_SHARE of them share one category.
+CASCADE_CHANNEL_MIN_VIDEOS = 3
+CASCADE_CHANNEL_MIN_SHARE = 0.8
+DEFAULT_CASCADE_MIN_CONFIDENCE = 0.5
+DEFAULT_CASCADE_ATTEMPTS = 1
 
 
 def print_flush(*args, **kwargs):
@@ -43,15 +65,15 @@ def clean_text(value):
     return text.strip()
 
 
-def setup_groq_client():
+def setup_llm_backend():
     load_env()
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise ValueError("GROQ_API_KEY not found in .env")
-    return Groq(api_key=api_key)
+    return create_backend()
 
 
-def build_prompt(title, description, tags):
+def build_prompt(title, description, tags, compact=True):
+    if compact:
+        description = compact_description(description)
+        tags = compact_tags(tags)
     title = title or "Unknown"
     description = description or "None"
     tags = tags or "None"
@@ -99,25 +121,36 @@ def normalize_category(text):
     return None
 
 
-def categorize_video(client, title, description, tags, max_attempts=5):
-    prompt = build_prompt(title, description, tags)
+def categorize_video(backend, title, description, tags, max_attempts=5, stats=None, compact=True):
+    """
+    The category `backend` gives the video, or None when every attempt fails
+    (rate limits, errors, unusable replies), so callers do not mistake the
+    failure for a label.
+    """
+    prompt = build_prompt(title, description, tags, compact=compact)
+    if stats is not None:
+        full_prompt = prompt if not compact else build_prompt(title, description, tags, compact=False)
+        stats.record_prompt(full_prompt, prompt)
     attempt = 0
+    metrics = get_metrics()
 
     while attempt < max_attempts:
         attempt += 1
+        metrics.incr("api_calls")
+        if attempt > 1:
+            metrics.incr("retries")
+        if stats is not None:
+            stats.record_request(prompt)
         try:
-            completion = client.chat.completions.create(
-                model=os.getenv("GROQ_MODEL", "moonshotai/kimi-k2-instruct"),
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0,
-                max_tokens=10,
-                top_p=0.95,
-            )
-            raw = (completion.choices[0].message.content or "").strip()
+            raw = backend.complete(prompt, max_tokens=10, temperature=0, top_p=0.95).strip()
             category = normalize_category(raw)
             if category:
                 return category
 
+            metrics.incr("invalid_responses")
+            if attempt == max_attempts:
+                print_flush(f"Warning: Unexpected category response '{raw}' from {backend.model}.")
+                break
             print_flush(
                 f"Warning: Unexpected category response '{raw}'. Retrying ({attempt}/{max_attempts})..."
             )
@@ -126,41 +159,93 @@ def categorize_video(client, title, description, tags, max_attempts=5):
             err = str(e).lower()
             if "429" in err or "rate limit" in err:
                 wait_time = min(60 * (1.5 ** (attempt - 1)), 120)
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after:
+                    try:
+                        wait_time = min(float(retry_after), 120)
+                    except ValueError:
+                        pass
                 print_flush(
                     f"Rate limit error. Waiting {wait_time:.1f}s (attempt {attempt}/{max_attempts})..."
                 )
+                metrics.incr("rate_limit_waits")
+                metrics.incr("rate_limit_wait_seconds", wait_time)
                 time.sleep(wait_time)
             else:
+                metrics.incr("api_errors")
                 print_flush(
-                    f"Groq error: {e}. Retrying ({attempt}/{max_attempts})..."
+                    f"{backend.name} error: {e}. Retrying ({attempt}/{max_attempts})..."
                 )
-                time.sleep(3)
+                if attempt < max_attempts:
+                    time.sleep(3)
 
-    return "Other"
+    return None
 
 
-def main():
+def channel_prior(votes):
+    """The category a channel's labeled videos (a Counter) overwhelmingly share, or None."""
+    total = sum(votes.values())
+    if total < CASCADE_CHANNEL_MIN_VIDEOS:
+        return None
+    category, count = votes.most_common(1)[0]
+    return category if count / total >= CASCADE_CHANNEL_MIN_SHARE else None
+
+
+def escalation_reason(category, signals):
+    """
+    Why a small-model answer goes to the main model: "invalid" when there is
+    no usable answer, else the name of the first (name, category) signal
+    that disagrees with it. None keeps the answer.
+    """
+    if category is None:
+        return "invalid"
+    for name, expected in signals:
+        if expected and expected != category:
+            return name
+    return None
+
+
+def main(backend=None, source=None):
+    """
+    Categorizes Step 4 output. An already-built LLM `backend` (e.g. the
+    daemon's) can be passed in. `source` = (fieldnames, rows, total) takes
+    Step 4's rows in-process while it is still running
+    (steps/04_05_stream.py) instead of reading its CSV.
+    """
     print("Starting Video Categorization (Step 5)...")
+    metrics = step_metrics("05_video_categorizer")
 
-    input_file = os.path.join("data", "04_enriched.csv")
-    output_file = os.path.join("data", "05_categorized.csv")
+    input_file = data_file("04_enriched.csv")
+    output_file = data_file("05_categorized.csv")
 
-    if not os.path.exists(input_file):
+    if source is None and not os.path.exists(input_file):
         print(f"Input file {input_file} not found. Run step 4 first.")
         return
 
+    owns_backend = backend is None
+    if owns_backend:
+        try:
+            backend = setup_llm_backend()
+        except Exception as e:
+            print(f"Error setting up LLM backend: {e}")
+            return
+
     try:
-        client = setup_groq_client()
+        small_backend = create_cascade_backend()
     except Exception as e:
-        print(f"Error setting up Groq client: {e}")
-        return
-
-    with open(input_file, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        fieldnames = reader.fieldnames or []
-
-    if not rows:
+        print(f"Warning: Could not set up the cascade model ({e}); using {backend.model} only.")
+        small_backend = None
+    if small_backend:
+        cascade_attempts = max(1, int(os.getenv("LLM_CASCADE_ATTEMPTS", DEFAULT_CASCADE_ATTEMPTS)))
+        cascade_min_confidence = float(os.getenv("LLM_CASCADE_MIN_CONFIDENCE", DEFAULT_CASCADE_MIN_CONFIDENCE))
+        print_flush(f"Cascade mode: {small_backend.model} first, escalating to {backend.model}.")
+        channel_categories = load_channel_categories()
+        if channel_categories:
+            print_flush(f"Channel categories loaded ({len(channel_categories)} channels).")
+
+    total = source[2] if source else count_records(input_file)
+    metrics.set("rows_in", total)
+    if not total:
         print("No rows found to categorize.")
         return
 
@@ -171,46 +256,345 @@ def main():
         "Duration",
         "OriginalLanguage",
         "Category",
+        "CategorySource",
         "VideoID",
         "Link",
-        "Description",
-        "Tags",
+        "ViewCount",
+        "FirstWatched",
+        "LastWatched",
+        "WatchDates",
+        "ChannelID",
+        "ChannelSubscribers",
+        "ChannelCountry",
+        "ChannelTopics",
     ]
 
-    if "Category" not in fieldnames:
-        fieldnames = fieldnames + ["Category"]
+    rule_engine = load_rule_engine()
+    if rule_engine:
+        print_flush(f"Keyword rules loaded ({len(rule_engine.keywords)} keywords).")
+
+    classifier = load_classifier()
+    threshold = None
+    if classifier:
+        threshold = float(
+            os.getenv("LOCAL_CLASSIFIER_THRESHOLD", classifier.meta.get("threshold", DEFAULT_THRESHOLD))
+        )
+        print_flush(f"Local classifier loaded (confidence threshold {threshold:.2f}).")
 
-    # Enforce desired column order, while preserving any unexpected fields at the end
-    extra_fields = [f for f in fieldnames if f not in desired_order]
-    fieldnames = [f for f in desired_order if f in fieldnames] + extra_fields
+    # Videos categorized in an earlier run keep their stored category.
+    refresh = os.getenv("WAREHOUSE_REFRESH", "0") == "1"
+    warehouse = open_warehouse()
+    known_categories = {}
+    # In batch mode, categories other accounts already paid for are reused too.
+    shared_cache = open_shared_cache()
+    shared_categories = {}
 
-    total = len(rows)
     print_flush(f"Categorizing {total} videos...")
 
-    categorized_rows = []
-    for idx, row in enumerate(rows, start=1):
-        channel = clean_text(row.get("Channel", ""))
-        title = clean_text(row.get("Title", ""))
-        description = clean_text(row.get("Description", ""))
-        tags = clean_text(row.get("Tags", ""))
-
-        category = categorize_video(client, title, description, tags)
-        row["Category"] = category
-
-        categorized_rows.append(row)
-        display_channel = channel if channel else "Unknown Channel"
-        display_title = title if title else "Untitled"
-        print_flush(
-            f"[{idx}/{total}] {display_channel} | {display_title[:60]} -> {category}"
-        )
-
-    with open(output_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+    # Re-uploads, clips and episodes of a series have near-identical titles
+    # and tags: only one video per cluster goes to the LLM, the rest reuse its label.
+    near_duplicates = load_near_duplicate_index()
+    if near_duplicates:
+        print_flush(f"Near-duplicate clustering on (similarity threshold {near_duplicates.threshold:.2f}).")
+    # Label and size per indexed representative; dropped with it when the index evicts it.
+    cluster_labels = {}
+    cluster_sizes = {}
+    cluster_count = 0
+    largest_cluster = 0
+    # Representatives the LLM failed on: their near-duplicates go to the LLM themselves.
+    failed_representatives = set()
+
+    source_counts = {
+        "warehouse": 0, "shared": 0, "rules": 0, "local": 0, "cluster": 0, "llm_small": 0, "llm": 0,
+        "failed": 0,
+    }
+    # Cascade mode: labels seen per channel so far (for channels missing from
+    # channel_categories.json), and why answers were escalated.
+    channel_votes = {}
+    escalations = Counter()
+    prompt_stats = PromptStats()
+    # Description and Tags live in the text store; they are only read for
+    # videos that still need a label after the warehouse/shared cache lookup.
+    text_store = TextStore()
+
+    def stored_category(video_id):
+        """(category, the stage that originally labeled it, "warehouse"/"shared") for reused labels."""
+        if video_id in known_categories:
+            return known_categories[video_id] + ("warehouse",)
+        if video_id in shared_categories:
+            return shared_categories[video_id] + ("shared",)
+        return None, None, None
+
+    def prefilter(title, description, tags):
+        """(category, source, classifier guess); the guess is kept for the cascade's agreement check."""
+        if rule_engine:
+            category = rule_engine.match(title, tags)
+            if category:
+                return category, "rules", None
+        if classifier:
+            predicted, confidence = classifier.predict(title, description, tags)
+            if confidence >= threshold:
+                return predicted, "local", None
+            return None, "llm", (predicted, confidence)
+        return None, "llm", None
+
+    def channel_key(row):
+        return row.get("ChannelID") or clean_text(row.get("Channel", ""))
+
+    def cascade_signals(item):
+        """(name, category) signals the small model's answer for `item` is checked against."""
+        signals = []
+        guess = item[4]
+        if guess and guess[1] >= cascade_min_confidence:
+            signals.append(("classifier", guess[0]))
+        expected = channel_categories.get(clean_text(item[0].get("Channel", "")))
+        if expected is None:
+            votes = channel_votes.get(channel_key(item[0]))
+            expected = channel_prior(votes) if votes else None
+        if expected:
+            signals.append(("channel", expected))
+        return signals
+
+    # Rows are streamed in blocks (one warehouse/cache lookup per block) and
+    # written as soon as they are labeled. Within a block, rows are handled in
+    # chunks so LLM-bound videos in a chunk can be sent concurrently
+    # (LLM_CONCURRENCY) while output order stays unchanged.
+    block_size = max(1, int(os.getenv("CATEGORIZE_BLOCK_SIZE", "1000")))
+    chunk_size = max(1, int(os.getenv("LLM_BATCH_SIZE", backend.concurrency * 4)))
+
+    idx = 0
+    tmp_output = f"{output_file}.tmp"
+    with contextlib.ExitStack() as stack:
+        f_out = stack.enter_context(open(tmp_output, "w", newline="", encoding="utf-8"))
+        if source:
+            fieldnames, records = remap_records(source[1], source[0], extra_fields=["Category", "CategorySource"])
+        else:
+            f_in = stack.enter_context(open(input_file, "r", encoding="utf-8", newline=""))
+            fieldnames, records = read_records(f_in, extra_fields=["Category", "CategorySource"])
+        # CSVs from before the text store carry the text inline; keep reading it but drop it from the output.
+        inline_text = "Description" in fieldnames
+        fieldnames = [f for f in fieldnames if f not in TEXT_FIELDS]
+        # CategorySource records which stage produced each label (llm, llm_small, local, rules,
+        # cluster), so tools/train_classifier.py can train on LLM labels only.
+        fieldnames = fieldnames + [f for f in ("Category", "CategorySource") if f not in fieldnames]
+        # Enforce desired column order, while preserving any unexpected fields at the end
+        extra_fields = [f for f in fieldnames if f not in desired_order]
+        fieldnames = [f for f in desired_order if f in fieldnames] + extra_fields
+        writer = csv.DictWriter(f_out, fieldnames=fieldnames, extrasaction="ignore")
         writer.writeheader()
-        writer.writerows(categorized_rows)
+
+        for block in chunked(records, block_size):
+            block_ids = [row.get("VideoID", "") for row in block]
+            known_categories.clear()
+            shared_categories.clear()
+            if warehouse and not refresh:
+                known_categories.update(warehouse.categories(block_ids))
+            if shared_cache and not refresh:
+                shared_categories.update(
+                    shared_cache.categories(vid for vid in block_ids if vid not in known_categories)
+                )
+            new_labels = []
+
+            for chunk in chunked(block, chunk_size):
+                prepared = []
+                pending = []
+                unlabeled = [
+                    row.get("VideoID", "") for row in chunk
+                    if stored_category(row.get("VideoID", ""))[0] is None
+                ]
+                texts = {}
+                if unlabeled and not inline_text:
+                    with metrics.phase("text_store"):
+                        texts = text_store.get_many(unlabeled)
+                    metrics.incr("texts_loaded", len(texts))
+                for row in chunk:
+                    video_id = row.get("VideoID", "")
+                    category, origin, labeled_by = stored_category(video_id)
+                    if category is not None:
+                        row["CategorySource"] = origin
+                    if inline_text:
+                        description, tags = row.get("Description", ""), row.get("Tags", "")
+                    else:
+                        description, tags = texts.get(video_id, ("", ""))
+                    fields = (
+                        clean_text(row.get("Title", "")),
+                        clean_text(description),
+                        clean_text(tags),
+                    )
+                    guess = None
+                    if category is None:
+                        with metrics.phase("prefilter"):
+                            category, labeled_by, guess = prefilter(*fields)
+                    prepared.append([row, fields, category, labeled_by, guess])
+                    if category is None:
+                        pending.append(prepared[-1])
+
+                followers = {}
+                if near_duplicates:
+                    with metrics.phase("near_duplicates"):
+                        representatives = []
+                        for item in pending:
+                            video_id = item[0].get("VideoID", "")
+                            title, _, tags = item[1]
+                            signature = near_duplicates.signature(f"{title} {tags}")
+                            match, _ = near_duplicates.query(signature)
+                            if match is None or match in failed_representatives:
+                                representatives.append(item)
+                                if video_id:
+                                    for evicted in near_duplicates.add(video_id, signature):
+                                        cluster_labels.pop(evicted, None)
+                                        cluster_sizes.pop(evicted, None)
+                                        failed_representatives.discard(evicted)
+                                continue
+                            if match not in cluster_sizes:
+                                cluster_count += 1
+                            cluster_sizes[match] = cluster_sizes.get(match, 1) + 1
+                            largest_cluster = max(largest_cluster, cluster_sizes[match])
+                            item[3] = "cluster"
+                            if match in cluster_labels:
+                                item[2] = cluster_labels[match]
+                            else:
+                                # Its representative is in this chunk and still waiting for the LLM.
+                                followers.setdefault(match, []).append(item)
+                        pending = representatives
+
+                escalated = pending
+                if small_backend and pending:
+                    with metrics.phase("llm_small"):
+                        answers = small_backend.map(
+                            lambda item: categorize_video(
+                                small_backend, *item[1], max_attempts=cascade_attempts, stats=prompt_stats,
+                            ),
+                            pending,
+                        )
+                    escalated = []
+                    for item, category in zip(pending, answers):
+                        reason = escalation_reason(category, cascade_signals(item))
+                        if reason is None:
+                            item[2], item[3] = category, "llm_small"
+                        else:
+                            escalations[reason] += 1
+                            escalated.append(item)
+
+                with metrics.phase("llm"):
+                    llm_categories = backend.map(
+                        lambda item: categorize_video(backend, *item[1], stats=prompt_stats),
+                        escalated,
+                    )
+                for item, category in zip(escalated, llm_categories):
+                    item[2] = category
+                for item in pending:
+                    video_id = item[0].get("VideoID", "")
+                    for follower in followers.get(video_id, ()):
+                        follower[2] = item[2]
+                    if near_duplicates and video_id in near_duplicates:
+                        if item[2] is None:
+                            failed_representatives.add(video_id)
+                        else:
+                            cluster_labels[video_id] = item[2]
+
+                for row, (title, _, _), category, labeled_by, _ in prepared:
+                    idx += 1
+                    if category is None:
+                        # Every LLM attempt failed. "Other" goes to this run's CSV only; nothing is
+                        # stored or reused, so the next run asks the LLM again.
+                        category, labeled_by = "Other", "failed"
+                    source_counts[labeled_by] += 1
+                    row["Category"] = category
+                    if labeled_by not in ("warehouse", "shared"):
+                        row["CategorySource"] = labeled_by
+                    if small_backend and labeled_by != "failed":
+                        channel_votes.setdefault(channel_key(row), Counter())[category] += 1
+                    if labeled_by not in ("warehouse", "shared", "failed") and row.get("VideoID"):
+                        new_labels.append((row["VideoID"], category, labeled_by))
+
+                    channel = clean_text(row.get("Channel", ""))
+                    display_channel = channel if channel else "Unknown Channel"
+                    display_title = title if title else "Untitled"
+                    print_flush(
+                        f"[{idx}/{total}] {display_channel} | {display_title[:60]} -> {category} ({labeled_by})"
+                    )
+                writer.writerows(chunk)
+
+            if warehouse:
+                warehouse.upsert_categories(new_labels)
+            if shared_cache:
+                shared_cache.store_categories(new_labels)
+
+    os.replace(tmp_output, output_file)
+    metrics.set("rows_out", idx)
+
+    print(
+        f"Reused from warehouse: {source_counts['warehouse']}, shared cache: {source_counts['shared']}, "
+        f"keyword rules: {source_counts['rules']}, "
+        f"local classifier: {source_counts['local']}, near-duplicates: {source_counts['cluster']}, "
+        f"small LLM: {source_counts['llm_small']}, LLM: {source_counts['llm']}."
+    )
+    if source_counts["failed"]:
+        print(
+            f"LLM gave no usable answer for {source_counts['failed']} videos. They are written as Other "
+            f"(CategorySource failed) but not stored, so the next run retries them."
+        )
+    if small_backend:
+        escalated = sum(escalations.values())
+        answered = source_counts["llm_small"] + escalated
+        kept = (source_counts["llm_small"] / answered * 100) if answered else 0.0
+        reasons = ", ".join(f"{reason} {count}" for reason, count in escalations.most_common()) or "none"
+        print(
+            f"Cascade: {small_backend.model} answered {answered} videos and kept {source_counts['llm_small']} "
+            f"({kept:.1f}%); {escalated} escalated to {backend.model} ({reasons})."
+        )
+        metrics.set("cascade_escalations", escalated)
+        for reason, count in escalations.items():
+            metrics.set(f"cascade_escalated_{reason}", count)
+    if near_duplicates:
+        clustered = source_counts["cluster"]
+        llm_bound = clustered + source_counts["llm"]
+        saved = (clustered / llm_bound * 100) if llm_bound else 0.0
+        print(
+            f"Near-duplicate clustering: {clustered} videos took the label of one of "
+            f"{cluster_count} cluster representatives, saving {clustered} of {llm_bound} "
+            f"LLM calls ({saved:.1f}%). Largest cluster: {largest_cluster} videos."
+        )
+        metrics.set("near_duplicate_clusters", cluster_count)
+        metrics.set("llm_calls_saved_by_clustering", clustered)
+    for labeled_by, count in source_counts.items():
+        metrics.set(f"labeled_by_{labeled_by}", count)
+    metrics.set("prompt_tokens_sent", prompt_stats.sent_tokens)
+    metrics.set("prompt_tokens_saved", prompt_stats.full_tokens - prompt_stats.compact_tokens)
+    print(prompt_stats.summary())
+    tiers = [("llm", backend)]
+    if small_backend:
+        tiers.insert(0, ("llm_small", small_backend))
+    for prefix, tier in tiers:
+        tier.print_report()
+        llm_stats = tier.stats()
+        if llm_stats["requests"]:
+            metrics.set(f"{prefix}_requests", llm_stats["requests"])
+            for key in ("errors", "throughput_rps", "latency_p50", "latency_p95", "latency_p99"):
+                metrics.set(f"{prefix}_{key}", llm_stats[key])
+    if small_backend:
+        small_backend.close()
+    if owns_backend:
+        backend.close()
+    if rule_engine:
+        rule_engine.print_report()
+        hits_file = data_file("05_keyword_rule_hits.json")
+        with open(hits_file, "w", encoding="utf-8") as f:
+            json.dump(rule_engine.hit_report(), f, ensure_ascii=False, indent=2)
+
+    if warehouse:
+        with metrics.phase("rollups"):
+            days = warehouse.refresh_rollups()
+        print(f"Warehouse rollups refreshed for {days} watch days.")
+        warehouse.close()
+
+    if shared_cache:
+        shared_cache.close()
+    text_store.close()
 
     print(f"Categorized data saved to {output_file}")
 
 
 if __name__ == "__main__":
-    main()
+    run_entry(main, "05_video_categorizer")
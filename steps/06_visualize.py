@@ -1,10 +1,20 @@
 import os
-import re
 import sys
 
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from utils.metrics import step_metrics
+    from utils.profiling import run_entry
+    from utils.normalize import map_language, parse_duration_seconds
+    from utils.warehouse import Warehouse
+    from utils.sampling import chart_dir, data_file, preview_enabled, stratified_totals
+except ImportError:
+    from utils.metrics import step_metrics
+    from utils.profiling import run_entry
+    from utils.normalize import map_language, parse_duration_seconds
+    from utils.warehouse import Warehouse
+    from utils.sampling import chart_dir, data_file, preview_enabled, stratified_totals
 
 # Fix Unicode encoding for Windows console (just in case)
 try:
@@ -13,40 +23,18 @@ except AttributeError:
     pass
 
 
-def parse_duration_seconds(duration_str):
-    if not isinstance(duration_str, str):
-        return 0
-
-    value = duration_str.strip()
-    if not value:
-        return 0
-
-    # ISO 8601 like PT1H2M10S
-    if value.startswith("PT"):
-        pattern = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?")
-        match = pattern.fullmatch(value)
-        if not match:
-            return 0
-        hours, minutes, seconds = match.groups()
-        hours = int(hours) if hours else 0
-        minutes = int(minutes) if minutes else 0
-        seconds = int(seconds) if seconds else 0
-        return hours * 3600 + minutes * 60 + seconds
-
-    # HH:MM:SS or MM:SS
-    if ":" in value:
-        parts = value.split(":")
-        try:
-            if len(parts) == 2:
-                minutes, seconds = map(int, parts)
-                return minutes * 60 + seconds
-            if len(parts) == 3:
-                hours, minutes, seconds = map(int, parts)
-                return hours * 3600 + minutes * 60 + seconds
-        except ValueError:
-            return 0
-
-    return 0
+# pandas, numpy and matplotlib are imported on first use (load_dependencies):
+# they take most of this step's startup time.
+plt = np = pd = None
+
+
+def load_dependencies():
+    global plt, np, pd
+    if plt is not None:
+        return
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
 
 
 def format_time_display(seconds):
@@ -57,17 +45,6 @@ def format_time_display(seconds):
     return f"{minutes}m"
 
 
-def map_language(lang):
-    if not isinstance(lang, str) or not lang.strip():
-        return "Other"
-    value = lang.strip().lower()
-    if re.match(r"^ru($|[-_])", value) or "russian" in value or value == "rus":
-        return "Russian"
-    if re.match(r"^en($|[-_])", value) or "english" in value or "british" in value or value == "eng":
-        return "English"
-    return "Other"
-
-
 def pick_languages(columns):
     ordered = ["Russian", "English", "Other"]
     return [lang for lang in ordered if lang in columns]
@@ -106,25 +83,122 @@ def annotate_stacked_time(ax, x_values, values_seconds, bottoms_hours, min_displ
         )
 
 
+def count_label(value, margin=None):
+    if margin is None:
+        return f"{int(value)}"
+    return f"~{value:.0f} ±{margin:.0f}"
+
+
+def time_label(seconds, margin=None):
+    if margin is None:
+        return format_time_display(seconds)
+    return f"~{format_time_display(seconds)} ±{format_time_display(margin)}"
+
+
+def add_error_bars(ax, x_values, totals, margins):
+    if any(m is not None for m in margins):
+        ax.errorbar(x_values, totals, yerr=[m or 0 for m in margins], fmt="none", ecolor="black", capsize=4)
+
+
+def write_estimates(df, output_dir):
+    """
+    Estimated totals with 95% confidence intervals for a preview sample, per
+    category, language and channel; saved to estimates.csv and returned as
+    {(dimension, metric): {value: (estimate, margin)}}.
+    """
+    estimates = {}
+    rows = []
+    for dimension in ("Category", "LangGroup", "Channel"):
+        for metric, column in (("videos", None), ("watch_seconds", "SampleSeconds")):
+            values = df[column] if column else pd.Series(1.0, index=df.index)
+            groups = df[dimension].fillna("Unknown")
+            totals = stratified_totals(zip(df["Stratum"], df["Videos"], groups, values))
+            estimates[(dimension, metric)] = totals
+            for value, (estimate, margin) in totals.items():
+                rows.append({
+                    "Dimension": dimension,
+                    "Value": value,
+                    "Metric": metric,
+                    "Estimate": round(estimate, 1),
+                    "Low": round(max(estimate - margin, 0), 1),
+                    "High": round(estimate + margin, 1),
+                })
+    pd.DataFrame(rows).to_csv(os.path.join(output_dir, "estimates.csv"), index=False)
+
+    population = df["Videos"].sum()
+    print(f"Estimates for ~{population:.0f} videos from a sample of {len(df)} (95% confidence intervals):")
+    for dimension in ("Category", "LangGroup"):
+        counts = estimates[(dimension, "videos")]
+        times = estimates[(dimension, "watch_seconds")]
+        for value, (estimate, margin) in sorted(counts.items(), key=lambda item: -item[1][0]):
+            seconds, seconds_margin = times[value]
+            print(
+                f"  {value}: {estimate / population:.1%} ±{margin / population:.1%} of videos "
+                f"(~{estimate:.0f} ±{margin:.0f}), watch time {time_label(seconds, seconds_margin)}"
+            )
+    return estimates
+
+
 def main():
     print("Starting Visualization (Step 6)...")
+    load_dependencies()
+    metrics = step_metrics("06_visualize")
 
-    input_file = os.path.join("data", "05_categorized.csv")
-    output_dir = "output"
+    # In preview mode (main.py --preview) this charts the sample into output/preview/.
+    input_file = data_file("05_categorized.csv")
+    output_dir = chart_dir()
 
-    if not os.path.exists(input_file):
+    # VISUALIZE_SOURCE=warehouse charts any date range across all past runs
+    # (VISUALIZE_SINCE / VISUALIZE_UNTIL, YYYY-MM-DD) instead of this run's CSV.
+    from_warehouse = not preview_enabled() and os.getenv("VISUALIZE_SOURCE", "csv").lower() == "warehouse"
+
+    if not from_warehouse and not os.path.exists(input_file):
         print(f"Input file {input_file} not found. Run previous steps.")
         return
 
     os.makedirs(output_dir, exist_ok=True)
 
-    df = pd.read_csv(input_file)
+    with metrics.phase("load"):
+        if from_warehouse:
+            since = os.getenv("VISUALIZE_SINCE") or None
+            until = os.getenv("VISUALIZE_UNTIL") or None
+            warehouse = Warehouse()
+            df = pd.DataFrame(list(warehouse.history(since, until)))
+            warehouse.close()
+            print(f"Reading watch history from {warehouse.path} ({since or 'start'} to {until or 'now'}).")
+            if df.empty:
+                print("No watches in the warehouse for that range.")
+                return
+        else:
+            df = pd.read_csv(input_file)
+    metrics.set("rows_in", len(df))
     print(f"Loaded {len(df)} records.")
 
     df["DurationSeconds"] = df["Duration"].apply(parse_duration_seconds)
+    # Step 3 records how often each video was watched; older CSVs count every video once.
+    if "ViewCount" in df.columns:
+        df["Views"] = pd.to_numeric(df["ViewCount"], errors="coerce").fillna(1).clip(lower=1)
+    else:
+        df["Views"] = 1
+    df["SampleSeconds"] = df["DurationSeconds"] * df["Views"]
     df["LangGroup"] = df["OriginalLanguage"].apply(map_language)
     df["Category"] = df["Category"].fillna("Unknown")
 
+    # A preview sample row stands for SampleWeight videos of its stratum, so
+    # every count and time below is an estimate for the full history.
+    preview = "SampleWeight" in df.columns and "Stratum" in df.columns
+    estimates = {}
+    if preview:
+        df["Videos"] = pd.to_numeric(df["SampleWeight"], errors="coerce").fillna(1)
+        estimates = write_estimates(df, output_dir)
+    else:
+        df["Videos"] = 1
+    df["WatchSeconds"] = df["SampleSeconds"] * df["Videos"]
+    title_suffix = " (preview estimate)" if preview else ""
+
+    def margin(dimension, metric, value):
+        return estimates.get((dimension, metric), {}).get(value, (None, None))[1]
+
     plt.style.use("default")
     plt.rcParams["font.family"] = ["DejaVu Sans", "Arial", "sans-serif"]
     plt.rcParams["axes.grid"] = True
@@ -138,7 +212,7 @@ def main():
 
     # === Graph 1: Top Channels by Count (Language Breakdown) ===
     try:
-        channel_lang_counts = df.groupby(["Channel", "LangGroup"]).size().unstack(fill_value=0)
+        channel_lang_counts = df.groupby(["Channel", "LangGroup"])["Videos"].sum().unstack(fill_value=0)
         channel_totals = channel_lang_counts.sum(axis=1).sort_values(ascending=False)
         top_channels = channel_totals.head(10).index
         data = channel_lang_counts.loc[top_channels]
@@ -155,13 +229,15 @@ def main():
             annotate_stacked(plt.gca(), x, values, bottom, lambda v: f"{int(v)}", min_display=999999)
             bottom = bottom + values
 
+        margins = [margin("Channel", "videos", name) for name in top_channels]
+        add_error_bars(plt.gca(), x, channel_totals.loc[top_channels].values, margins)
         for idx, total in enumerate(channel_totals.loc[top_channels]):
-            plt.text(idx, total + 0.05, f"{int(total)}", ha="center", va="bottom", fontweight="bold", fontsize=10)
+            plt.text(idx, total + (margins[idx] or 0) + 0.05, count_label(total, margins[idx]), ha="center", va="bottom", fontweight="bold", fontsize=10)
 
-        max_total = channel_totals.loc[top_channels].max()
+        max_total = (channel_totals.loc[top_channels] + [m or 0 for m in margins]).max()
         plt.ylim(0, max_total * 1.05)
 
-        plt.title("Top 10 Channels by Video Count", fontsize=16, fontweight="bold", pad=20)
+        plt.title("Top 10 Channels by Video Count" + title_suffix, fontsize=16, fontweight="bold", pad=20)
         plt.xlabel("Channel", fontsize=12, fontweight="bold")
         plt.ylabel("Videos Watched", fontsize=12, fontweight="bold")
         plt.xticks(x, [name if len(name) <= 24 else name[:21] + "..." for name in top_channels], rotation=45, ha="right")
@@ -169,13 +245,14 @@ def main():
         plt.tight_layout()
         plt.savefig(os.path.join(output_dir, "top_channels_by_count.png"), dpi=300, bbox_inches="tight")
         plt.close()
+        metrics.incr("charts_written")
         print("Saved top_channels_by_count.png")
     except Exception as exc:
         print(f"Error generating channel count graph: {exc}")
 
     # === Graph 2: Top Channels by Watch Time (Language Breakdown) ===
     try:
-        channel_lang_time = df.groupby(["Channel", "LangGroup"])["DurationSeconds"].sum().unstack(fill_value=0)
+        channel_lang_time = df.groupby(["Channel", "LangGroup"])["WatchSeconds"].sum().unstack(fill_value=0)
         channel_time_totals = channel_lang_time.sum(axis=1).sort_values(ascending=False)
         top_time_channels = channel_time_totals.head(10).index
         data = channel_lang_time.loc[top_time_channels]
@@ -193,13 +270,16 @@ def main():
             annotate_stacked_time(plt.gca(), x, values_seconds, bottom, min_display_hours=9999)
             bottom = bottom + values_hours
 
+        margins = [margin("Channel", "watch_seconds", name) for name in top_time_channels]
+        margins_hours = [m / 3600 if m is not None else None for m in margins]
+        add_error_bars(plt.gca(), x, channel_time_totals.loc[top_time_channels].values / 3600, margins_hours)
         for idx, total_seconds in enumerate(channel_time_totals.loc[top_time_channels]):
-            plt.text(idx, (total_seconds / 3600) + 0.05, format_time_display(total_seconds), ha="center", va="bottom", fontweight="bold", fontsize=10)
+            plt.text(idx, (total_seconds / 3600) + (margins_hours[idx] or 0) + 0.05, time_label(total_seconds, margins[idx]), ha="center", va="bottom", fontweight="bold", fontsize=10)
 
-        max_total_hours = (channel_time_totals.loc[top_time_channels] / 3600).max()
+        max_total_hours = (channel_time_totals.loc[top_time_channels] / 3600 + [m or 0 for m in margins_hours]).max()
         plt.ylim(0, max_total_hours * 1.15)
 
-        plt.title("Top 10 Channels by Watch Time", fontsize=16, fontweight="bold", pad=20)
+        plt.title("Top 10 Channels by Watch Time" + title_suffix, fontsize=16, fontweight="bold", pad=20)
         plt.xlabel("Channel", fontsize=12, fontweight="bold")
         plt.ylabel("Watch Time (Hours)", fontsize=12, fontweight="bold")
         plt.xticks(x, [name if len(name) <= 24 else name[:21] + "..." for name in top_time_channels], rotation=45, ha="right")
@@ -207,13 +287,14 @@ def main():
         plt.tight_layout()
         plt.savefig(os.path.join(output_dir, "top_channels_by_time.png"), dpi=300, bbox_inches="tight")
         plt.close()
+        metrics.incr("charts_written")
         print("Saved top_channels_by_time.png")
     except Exception as exc:
         print(f"Error generating channel time graph: {exc}")
 
     # === Graph 3: Language Distribution by Count ===
     try:
-        language_counts = df["LangGroup"].value_counts()
+        language_counts = df.groupby("LangGroup")["Videos"].sum()
         languages = pick_languages(language_counts.index)
         values = [language_counts[lang] for lang in languages]
         colors = [language_colors[lang] for lang in languages]
@@ -232,9 +313,9 @@ def main():
             autotext.set_color("white")
             autotext.set_fontweight("bold")
         total_videos = int(sum(values))
-        stats_lines = [f"Total videos: {total_videos}"]
+        stats_lines = [f"Total videos: {'~' if preview else ''}{total_videos}"]
         for lang in languages:
-            stats_lines.append(f"{lang}: {int(language_counts[lang])}")
+            stats_lines.append(f"{lang}: {count_label(language_counts[lang], margin('LangGroup', 'videos', lang))}")
         plt.text(
             1.2,
             0.5,
@@ -242,17 +323,18 @@ def main():
             fontsize=10,
             bbox=dict(boxstyle="round,pad=0.3", facecolor="lightgray", alpha=0.8),
         )
-        plt.title("Language Distribution (Video Count)", fontsize=15, fontweight="bold", pad=20)
+        plt.title("Language Distribution (Video Count)" + title_suffix, fontsize=15, fontweight="bold", pad=20)
         plt.tight_layout()
         plt.savefig(os.path.join(output_dir, "language_distribution.png"), dpi=300, bbox_inches="tight")
         plt.close()
+        metrics.incr("charts_written")
         print("Saved language_distribution.png")
     except Exception as exc:
         print(f"Error generating language distribution graph: {exc}")
 
     # === Graph 4: Watch Time by Language ===
     try:
-        time_by_language = df.groupby("LangGroup")["DurationSeconds"].sum()
+        time_by_language = df.groupby("LangGroup")["WatchSeconds"].sum()
         languages = pick_languages(time_by_language.index)
         values = [time_by_language[lang] for lang in languages]
         colors = [language_colors[lang] for lang in languages]
@@ -271,9 +353,9 @@ def main():
             autotext.set_color("white")
             autotext.set_fontweight("bold")
         total_seconds = sum(values)
-        stats_lines = [f"Total time: {format_time_display(total_seconds)}"]
+        stats_lines = [f"Total time: {'~' if preview else ''}{format_time_display(total_seconds)}"]
         for lang in languages:
-            stats_lines.append(f"{lang}: {format_time_display(time_by_language[lang])}")
+            stats_lines.append(f"{lang}: {time_label(time_by_language[lang], margin('LangGroup', 'watch_seconds', lang))}")
         plt.text(
             1.2,
             0.5,
@@ -281,17 +363,18 @@ def main():
             fontsize=10,
             bbox=dict(boxstyle="round,pad=0.3", facecolor="lightgray", alpha=0.8),
         )
-        plt.title("Watch Time by Language", fontsize=15, fontweight="bold", pad=20)
+        plt.title("Watch Time by Language" + title_suffix, fontsize=15, fontweight="bold", pad=20)
         plt.tight_layout()
         plt.savefig(os.path.join(output_dir, "watch_time_by_language.png"), dpi=300, bbox_inches="tight")
         plt.close()
+        metrics.incr("charts_written")
         print("Saved watch_time_by_language.png")
     except Exception as exc:
         print(f"Error generating watch time by language graph: {exc}")
 
     # === Graph 5: Top Categories by Count (Language Breakdown) ===
     try:
-        category_lang_counts = df.groupby(["Category", "LangGroup"]).size().unstack(fill_value=0)
+        category_lang_counts = df.groupby(["Category", "LangGroup"])["Videos"].sum().unstack(fill_value=0)
         category_totals = category_lang_counts.sum(axis=1).sort_values(ascending=False)
         top_categories = category_totals.head(8).index
         data = category_lang_counts.loc[top_categories]
@@ -308,10 +391,12 @@ def main():
             annotate_stacked(plt.gca(), x, values, bottom, lambda v: f"{int(v)}", min_display=0)
             bottom = bottom + values
 
+        margins = [margin("Category", "videos", name) for name in top_categories]
+        add_error_bars(plt.gca(), x, category_totals.loc[top_categories].values, margins)
         for idx, total in enumerate(category_totals.loc[top_categories]):
-            plt.text(idx, total + 0.3, f"{int(total)}", ha="center", va="bottom", fontweight="bold", fontsize=10)
+            plt.text(idx, total + (margins[idx] or 0) + 0.3, count_label(total, margins[idx]), ha="center", va="bottom", fontweight="bold", fontsize=10)
 
-        plt.title("Top Categories by Video Count", fontsize=16, fontweight="bold", pad=20)
+        plt.title("Top Categories by Video Count" + title_suffix, fontsize=16, fontweight="bold", pad=20)
         plt.xlabel("Category", fontsize=12, fontweight="bold")
         plt.ylabel("Videos Watched", fontsize=12, fontweight="bold")
         plt.xticks(x, [name if len(name) <= 24 else name[:21] + "..." for name in top_categories], rotation=45, ha="right")
@@ -319,13 +404,14 @@ def main():
         plt.tight_layout()
         plt.savefig(os.path.join(output_dir, "categories_by_video_count.png"), dpi=300, bbox_inches="tight")
         plt.close()
+        metrics.incr("charts_written")
         print("Saved categories_by_video_count.png")
     except Exception as exc:
         print(f"Error generating category count graph: {exc}")
 
     # === Graph 6: Top Categories by Watch Time (Language Breakdown) ===
     try:
-        category_lang_time = df.groupby(["Category", "LangGroup"])["DurationSeconds"].sum().unstack(fill_value=0)
+        category_lang_time = df.groupby(["Category", "LangGroup"])["WatchSeconds"].sum().unstack(fill_value=0)
         category_time_totals = category_lang_time.sum(axis=1).sort_values(ascending=False)
         top_time_categories = category_time_totals.head(8).index
         data = category_lang_time.loc[top_time_categories]
@@ -343,13 +429,16 @@ def main():
             annotate_stacked_time(plt.gca(), x, values_seconds, bottom, min_display_hours=0.1)
             bottom = bottom + values_hours
 
+        margins = [margin("Category", "watch_seconds", name) for name in top_time_categories]
+        margins_hours = [m / 3600 if m is not None else None for m in margins]
+        add_error_bars(plt.gca(), x, category_time_totals.loc[top_time_categories].values / 3600, margins_hours)
         for idx, total_seconds in enumerate(category_time_totals.loc[top_time_categories]):
-            plt.text(idx, (total_seconds / 3600) + 0.05, format_time_display(total_seconds), ha="center", va="bottom", fontweight="bold", fontsize=10)
+            plt.text(idx, (total_seconds / 3600) + (margins_hours[idx] or 0) + 0.05, time_label(total_seconds, margins[idx]), ha="center", va="bottom", fontweight="bold", fontsize=10)
 
-        max_total_hours = (category_time_totals.loc[top_time_categories] / 3600).max()
+        max_total_hours = (category_time_totals.loc[top_time_categories] / 3600 + [m or 0 for m in margins_hours]).max()
         plt.ylim(0, max_total_hours * 1.15)
 
-        plt.title("Top Categories by Watch Time", fontsize=16, fontweight="bold", pad=20)
+        plt.title("Top Categories by Watch Time" + title_suffix, fontsize=16, fontweight="bold", pad=20)
         plt.xlabel("Category", fontsize=12, fontweight="bold")
         plt.ylabel("Watch Time (Hours)", fontsize=12, fontweight="bold")
         plt.xticks(x, [name if len(name) <= 24 else name[:21] + "..." for name in top_time_categories], rotation=45, ha="right")
@@ -357,6 +446,7 @@ def main():
         plt.tight_layout()
         plt.savefig(os.path.join(output_dir, "categories_by_watch_time.png"), dpi=300, bbox_inches="tight")
         plt.close()
+        metrics.incr("charts_written")
         print("Saved categories_by_watch_time.png")
     except Exception as exc:
         print(f"Error generating category time graph: {exc}")
@@ -365,4 +455,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    run_entry(main, "06_visualize")
@@ -0,0 +1,32 @@
+import http.client
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from fake_servers import start_llm
+from utils.llm_backends import OpenAICompatibleBackend
+
+
+def test_openai_backend_reuses_connections_across_map_calls(monkeypatch):
+    connects = []
+    original_connect = http.client.HTTPConnection.connect
+
+    def counting_connect(conn):
+        connects.append(conn)
+        return original_connect(conn)
+
+    monkeypatch.setattr(http.client.HTTPConnection, "connect", counting_connect)
+    server = start_llm()
+    backend = OpenAICompatibleBackend(server.url + "/v1", "fake", concurrency=4)
+    try:
+        for _ in range(50):
+            replies = backend.map(lambda i: backend.complete(f"Title: video {i}"), range(16))
+            assert len(replies) == 16
+        assert backend.stats()["requests"] == 800
+        assert len(connects) <= backend.concurrency
+        assert len(backend._idle) <= backend.concurrency
+    finally:
+        backend.close()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,86 @@
+import argparse
+import csv
+import hashlib
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from utils.categories import VALID_CATEGORY_MAP
+    from utils.prompt_compaction import PromptStats
+    from utils.step_loader import load_step
+    from utils.text_store import attach_text
+except ImportError:
+    from utils.categories import VALID_CATEGORY_MAP
+    from utils.prompt_compaction import PromptStats
+    from utils.step_loader import load_step
+    from utils.text_store import attach_text
+
+
+def sample_rows(path, size):
+    """Deterministic sample: the `size` labeled rows with the smallest VideoID hash."""
+    with open(path, "r", encoding="utf-8") as f:
+        # Rows the LLM failed on carry a placeholder "Other", not a label.
+        rows = [
+            r for r in csv.DictReader(f)
+            if (r.get("Category") or "").lower() in VALID_CATEGORY_MAP and r.get("CategorySource") != "failed"
+        ]
+    rows.sort(key=lambda r: hashlib.md5((r.get("VideoID") or r.get("Title", "")).encode("utf-8")).hexdigest())
+    return attach_text(rows[:size])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that compacted Step 5 prompts preserve category accuracy on a labeled sample."
+    )
+    parser.add_argument("--input", default=os.path.join("data", "05_categorized.csv"))
+    parser.add_argument("--sample", type=int, default=100)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=2.0,
+        help="Maximum allowed accuracy drop in percentage points",
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file {args.input} not found. Run step 5 first.")
+        return 1
+
+    step5 = load_step("05_video_categorizer")
+    backend = step5.setup_llm_backend()
+    rows = sample_rows(args.input, args.sample)
+    print(f"Checking prompt compaction on {len(rows)} labeled videos...")
+
+    results = {}
+    for mode, compact in (("full", False), ("compact", True)):
+        stats = PromptStats()
+        correct = 0
+        for row in rows:
+            category = step5.categorize_video(
+                backend,
+                step5.clean_text(row.get("Title")),
+                step5.clean_text(row.get("Description")),
+                step5.clean_text(row.get("Tags")),
+                stats=stats,
+                compact=compact,
+            )
+            correct += category == VALID_CATEGORY_MAP[row["Category"].lower()]
+        results[mode] = (correct / len(rows) * 100 if rows else 0.0, stats)
+        print(f"  {mode}: accuracy {results[mode][0]:.1f}%, {stats.sent_tokens} est. tokens sent")
+
+    full_acc, full_stats = results["full"]
+    compact_acc, compact_stats = results["compact"]
+    saved = full_stats.sent_tokens - compact_stats.sent_tokens
+    print(f"Token reduction: {saved} ({saved / max(full_stats.sent_tokens, 1):.1%})")
+
+    if full_acc - compact_acc > args.tolerance:
+        print(f"FAIL: compaction lowered accuracy by {full_acc - compact_acc:.1f} points.")
+        return 1
+    print("OK: accuracy preserved within tolerance.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import argparse
+import csv
+import hashlib
+import os
+import sys
+from collections import Counter
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from utils.categories import VALID_CATEGORY_MAP, load_channel_categories
+    from utils.keyword_rules import load_rule_engine
+    from utils.llm_backends import create_cascade_backend
+    from utils.local_classifier import DEFAULT_THRESHOLD, load_classifier
+    from utils.step_loader import load_step
+    from utils.text_store import attach_text
+except ImportError:
+    from utils.categories import VALID_CATEGORY_MAP, load_channel_categories
+    from utils.keyword_rules import load_rule_engine
+    from utils.llm_backends import create_cascade_backend
+    from utils.local_classifier import DEFAULT_THRESHOLD, load_classifier
+    from utils.step_loader import load_step
+    from utils.text_store import attach_text
+
+
+def channel_key(row):
+    return row.get("ChannelID") or (row.get("Channel") or "").strip()
+
+
+def load_rows(path):
+    """Labeled rows, and {channel: Counter of labels} over all of them."""
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [
+            r for r in csv.DictReader(f)
+            if (r.get("Category") or "").lower() in VALID_CATEGORY_MAP and r.get("CategorySource") != "failed"
+        ]
+    votes = {}
+    for row in rows:
+        row["Category"] = VALID_CATEGORY_MAP[row["Category"].lower()]
+        votes.setdefault(channel_key(row), Counter())[row["Category"]] += 1
+    return rows, votes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare Step 5's cascade mode (small model first) with the main model alone on a sample."
+    )
+    parser.add_argument("--input", default=os.path.join("data", "05_categorized.csv"))
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--cascade-model", help="Small model to test (default: LLM_CASCADE_MODEL)")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=2.0,
+        help="Maximum allowed disagreement with the main-model-only labels, in percentage points",
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file {args.input} not found. Run step 5 first.")
+        return 1
+
+    step5 = load_step("05_video_categorizer")
+    large = step5.setup_llm_backend()
+    if args.cascade_model:
+        os.environ["LLM_CASCADE_MODEL"] = args.cascade_model
+    small = create_cascade_backend()
+    if small is None:
+        print("Set LLM_CASCADE_MODEL (or pass --cascade-model) to the small model to evaluate.")
+        return 1
+    attempts = max(1, int(os.getenv("LLM_CASCADE_ATTEMPTS", step5.DEFAULT_CASCADE_ATTEMPTS)))
+    min_confidence = float(os.getenv("LLM_CASCADE_MIN_CONFIDENCE", step5.DEFAULT_CASCADE_MIN_CONFIDENCE))
+
+    rows, votes = load_rows(args.input)
+    channel_categories = load_channel_categories()
+    # Only videos Step 5 would send to the LLM: keyword-rule matches and
+    # confident local predictions never reach either model.
+    rule_engine = load_rule_engine()
+    classifier = load_classifier()
+    threshold = None
+    if classifier:
+        threshold = float(
+            os.getenv("LOCAL_CLASSIFIER_THRESHOLD", classifier.meta.get("threshold", DEFAULT_THRESHOLD))
+        )
+    rows.sort(key=lambda r: hashlib.md5((r.get("VideoID") or r.get("Title", "")).encode("utf-8")).hexdigest())
+    sample = []
+    skipped = 0
+    for row in attach_text(rows[: args.sample * 2]):
+        if len(sample) == args.sample:
+            break
+        fields = tuple(step5.clean_text(row.get(name)) for name in ("Title", "Description", "Tags"))
+        guess = None
+        if rule_engine and rule_engine.match(fields[0], fields[2]):
+            skipped += 1
+            continue
+        if classifier:
+            guess = classifier.predict(*fields)
+            if guess[1] >= threshold:
+                skipped += 1
+                continue
+        sample.append((row, fields, guess))
+    print(
+        f"Evaluating {small.model} -> {large.model} on {len(sample)} LLM-bound videos "
+        f"({skipped} skipped as rule/local-classifier labeled)..."
+    )
+    if not sample:
+        return 1
+
+    baseline = large.map(lambda item: step5.categorize_video(large, *item[1]), sample)
+    answers = small.map(
+        lambda item: step5.categorize_video(small, *item[1], max_attempts=attempts), sample
+    )
+    # Videos the main model failed on have no baseline to compare against.
+    failed = sum(expected is None for expected in baseline)
+    if failed:
+        print(f"  {failed} videos left out: {large.model} gave no usable answer.")
+    kept = [(item, expected, answer) for item, expected, answer in zip(sample, baseline, answers) if expected]
+    if not kept:
+        return 1
+
+    escalations = Counter()
+    agree = small_agree = baseline_stored = cascade_stored = 0
+    for (row, _, guess), expected, answer in kept:
+        channel = channel_categories.get(step5.clean_text(row.get("Channel", "")))
+        if channel is None:
+            # The video's own stored label is left out of its channel's prior.
+            channel_votes = Counter(votes.get(channel_key(row), Counter()))
+            channel_votes[row["Category"]] -= 1
+            channel = step5.channel_prior(+channel_votes)
+        signals = [("channel", channel)]
+        if guess and guess[1] >= min_confidence:
+            signals.insert(0, ("classifier", guess[0]))
+        reason = step5.escalation_reason(answer, signals)
+        if reason:
+            escalations[reason] += 1
+        category = expected if reason else answer
+        agree += category == expected
+        small_agree += answer == expected
+        baseline_stored += expected == row["Category"]
+        cascade_stored += category == row["Category"]
+
+    n = len(kept)
+    escalated = sum(escalations.values())
+    disagreement = (n - agree) / n * 100
+    reasons = ", ".join(f"{reason} {count}" for reason, count in escalations.most_common()) or "none"
+    print(f"  small model alone: {small_agree / n:.1%} agreement with {large.model}")
+    print(f"  cascade: {agree / n:.1%} agreement with {large.model}, {escalated} escalated ({reasons})")
+    print(f"  main-model calls saved: {n - escalated} of {n} ({(n - escalated) / n:.1%})")
+    print(f"  vs stored labels: main model {baseline_stored / n:.1%}, cascade {cascade_stored / n:.1%}")
+    small.print_report()
+    large.print_report()
+    small.close()
+    large.close()
+
+    if disagreement > args.tolerance:
+        print(f"FAIL: the cascade disagrees with {large.model} on {disagreement:.1f}% of videos.")
+        return 1
+    print("OK: cascade labels match the main model within tolerance.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from utils.warehouse import ROLLUP_DIMENSIONS, ROLLUP_PERIODS, Warehouse
+except ImportError:
+    from utils.warehouse import ROLLUP_DIMENSIONS, ROLLUP_PERIODS, Warehouse
+
+
+def format_hours(seconds):
+    return f"{seconds / 3600:.1f}h"
+
+
+def print_table(headers, rows):
+    widths = [max([len(h)] + [len(str(r[i])) for r in rows]) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
+
+
+def dimension_arg(value):
+    # Accept "channel", "category", "lang"/"language" on the command line.
+    aliases = {d.lower(): d for d in ROLLUP_DIMENSIONS}
+    aliases.update({"lang": "LangGroup", "language": "LangGroup"})
+    try:
+        return aliases[value.lower()]
+    except KeyError:
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(ROLLUP_DIMENSIONS)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer top-N and time-series questions from the warehouse rollups."
+    )
+    parser.add_argument("--warehouse", help="Warehouse path (default: WAREHOUSE_PATH or data/warehouse.sqlite)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    top = sub.add_parser("top", help="Top channels/categories/languages over a date range")
+    top.add_argument("by", type=dimension_arg, help="channel, category or lang")
+    top.add_argument("-n", "--limit", type=int, default=10)
+    top.add_argument("--metric", choices=["seconds", "views"], default="seconds")
+
+    series = sub.add_parser("series", help="Watch time per day/week/month")
+    series.add_argument("by", type=dimension_arg, help="channel, category or lang")
+    series.add_argument("values", nargs="*", help="Only these values (default: all)")
+    series.add_argument("--period", choices=ROLLUP_PERIODS, default="month")
+
+    for p in (top, series):
+        p.add_argument("--since", help="First day/bucket to include (YYYY-MM-DD)")
+        p.add_argument("--until", help="Last day/bucket to include (YYYY-MM-DD)")
+
+    sub.add_parser("refresh", help="Recompute rollups for days changed since the last refresh")
+    sub.add_parser("rebuild", help="Recompute all rollups from scratch")
+
+    args = parser.parse_args()
+    warehouse = Warehouse(args.warehouse)
+
+    if args.command in ("refresh", "rebuild"):
+        start = time.perf_counter()
+        days = warehouse.rebuild_rollups() if args.command == "rebuild" else warehouse.refresh_rollups()
+        print(f"Recomputed rollups for {days} watch days in {time.perf_counter() - start:.2f}s.")
+        warehouse.close()
+        return
+
+    # Pick up anything imported since the last pipeline run finished.
+    warehouse.refresh_rollups()
+
+    start = time.perf_counter()
+    if args.command == "top":
+        rows = warehouse.top(
+            args.by, since=args.since, until=args.until, metric=args.metric.capitalize(), limit=args.limit
+        )
+        elapsed = time.perf_counter() - start
+        print_table(
+            ["#", args.by, "Views", "Watch time"],
+            [(i, r["Value"], r["Views"], format_hours(r["Seconds"])) for i, r in enumerate(rows, 1)],
+        )
+    else:
+        rows = warehouse.series(args.by, args.period, args.values, since=args.since, until=args.until)
+        elapsed = time.perf_counter() - start
+        print_table(
+            [args.period.capitalize(), args.by, "Views", "Watch time"],
+            [(r["Bucket"], r["Value"], r["Views"], format_hours(r["Seconds"])) for r in rows],
+        )
+    print(f"\n{len(rows)} rows in {elapsed * 1000:.1f} ms")
+    warehouse.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import csv
+import glob
+import os
+import sys
+from collections import Counter
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from utils.categories import VALID_CATEGORIES, VALID_CATEGORY_MAP
+    from utils.local_classifier import DEFAULT_MODEL_PATH, DEFAULT_THRESHOLD, is_holdout, train
+    from utils.text_store import attach_text
+except ImportError:
+    from utils.categories import VALID_CATEGORIES, VALID_CATEGORY_MAP
+    from utils.local_classifier import DEFAULT_MODEL_PATH, DEFAULT_THRESHOLD, is_holdout, train
+    from utils.text_store import attach_text
+
+DEFAULT_INPUTS = [
+    os.path.join("data", "05_categorized*.csv"),
+    os.path.join("data", "archive", "**", "05_categorized*.csv"),
+]
+
+
+def load_examples(patterns, sources=("llm",)):
+    """
+    Collects labeled rows from categorized CSVs, keeping the latest label per
+    VideoID. Only labels whose CategorySource is in `sources` count, so the
+    classifier does not learn from its own (or rules'/clusters') earlier
+    output; CSVs written before that column existed are skipped.
+    """
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern, recursive=True)))
+
+    by_video = {}
+    skipped = Counter()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if "CategorySource" not in (reader.fieldnames or []):
+                print(f"Skipping {path}: no CategorySource column (written by an older Step 5).")
+                continue
+            for row in reader:
+                category = VALID_CATEGORY_MAP.get((row.get("Category") or "").strip().lower())
+                if not category:
+                    continue
+                if row["CategorySource"] not in sources:
+                    skipped[row["CategorySource"] or "unknown"] += 1
+                    continue
+                key = row.get("VideoID") or row.get("Link") or row.get("Title")
+                row["Category"] = category
+                by_video[key] = row
+
+    # Current CSVs keep Description/Tags in the text store; older ones carry them inline.
+    rows = attach_text(list(by_video.values()))
+    examples = [
+        (key, row.get("Title", ""), row.get("Description", ""), row.get("Tags", ""), row["Category"])
+        for key, row in zip(by_video, rows)
+    ]
+    if skipped:
+        print("Skipped labels by source: " + ", ".join(f"{name} {count}" for name, count in skipped.most_common()))
+    return paths, examples
+
+
+def evaluate(model, examples, threshold):
+    correct = 0
+    confident = 0
+    confident_correct = 0
+    for _, title, description, tags, label in examples:
+        predicted, confidence = model.predict(title, description, tags)
+        correct += predicted == label
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += predicted == label
+    total = len(examples) or 1
+    return {
+        "accuracy": correct / total,
+        "coverage": confident / total,
+        "confident_accuracy": confident_correct / confident if confident else 0.0,
+        "holdout_size": len(examples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the local category classifier on past LLM labels.")
+    parser.add_argument("inputs", nargs="*", help="Categorized CSV files or glob patterns (default: data/05_categorized*.csv)")
+    parser.add_argument("--output", default=os.getenv("LOCAL_CLASSIFIER_PATH", DEFAULT_MODEL_PATH))
+    parser.add_argument("--holdout", type=int, default=20, help="Percent of videos held out for evaluation")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", DEFAULT_THRESHOLD)))
+    parser.add_argument("--epochs", type=int, default=15)
+    parser.add_argument(
+        "--sources",
+        default="llm",
+        help="Comma-separated CategorySource values to train on (e.g. llm,llm_small)",
+    )
+    args = parser.parse_args()
+
+    print("Training local category classifier...")
+    sources = tuple(s.strip() for s in args.sources.split(",") if s.strip())
+    paths, examples = load_examples(args.inputs or DEFAULT_INPUTS, sources)
+    if not examples:
+        print(f"No rows labeled by {', '.join(sources)} found. Run step 5 at least once first.")
+        return 1
+
+    print(f"Loaded {len(examples)} labeled videos from {len(paths)} file(s).")
+    label_counts = Counter(e[4] for e in examples)
+    for category in VALID_CATEGORIES:
+        print(f"  {category}: {label_counts.get(category, 0)}")
+
+    train_set = [e for e in examples if not is_holdout(e[0], args.holdout)]
+    holdout_set = [e for e in examples if is_holdout(e[0], args.holdout)]
+    print(f"Train: {len(train_set)}, holdout: {len(holdout_set)}")
+
+    model = train([e[1:] for e in train_set], VALID_CATEGORIES, epochs=args.epochs)
+    metrics = evaluate(model, holdout_set, args.threshold)
+
+    print("\nHoldout results (agreement with LLM labels):")
+    print(f"  Accuracy (all predictions): {metrics['accuracy']:.1%}")
+    print(f"  Coverage at threshold {args.threshold:.2f}: {metrics['coverage']:.1%}")
+    print(f"  Accuracy above threshold: {metrics['confident_accuracy']:.1%}")
+
+    # Refit on everything so the shipped model sees all labels; metrics above
+    # describe the held-out estimate.
+    final_model = train([e[1:] for e in examples], VALID_CATEGORIES, epochs=args.epochs)
+    final_model.meta = {
+        "trained_on": len(examples),
+        "threshold": args.threshold,
+        "holdout": metrics,
+        "sources": paths,
+        "label_sources": list(sources),
+    }
+    final_model.save(args.output)
+    print(f"\nModel saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import json
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CHANNEL_CATEGORIES_PATH = os.path.join(PROJECT_ROOT, "channel_categories.json")
+
+VALID_CATEGORIES = [
+    "AI and coding",
+    "F1",
+    "Football",
+    "Basketball",
+    "News",
+    "Humor",
+    "Popular Science",
+    "History",
+    "Superheroes",
+    "Other",
+]
+
+VALID_CATEGORY_MAP = {c.lower(): c for c in VALID_CATEGORIES}
+
+
+def load_channel_categories(path=None):
+    """
+    {channel name: category} from channel_categories.json, with categories
+    mapped to VALID_CATEGORIES. Empty if the file is missing or disabled;
+    entries with an unknown category are skipped.
+    """
+    if os.getenv("CHANNEL_CATEGORIES", "on").lower() in ("0", "off", "false", "no"):
+        return {}
+    path = path or os.getenv("CHANNEL_CATEGORIES_PATH", DEFAULT_CHANNEL_CATEGORIES_PATH)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not load channel categories from {path}: {e}")
+        return {}
+    return {
+        " ".join(str(channel).split()): VALID_CATEGORY_MAP[value.lower()]
+        for channel, value in data.items()
+        if isinstance(value, str) and value.lower() in VALID_CATEGORY_MAP
+    }
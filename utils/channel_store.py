@@ -0,0 +1,59 @@
+import json
+import os
+import time
+
+DEFAULT_STORE_PATH = os.path.join("data", "channel_store.json")
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def topic_name(topic_url):
+    """'https://en.wikipedia.org/wiki/Association_football' -> 'Association football'."""
+    return topic_url.rstrip("/").rsplit("/", 1)[-1].replace("_", " ")
+
+
+class ChannelStore:
+    """
+    Persistent channel metadata keyed by channel ID. Entries carry a
+    `fetched_at` timestamp and are only refetched once older than
+    CHANNEL_STORE_MAX_AGE_DAYS. Channels the API did not return are kept as
+    {"missing": true} entries for the same time.
+    """
+
+    def __init__(self, path=None, max_age_days=None):
+        self.path = path or os.getenv("CHANNEL_STORE_PATH", DEFAULT_STORE_PATH)
+        days = max_age_days if max_age_days is not None else os.getenv("CHANNEL_STORE_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS)
+        self.max_age_seconds = float(days) * 86400
+        self.channels = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.channels = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read channel store {self.path}: {e}")
+
+    def get(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def stale_ids(self, channel_ids):
+        """Returns the IDs that are missing or older than the max age, in input order."""
+        now = time.time()
+        stale = []
+        for channel_id in channel_ids:
+            entry = self.channels.get(channel_id)
+            if not entry or now - entry.get("fetched_at", 0) > self.max_age_seconds:
+                stale.append(channel_id)
+        return stale
+
+    def update(self, channel_id, details):
+        self.channels[channel_id] = dict(details, fetched_at=time.time())
+
+    def mark_missing(self, channel_id):
+        """Records a channel the API did not return (deleted, terminated), so it is not asked for until stale."""
+        self.channels[channel_id] = {"missing": True, "fetched_at": time.time()}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.channels, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
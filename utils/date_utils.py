@@ -1,6 +1,7 @@
 import datetime
+import re
 from datetime import timedelta
-import calendar
+from functools import lru_cache
 
 def get_last_month_range():
     """
@@ -12,6 +13,136 @@ def get_last_month_range():
     first_day_last_month = last_day_last_month.replace(day=1)
     return first_day_last_month, last_day_last_month
 
+# Header words per history UI language. Month entries list every form YouTube
+# uses in dates: full, genitive ("31 января 2024 г.") and abbreviated ("31 янв.").
+LOCALES = {
+    "en": {
+        "today": ["today"],
+        "yesterday": ["yesterday"],
+        "weekdays": [
+            ["monday", "mon"], ["tuesday", "tue"], ["wednesday", "wed"], ["thursday", "thu"],
+            ["friday", "fri"], ["saturday", "sat"], ["sunday", "sun"],
+        ],
+        "months": [
+            ["january", "jan"], ["february", "feb"], ["march", "mar"], ["april", "apr"],
+            ["may"], ["june", "jun"], ["july", "jul"], ["august", "aug"],
+            ["september", "sep", "sept"], ["october", "oct"], ["november", "nov"], ["december", "dec"],
+        ],
+    },
+    "ru": {
+        "today": ["сегодня"],
+        "yesterday": ["вчера"],
+        "weekdays": [
+            ["понедельник", "пн"], ["вторник", "вт"], ["среда", "ср"], ["четверг", "чт"],
+            ["пятница", "пт"], ["суббота", "сб"], ["воскресенье", "вс"],
+        ],
+        "months": [
+            ["январь", "января", "янв"], ["февраль", "февраля", "фев", "февр"], ["март", "марта", "мар"],
+            ["апрель", "апреля", "апр"], ["май", "мая"], ["июнь", "июня", "июн"],
+            ["июль", "июля", "июл"], ["август", "августа", "авг"], ["сентябрь", "сентября", "сен", "сент"],
+            ["октябрь", "октября", "окт"], ["ноябрь", "ноября", "ноя", "нояб"], ["декабрь", "декабря", "дек"],
+        ],
+    },
+}
+
+_TOKEN = re.compile(r"[^\W\d_]+|\d+")
+
+
+class DateParser:
+    """
+    Parses history section headers ("Today", "Wednesday", "Jan 31, 2024",
+    "Вчера", "31 янв. 2024 г.") relative to a fixed date. Word tables for all
+    `locales` are merged, so headers of any of them are understood. Results
+    are memoized per header, and a header that cannot be parsed is warned
+    about once.
+    """
+
+    def __init__(self, relative_to=None, locales=None):
+        self.relative_to = relative_to or datetime.date.today()
+        self.days_ago = {}
+        self.weekdays = {}
+        self.months = {}
+        for name in locales or LOCALES:
+            words = LOCALES[name]
+            for word in words["today"]:
+                self.days_ago[word] = 0
+            for word in words["yesterday"]:
+                self.days_ago[word] = 1
+            for number, names in enumerate(words["weekdays"]):
+                for word in names:
+                    self.weekdays[word] = number
+            for number, names in enumerate(words["months"], start=1):
+                for word in names:
+                    self.months[word] = number
+        self._cache = {}
+
+    def parse(self, date_str):
+        """Returns the datetime.date for a header, or None (with a one-time warning)."""
+        try:
+            return self._cache[date_str]
+        except KeyError:
+            pass
+        parsed = self._parse(date_str)
+        if parsed is None:
+            print(f"Warning: Could not parse date '{date_str.strip()}'")
+        self._cache[date_str] = parsed
+        return parsed
+
+    def parse_many(self, date_strs):
+        return [self.parse(date_str) for date_str in date_strs]
+
+    def _parse(self, date_str):
+        tokens = _TOKEN.findall(date_str.lower())
+        if len(tokens) == 1:
+            word = tokens[0]
+            if word in self.days_ago:
+                return self.relative_to - timedelta(days=self.days_ago[word])
+            if word in self.weekdays:
+                # The most recent past occurrence; on the same weekday YouTube says "Today",
+                # so it means a week ago.
+                days_ago = (self.relative_to.weekday() - self.weekdays[word]) % 7 or 7
+                return self.relative_to - timedelta(days=days_ago)
+
+        # Absolute dates in either order ("Jan 31, 2024", "31 января 2024 г."); the
+        # year is left out for the current year.
+        month = day = year = None
+        for token in tokens:
+            if token.isdigit():
+                if len(token) == 4 and year is None:
+                    year = int(token)
+                elif len(token) <= 2 and day is None:
+                    day = int(token)
+                else:
+                    return None
+            elif token in self.months and month is None:
+                month = self.months[token]
+        if month is None or day is None:
+            return None
+        try:
+            if year is not None:
+                return datetime.date(year, month, day)
+            parsed_date = datetime.date(self.relative_to.year, month, day)
+            if parsed_date > self.relative_to:
+                parsed_date = datetime.date(self.relative_to.year - 1, month, day)
+            return parsed_date
+        except ValueError:
+            return None
+
+
+_parsers = {}
+
+
+def get_date_parser(relative_to=None):
+    """Shared DateParser (and its memo) for a reference date, today by default."""
+    relative_to = relative_to or datetime.date.today()
+    parser = _parsers.get(relative_to)
+    if parser is None:
+        if len(_parsers) >= 16:
+            _parsers.clear()
+        parser = _parsers[relative_to] = DateParser(relative_to)
+    return parser
+
+
 def parse_relative_date(date_str, relative_to=None):
     """
     Parses a date string from YouTube history which can be:
@@ -19,75 +150,52 @@ def parse_relative_date(date_str, relative_to=None):
     - "Yesterday"
     - A day of the week (e.g., "Wednesday") - implies the most recent past occurrence
     - An absolute date (e.g., "Jan 31", "Feb 28, 2024")
+    in any language of LOCALES (e.g. "Вчера", "31 янв. 2024 г.").
     
     Args:
         date_str (str): The date string to parse.
         relative_to (datetime.date, optional): The reference date (defaults to today).
         
     Returns:
-        datetime.date: The parsed date object.
+        datetime.date: The parsed date object, or None.
     """
-    if relative_to is None:
-        relative_to = datetime.date.today()
-        
-    date_str = date_str.strip()
-    
-    # helper for cleaner comparisons
-    lower_str = date_str.lower()
-    
-    if lower_str == "today":
-        return relative_to
-    
-    if lower_str == "yesterday":
-        return relative_to - timedelta(days=1)
-        
-    # Check for Day of Week (Monday, Tuesday, etc.)
-    days_of_week = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-    if lower_str in days_of_week:
-        target_weekday = days_of_week.index(lower_str)
-        current_weekday = relative_to.weekday()
-        
-        # Calculate days to subtract to get to the target weekday
-        # If today is Wednesday (2) and we want Monday (0): 2 - 0 = 2 days ago
-        # If today is Monday (0) and we want Wednesday (2): (0 - 2) % 7 = (-2) % 7 = 5 days ago
-        days_ago = (current_weekday - target_weekday) % 7
-        if days_ago == 0:
-            days_ago = 7 # If it's the same day, YouTube likely means last week's occurrence? 
-                         # Actually usually "Wednesday" on a Wednesday implies today, but YouTube says "Today"
-                         # Let's assume strict past interpretation if ambiguous, but usually it won't be today.
-        
-        return relative_to - timedelta(days=days_ago)
+    return get_date_parser(relative_to).parse(date_str)
 
-    # Try parsing absolute formats
-    # YouTube formats often depend on locale, but standard US/En is "Mon DD, YYYY" or just "Mon DD" (for current year)
-    # Examples: "Jan 1, 2024", "Dec 31"
-    
-    # clean extra whitespace
-    parts = date_str.split()
-    
-    # Basic check for Month Day (Year optional)
-    # e.g. "Jan 31" or "Jan 31, 2024"
-    if len(parts) >= 2:
-        try:
-            # Try with year
-            return datetime.datetime.strptime(date_str, "%b %d, %Y").date()
-        except ValueError:
-            pass
-            
+
+def parse_iso_dates(values):
+    """
+    Bulk-parses ISO 8601 dates or timestamps ("2024-01-31",
+    "2024-01-31T18:04:05.123Z", as in export files).
+
+    Only the date part, as written, is used (timestamps are not converted to
+    local time). Each distinct day is parsed once, so millions of rows take a
+    fraction of a second.
+
+    Args:
+        values (iterable of str): The strings to parse.
+
+    Returns:
+        list: datetime.date per value, None where it is not an ISO date.
+    """
+    days = [value[:10] for value in values]
+    parsed = {}
+    for day in set(days):
         try:
-            # Try without year (implies current year, or maybe previous year if month is ahead of current? 
-            # YouTube usually adds year if it's not current year, let's assume current year for now)
-            parsed_date = datetime.datetime.strptime(date_str, "%b %d").date()
-            parsed_date = parsed_date.replace(year=relative_to.year)
-            if parsed_date > relative_to:
-                parsed_date = parsed_date.replace(year=relative_to.year - 1)
-            return parsed_date
+            parsed[day] = datetime.date.fromisoformat(day) if len(day) == 10 else None
         except ValueError:
-            pass
+            parsed[day] = None
+    return list(map(parsed.__getitem__, days))
+
+
+@lru_cache(maxsize=65536)
+def iso_day(value):
+    """
+    "2024-01-31T18:04:05Z" -> "2024-01-31" for one value at a time (memoized);
+    values that are not ISO dates are returned unchanged.
+    """
+    parsed = parse_iso_dates([value])[0]
+    return parsed.isoformat() if parsed else value
 
-    # If we are here, we might need more formats or it's an error
-    print(f"Warning: Could not parse date '{date_str}'")
-    return None
 
 if __name__ == "__main__":
     # verification/test block
@@ -96,7 +204,7 @@ if __name__ == "__main__":
     print(f"Last Month Start: {start}, End: {end}")
     
     print("\nTesting parse_relative_date:")
-    test_dates = ["Today", "Yesterday", "Wednesday", "Jan 1, 2024", "Dec 25"]
+    test_dates = ["Today", "Yesterday", "Wednesday", "Jan 1, 2024", "Dec 25", "Вчера", "31 янв. 2024 г.", "5 мая"]
     for d in test_dates:
         print(f"'{d}' -> {parse_relative_date(d)}")
 
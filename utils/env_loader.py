@@ -1,21 +1,29 @@
-
 import os
 
+def _load_env_file(env_path):
+    with open(env_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                key, value = line.split('=', 1)
+                # Remove surrounding quotes if present
+                value = value.strip().strip('"').strip("'")
+                os.environ[key.strip()] = value
+
 def load_env():
     """Load environment variables from .env file in the project root."""
     # Find project root (assuming this file is in utils/)
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(current_dir)
     env_path = os.path.join(project_root, '.env')
-    
+
     if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    # Remove surrounding quotes if present
-                    value = value.strip().strip('"').strip("'")
-                    os.environ[key.strip()] = value
+        _load_env_file(env_path)
     else:
         print(f"Warning: .env file not found at {env_path}")
+
+    # Batch mode runs each account in its own directory; an optional .env
+    # there (e.g. a per-account API key) overrides the project one.
+    local_env_path = os.path.join(os.getcwd(), '.env')
+    if os.path.abspath(local_env_path) != os.path.abspath(env_path) and os.path.exists(local_env_path):
+        _load_env_file(local_env_path)
@@ -0,0 +1,172 @@
+import json
+import os
+import re
+from collections import Counter, deque
+
+from utils.categories import VALID_CATEGORY_MAP
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RULES_PATH = os.path.join(PROJECT_ROOT, "keyword_rules.json")
+
+NON_WORD_PATTERN = re.compile(r"[^\w+#]+", re.UNICODE)
+SEGMENT_SEPARATOR = " | "
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every occurrence of every pattern in a
+    single left-to-right pass over the text.
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            self._add(pattern, pattern_id)
+        self._build_failure_links()
+
+    def _add(self, pattern, pattern_id):
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = next_state
+        self.outputs[state].append(pattern_id)
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def search(self, text):
+        """Yields pattern ids for every match in `text`."""
+        state = 0
+        goto = self.goto
+        fail = self.fail
+        outputs = self.outputs
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                yield from outputs[state]
+
+
+def normalize_for_matching(*segments):
+    """
+    Lowercases and collapses punctuation to single spaces, padding every word
+    with spaces so padded keywords only ever match whole words. Segments
+    (title, individual tags) are kept apart so a keyword cannot span two tags.
+    """
+    parts = []
+    for segment in segments:
+        cleaned = NON_WORD_PATTERN.sub(" ", (segment or "").lower()).strip()
+        if cleaned:
+            parts.append(cleaned)
+    return " " + SEGMENT_SEPARATOR.join(parts) + " "
+
+
+class KeywordRuleEngine:
+    def __init__(self, rules):
+        for rule in rules:
+            category = VALID_CATEGORY_MAP.get(rule["category"].strip().lower())
+            if not category:
+                raise ValueError(f"Unknown category '{rule['category']}' in rule '{rule.get('name')}'")
+            rule["category"] = category
+        self.rules = rules
+        self.keywords = []  # (rule_index, keyword)
+        patterns = []
+        for rule_index, rule in enumerate(rules):
+            for keyword in rule["keywords"]:
+                normalized = normalize_for_matching(keyword)
+                if normalized.strip():
+                    self.keywords.append((rule_index, keyword))
+                    patterns.append(normalized)
+        self.matcher = AhoCorasick(patterns)
+        self.rule_hits = Counter()
+        self.keyword_hits = Counter()
+        self.conflicts = 0
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        return cls(payload.get("rules", []))
+
+    def match(self, title, tags):
+        """
+        Returns the category if every matching rule agrees, otherwise None.
+        Hit counts are recorded for all matches, including conflicting ones.
+        """
+        tag_list = (tags or "").split(";")
+        text = normalize_for_matching(title, *tag_list)
+
+        matched_keywords = set(self.matcher.search(text))
+        if not matched_keywords:
+            return None
+
+        matched_rules = set()
+        for keyword_id in matched_keywords:
+            rule_index, keyword = self.keywords[keyword_id]
+            self.keyword_hits[(rule_index, keyword)] += 1
+            matched_rules.add(rule_index)
+        for rule_index in matched_rules:
+            self.rule_hits[rule_index] += 1
+
+        categories = {self.rules[i]["category"] for i in matched_rules}
+        if len(categories) > 1:
+            self.conflicts += 1
+            return None
+        return categories.pop()
+
+    def hit_report(self):
+        report = []
+        for rule_index, rule in enumerate(self.rules):
+            report.append({
+                "name": rule.get("name", rule["category"]),
+                "category": rule["category"],
+                "hits": self.rule_hits.get(rule_index, 0),
+                "keywords": {
+                    keyword: self.keyword_hits.get((rule_index, keyword), 0)
+                    for keyword in rule["keywords"]
+                },
+            })
+        return report
+
+    def print_report(self):
+        print("Keyword rule hits:")
+        for entry in self.hit_report():
+            print(f"  {entry['name']} -> {entry['category']}: {entry['hits']}")
+            unused = [k for k, hits in entry["keywords"].items() if hits == 0]
+            if unused and entry["hits"]:
+                print(f"    never matched: {', '.join(unused)}")
+        if self.conflicts:
+            print(f"  {self.conflicts} videos matched rules for different categories (sent on).")
+
+
+def load_rule_engine(path=None):
+    """Loads the keyword table, or returns None if it is missing or disabled."""
+    if os.getenv("KEYWORD_RULES", "on").lower() in ("0", "off", "false", "no"):
+        return None
+    path = path or os.getenv("KEYWORD_RULES_PATH", DEFAULT_RULES_PATH)
+    if not os.path.exists(path):
+        return None
+    try:
+        return KeywordRuleEngine.from_file(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: Could not load keyword rules from {path}: {e}")
+        return None
@@ -0,0 +1,248 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from utils.rate_limiter import get_rate_limiter
+
+DEFAULT_GROQ_MODEL = "moonshotai/kimi-k2-instruct"
+DEFAULT_OPENAI_BASE_URL = "http://localhost:8000/v1"
+
+
+class LLMError(Exception):
+    """Raised for non-2xx responses. The status code is kept in the message so
+    callers can keep matching on "429" like they do for SDK errors."""
+
+    def __init__(self, status, body, retry_after=None):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LLMBackend:
+    name = "base"
+
+    def __init__(self, model, concurrency=1):
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.first_start = None
+        self.last_end = None
+        # LLM_RATE_LIMIT (requests/second); shared across processes via RATE_LIMIT_DIR.
+        self.rate_limiter = get_rate_limiter("llm")
+
+    def _send(self, prompt, max_tokens, temperature, top_p):
+        raise NotImplementedError
+
+    def complete(self, prompt, max_tokens=10, temperature=0, top_p=0.95):
+        """Sends one chat completion and returns the reply text."""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            return self._send(prompt, max_tokens, temperature, top_p)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.latencies.append(end - start)
+                if self.first_start is None:
+                    self.first_start = start
+                self.last_end = end
+
+    def map(self, func, items):
+        """Runs `func` over `items` with up to `concurrency` requests in flight, keeping order."""
+        if self.concurrency == 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(func, items))
+
+    def reset_stats(self):
+        """Clears latency/error stats, e.g. between jobs of a long-lived process."""
+        with self._lock:
+            self.latencies = []
+            self.errors = 0
+            self.first_start = None
+            self.last_end = None
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            elapsed = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+            errors = self.errors
+        calls = len(latencies)
+        return {
+            "backend": self.name,
+            "model": self.model,
+            "requests": calls,
+            "errors": errors,
+            "throughput_rps": (calls / elapsed) if elapsed > 0 else 0.0,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "latency_p99": percentile(latencies, 99),
+        }
+
+    def print_report(self):
+        s = self.stats()
+        if not s["requests"]:
+            return
+        print(
+            f"{s['backend']} ({s['model']}): {s['requests']} requests, {s['errors']} errors, "
+            f"{s['throughput_rps']:.2f} req/s, latency p50 {s['latency_p50']:.2f}s "
+            f"p95 {s['latency_p95']:.2f}s p99 {s['latency_p99']:.2f}s"
+        )
+        if self.rate_limiter and self.rate_limiter.waited_seconds:
+            print(f"Waited {self.rate_limiter.waited_seconds:.1f}s for the LLM rate limit.")
+
+    def close(self):
+        pass
+
+
+class GroqBackend(LLMBackend):
+    name = "groq"
+
+    def __init__(self, api_key, model, concurrency=1, base_url=None):
+        super().__init__(model, concurrency)
+        from groq import Groq
+
+        # base_url (GROQ_BASE_URL) points the SDK at another server, e.g. benchmarks/fake_servers.py.
+        self.client = Groq(api_key=api_key, base_url=base_url)
+
+    def _send(self, prompt, max_tokens, temperature, top_p):
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+        )
+        return completion.choices[0].message.content or ""
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Any server exposing /chat/completions (vLLM, llama.cpp server, Ollama,
+    LM Studio, ...). Keep-alive connections are pooled on the backend: a
+    request takes an idle one (or opens one) and puts it back when done, so
+    at most `concurrency` connections are open and they are reused across
+    requests and map() calls.
+    """
+
+    name = "openai"
+
+    def __init__(self, base_url, model, api_key=None, concurrency=4, timeout=60):
+        super().__init__(model, concurrency)
+        parsed = urlparse(base_url.rstrip("/"))
+        self.scheme = parsed.scheme or "http"
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port
+        self.path = (parsed.path or "") + "/chat/completions"
+        self.api_key = api_key
+        self.timeout = timeout
+        self._idle = []
+
+    def _connection(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        # Imported here so loading Step 5 (e.g. for a fully cached run) skips http.client.
+        import http.client
+
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.concurrency:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _send(self, prompt, max_tokens, temperature, top_p):
+        import http.client
+
+        body = json.dumps({
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": top_p,
+        })
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        conn = self._connection()
+        try:
+            conn.request("POST", self.path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = response.read().decode("utf-8", errors="replace")
+        except (http.client.HTTPException, OSError):
+            # Stale keep-alive connection; drop it so the retry reconnects.
+            conn.close()
+            raise
+        self._release(conn)
+
+        if response.status >= 400:
+            raise LLMError(response.status, payload, response.getheader("Retry-After"))
+        data = json.loads(payload)
+        return data["choices"][0]["message"].get("content") or ""
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def create_backend(model=None):
+    """Builds the backend selected by LLM_BACKEND (default: groq). `model` overrides the configured model."""
+    kind = os.getenv("LLM_BACKEND", "groq").strip().lower()
+    if kind == "groq":
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY not found in .env")
+        model = model or os.getenv("LLM_MODEL") or os.getenv("GROQ_MODEL", DEFAULT_GROQ_MODEL)
+        return GroqBackend(
+            api_key,
+            model,
+            concurrency=int(os.getenv("LLM_CONCURRENCY", "1")),
+            base_url=os.getenv("GROQ_BASE_URL") or None,
+        )
+    if kind in ("openai", "local"):
+        model = model or os.getenv("LLM_MODEL")
+        if not model:
+            raise ValueError("LLM_MODEL must be set for the openai backend")
+        return OpenAICompatibleBackend(
+            os.getenv("LLM_BASE_URL", DEFAULT_OPENAI_BASE_URL),
+            model,
+            api_key=os.getenv("LLM_API_KEY"),
+            concurrency=int(os.getenv("LLM_CONCURRENCY", "4")),
+            timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+        )
+    raise ValueError(f"Unknown LLM_BACKEND '{kind}' (expected groq or openai)")
+
+
+def create_cascade_backend():
+    """
+    The small first-tier model for cascade mode (LLM_CASCADE_MODEL, same
+    backend and server as the main model), or None when cascade mode is off.
+    """
+    model = os.getenv("LLM_CASCADE_MODEL", "").strip()
+    if not model:
+        return None
+    return create_backend(model=model)
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import math
+import os
+import random
+import re
+from collections import Counter
+
+DEFAULT_MODEL_PATH = os.path.join("models", "category_classifier.json")
+DEFAULT_THRESHOLD = 0.85
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+MAX_DESCRIPTION_TOKENS = 300
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_PATTERN.findall((text or "").lower()):
+        if len(token) < 2 or token.isdigit():
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def extract_features(title, description, tags):
+    """
+    Turns video metadata into a bag of prefixed tokens.
+    Title tokens (plus title bigrams) and tags carry the most signal, so the
+    description is capped to keep long sponsor blocks from dominating.
+    """
+    title_tokens = tokenize(title)
+    features = [f"t:{tok}" for tok in title_tokens]
+    features += [f"b:{a}_{b}" for a, b in zip(title_tokens, title_tokens[1:])]
+    features += [f"g:{tok}" for tok in tokenize(tags)]
+    features += [f"d:{tok}" for tok in tokenize(description)[:MAX_DESCRIPTION_TOKENS]]
+    return features
+
+
+def _tfidf_vector(features, idf):
+    counts = Counter(f for f in features if f in idf)
+    vector = {f: (1 + math.log(c)) * idf[f] for f, c in counts.items()}
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    if norm > 0:
+        vector = {f: v / norm for f, v in vector.items()}
+    return vector
+
+
+def _softmax(scores):
+    top = max(scores)
+    exps = [math.exp(s - top) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+class LocalClassifier:
+    def __init__(self, classes, idf, weights, bias, meta=None):
+        self.classes = classes
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.meta = meta or {}
+
+    def predict_proba(self, title, description, tags):
+        vector = _tfidf_vector(extract_features(title, description, tags), self.idf)
+        scores = list(self.bias)
+        for feature, value in vector.items():
+            row = self.weights.get(feature)
+            if row is None:
+                continue
+            for k, w in enumerate(row):
+                scores[k] += w * value
+        return _softmax(scores)
+
+    def predict(self, title, description, tags):
+        """Returns (category, confidence)."""
+        probs = self.predict_proba(title, description, tags)
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return self.classes[best], probs[best]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        payload = {
+            "version": 1,
+            "classes": self.classes,
+            "idf": self.idf,
+            "weights": {f: [round(w, 6) for w in row] for f, row in self.weights.items()},
+            "bias": self.bias,
+            "meta": self.meta,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        return cls(
+            payload["classes"],
+            payload["idf"],
+            payload["weights"],
+            payload["bias"],
+            payload.get("meta"),
+        )
+
+
+def train(examples, classes, epochs=15, learning_rate=0.5, l2=1e-5, min_df=2, seed=13):
+    """
+    Trains a TF-IDF + multinomial logistic regression model with plain SGD.
+    `examples` is a list of (title, description, tags, category) tuples.
+    """
+    docs = [extract_features(t, d, g) for t, d, g, _ in examples]
+    labels = [classes.index(c) for _, _, _, c in examples]
+
+    df = Counter()
+    for features in docs:
+        df.update(set(features))
+    n_docs = len(docs)
+    idf = {
+        f: math.log((1 + n_docs) / (1 + count)) + 1
+        for f, count in df.items()
+        if count >= min_df
+    }
+
+    vectors = [_tfidf_vector(features, idf) for features in docs]
+    n_classes = len(classes)
+    weights = {}
+    bias = [0.0] * n_classes
+
+    rng = random.Random(seed)
+    order = list(range(len(vectors)))
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        lr = learning_rate / (1 + epoch * 0.5)
+        for i in order:
+            vector = vectors[i]
+            scores = list(bias)
+            for feature, value in vector.items():
+                row = weights.get(feature)
+                if row is None:
+                    continue
+                for k in range(n_classes):
+                    scores[k] += row[k] * value
+            probs = _softmax(scores)
+            probs[labels[i]] -= 1.0  # gradient of cross-entropy w.r.t. scores
+
+            for k in range(n_classes):
+                bias[k] -= lr * probs[k]
+            for feature, value in vector.items():
+                row = weights.setdefault(feature, [0.0] * n_classes)
+                for k in range(n_classes):
+                    row[k] -= lr * (probs[k] * value + l2 * row[k])
+
+    return LocalClassifier(classes, idf, weights, bias)
+
+
+def is_holdout(video_id, holdout_percent):
+    """Deterministic split so repeated retrains evaluate on the same videos."""
+    digest = hashlib.md5((video_id or "").encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % 100 < holdout_percent
+
+
+def load_classifier(path=None):
+    """Loads the saved model, or returns None if it is missing or disabled."""
+    if os.getenv("LOCAL_CLASSIFIER", "on").lower() in ("0", "off", "false", "no"):
+        return None
+    path = path or os.getenv("LOCAL_CLASSIFIER_PATH", DEFAULT_MODEL_PATH)
+    if not os.path.exists(path):
+        return None
+    try:
+        return LocalClassifier.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: Could not load local classifier from {path}: {e}")
+        return None
@@ -0,0 +1,153 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+METRICS_DIR_ENV = "PIPELINE_METRICS_DIR"
+
+_current = None
+# Steps 4 and 5 can run in one process on two threads (steps/04_05_stream.py);
+# each thread reports into the step it runs. Other threads (e.g. LLM workers)
+# fall back to the step created last.
+_local = threading.local()
+# Latest not-yet-flushed metrics per step, flushed by one atexit handler. A
+# long-lived process (daemon.py) replaces a step's entry on its next run
+# instead of piling up handlers for old runs.
+_unflushed = {}
+
+
+class StepMetrics:
+    """
+    Counters and phase timings for one step run. Steps report into it with
+    incr()/phase(); the runner collects the flushed JSON files.
+
+    Common counter names: rows_in, rows_out, api_calls, retries,
+    rate_limit_waits, rate_limit_wait_seconds, bytes_downloaded, cache_hits.
+    """
+
+    def __init__(self, step):
+        self.step = step
+        self.started_at = time.time()
+        self.counters = Counter()
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def set(self, name, value):
+        with self._lock:
+            self.counters[name] = value
+
+    def record_phase(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - start)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "step": self.step,
+                "started_at": self.started_at,
+                "elapsed_seconds": time.time() - self.started_at,
+                "counters": dict(self.counters),
+                "phases": dict(self.phases),
+            }
+
+    def flush(self):
+        """Writes <PIPELINE_METRICS_DIR>/<step>.json when run under the pipeline runner."""
+        metrics_dir = os.getenv(METRICS_DIR_ENV)
+        if _unflushed.get(self.step) is self:
+            del _unflushed[self.step]
+        if not metrics_dir:
+            return None
+        os.makedirs(metrics_dir, exist_ok=True)
+        path = os.path.join(metrics_dir, f"{self.step}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+
+def step_metrics(step):
+    """Creates the metrics object for this step run; it is flushed at exit unless flushed before."""
+    global _current
+    _current = StepMetrics(step)
+    _local.current = _current
+    _unflushed[step] = _current
+    return _current
+
+
+@atexit.register
+def _flush_at_exit():
+    for metrics in list(_unflushed.values()):
+        metrics.flush()
+
+
+def get_metrics():
+    """Returns the current step's metrics, or a throwaway one outside a step."""
+    global _current
+    current = getattr(_local, "current", None)
+    if current is not None:
+        return current
+    if _current is None:
+        _current = StepMetrics("standalone")
+    return _current
+
+
+def _prom_name(name):
+    return "yt_pipeline_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _prom_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_prometheus(run):
+    """Renders a run metrics dict in the Prometheus text exposition format."""
+    samples = {}
+
+    def add(metric, labels, value, help_text):
+        entry = samples.setdefault(metric, {"help": help_text, "values": []})
+        label_text = ",".join(f'{k}="{_prom_label(v)}"' for k, v in labels.items())
+        series = f"{metric}{{{label_text}}}" if label_text else metric
+        entry["values"].append(f"{series} {float(value)!r}")
+
+    for step in run["steps"]:
+        labels = {"step": step["step"]}
+        add(_prom_name("step_duration_seconds"), labels, step.get("elapsed_seconds", 0), "Wall time of the step.")
+        add(_prom_name("step_success"), labels, 1 if step.get("status") == "ok" else 0, "1 if the step succeeded.")
+        for name, value in sorted(step.get("counters", {}).items()):
+            add(_prom_name(name), labels, value, f"Step counter {name}.")
+        for phase, seconds in sorted(step.get("phases", {}).items()):
+            add(_prom_name("phase_seconds"), dict(labels, phase=phase), seconds, "Time spent per step phase.")
+
+    add(_prom_name("run_duration_seconds"), {}, run["elapsed_seconds"], "Wall time of the whole run.")
+    add(_prom_name("last_run_timestamp_seconds"), {}, run["finished_at"], "Unix time the last run finished.")
+
+    lines = []
+    for metric, entry in samples.items():
+        lines.append(f"# HELP {metric} {entry['help']}")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(entry["values"])
+    return "\n".join(lines) + "\n"
+
+
+def write_atomic(path, text):
+    # The node exporter textfile collector may read at any time; never expose a partial file.
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import re
+import struct
+from array import array
+from collections import OrderedDict
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 64
+SHINGLE_SIZE = 4
+# Representatives kept in the index (NEAR_DUPLICATE_MAX_INDEX); about 2 KB each,
+# so roughly 40 MB at the default.
+DEFAULT_MAX_KEYS = 20000
+
+NON_WORD_PATTERN = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Character n-grams of the lowercased text with punctuation collapsed to single spaces."""
+    normalized = NON_WORD_PATTERN.sub(" ", (text or "").lower()).strip()
+    if len(normalized) < size:
+        return set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def choose_bands(num_perm, threshold):
+    """
+    LSH band count for a similarity threshold. Bands of r rows make two items
+    with similarity s candidates with probability 1 - (1 - s^r)^b; the curve
+    turns at about (1/b)^(1/r). Pick the steepest split whose turn lies at or
+    just below the threshold, so near-duplicates are not missed; candidates
+    are checked against the threshold afterwards.
+    """
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        if (1 / bands) ** (1 / rows) <= threshold:
+            return bands
+    return num_perm
+
+
+class MinHashIndex:
+    """
+    Near-duplicate lookup over short texts (titles and tags). Each text is
+    reduced to a MinHash signature of `num_perm` values whose agreement rate
+    estimates the Jaccard similarity of the texts' shingle sets; signatures
+    are bucketed by band, so a lookup only compares against candidates that
+    share a band.
+
+    At most `max_keys` keys are kept (0 = unlimited): adding one more evicts
+    the key least recently added or matched, so memory does not grow with
+    the history. Re-uploads and episodes of a series tend to be watched close
+    together, and a matched key stays in.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, max_keys=DEFAULT_MAX_KEYS):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.max_keys = max_keys
+        self._unpack = struct.Struct(f"<{num_perm}I").unpack
+        self.bands = choose_bands(num_perm, threshold)
+        self.rows = num_perm // self.bands
+        self.buckets = {}
+        self.signatures = OrderedDict()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, key):
+        return key in self.signatures
+
+    def signature(self, text):
+        """MinHash signature of the text, or None when it is too short to compare."""
+        # One extendable-output digest per shingle stands in for num_perm
+        # independent hash functions; the per-position minimum is the signature.
+        size = 4 * self.num_perm
+        hashes = [self._unpack(hashlib.shake_128(s.encode("utf-8")).digest(size)) for s in shingles(text)]
+        if not hashes:
+            return None
+        return tuple(map(min, zip(*hashes)))
+
+    def _band_keys(self, signature):
+        # A hash per band keeps bucket keys small; a collision only adds a
+        # candidate, which the similarity check then rejects.
+        for band in range(self.bands):
+            start = band * self.rows
+            yield hash((band,) + tuple(signature[start:start + self.rows]))
+
+    def add(self, key, signature):
+        """Indexes `key`; returns the keys evicted to stay within max_keys."""
+        if signature is None:
+            return []
+        self.signatures[key] = array("I", signature)
+        for band_key in self._band_keys(signature):
+            self.buckets.setdefault(band_key, []).append(key)
+        evicted = []
+        while self.max_keys and len(self.signatures) > self.max_keys:
+            old_key, old_signature = self.signatures.popitem(last=False)
+            for band_key in self._band_keys(old_signature):
+                bucket = self.buckets[band_key]
+                bucket.remove(old_key)
+                if not bucket:
+                    del self.buckets[band_key]
+            evicted.append(old_key)
+        return evicted
+
+    def query(self, signature):
+        """Most similar indexed key at or above the threshold: (key, similarity), or (None, 0.0)."""
+        if signature is None:
+            return None, 0.0
+        best_key, best_similarity = None, 0.0
+        seen = set()
+        for band_key in self._band_keys(signature):
+            for key in self.buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                other = self.signatures[key]
+                similarity = sum(x == y for x, y in zip(signature, other)) / self.num_perm
+                if similarity > best_similarity:
+                    best_key, best_similarity = key, similarity
+        if best_similarity >= self.threshold:
+            self.signatures.move_to_end(best_key)
+            return best_key, best_similarity
+        return None, 0.0
+
+
+def load_near_duplicate_index():
+    """
+    Index for Step 5's near-duplicate clustering, or None when it is turned
+    off (NEAR_DUPLICATE_THRESHOLD=off).
+    """
+    value = os.getenv("NEAR_DUPLICATE_THRESHOLD", str(DEFAULT_THRESHOLD)).strip().lower()
+    if value in ("off", "0", "none", ""):
+        return None
+    threshold = float(value)
+    if not 0 < threshold <= 1:
+        raise ValueError(f"NEAR_DUPLICATE_THRESHOLD must be between 0 and 1, got {value}")
+    max_keys = int(os.getenv("NEAR_DUPLICATE_MAX_INDEX", DEFAULT_MAX_KEYS))
+    return MinHashIndex(threshold=threshold, max_keys=max(0, max_keys))
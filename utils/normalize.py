@@ -0,0 +1,48 @@
+import re
+
+
+def parse_duration_seconds(duration_str):
+    if not isinstance(duration_str, str):
+        return 0
+
+    value = duration_str.strip()
+    if not value:
+        return 0
+
+    # ISO 8601 like PT1H2M10S
+    if value.startswith("PT"):
+        pattern = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?")
+        match = pattern.fullmatch(value)
+        if not match:
+            return 0
+        hours, minutes, seconds = match.groups()
+        hours = int(hours) if hours else 0
+        minutes = int(minutes) if minutes else 0
+        seconds = int(seconds) if seconds else 0
+        return hours * 3600 + minutes * 60 + seconds
+
+    # HH:MM:SS or MM:SS
+    if ":" in value:
+        parts = value.split(":")
+        try:
+            if len(parts) == 2:
+                minutes, seconds = map(int, parts)
+                return minutes * 60 + seconds
+            if len(parts) == 3:
+                hours, minutes, seconds = map(int, parts)
+                return hours * 3600 + minutes * 60 + seconds
+        except ValueError:
+            return 0
+
+    return 0
+
+
+def map_language(lang):
+    if not isinstance(lang, str) or not lang.strip():
+        return "Other"
+    value = lang.strip().lower()
+    if re.match(r"^ru($|[-_])", value) or "russian" in value or value == "rus":
+        return "Russian"
+    if re.match(r"^en($|[-_])", value) or "english" in value or "british" in value or value == "eng":
+        return "English"
+    return "Other"
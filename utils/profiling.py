@@ -0,0 +1,200 @@
+import datetime
+import io
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_ENV = "PIPELINE_PROFILE"
+PROFILE_DIR_ENV = "PIPELINE_PROFILE_DIR"
+PROFILE_STEPS_ENV = "PIPELINE_PROFILE_STEPS"
+PROFILE_INTERVAL_ENV = "PIPELINE_PROFILE_INTERVAL"
+MODES = ("cprofile", "sampling")
+
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 25
+
+
+def _pop_profile_arg(argv):
+    """Removes --profile / --profile=<mode> from argv and returns the mode (or None)."""
+    mode = None
+    for arg in list(argv[1:]):
+        if arg == "--profile":
+            mode = "cprofile"
+            argv.remove(arg)
+        elif arg.startswith("--profile="):
+            mode = arg.split("=", 1)[1]
+            argv.remove(arg)
+    return mode
+
+
+def _selected_mode(step_name):
+    mode = _pop_profile_arg(sys.argv) or os.getenv(PROFILE_ENV, "")
+    mode = mode.strip().lower()
+    if not mode or mode in ("0", "off", "none"):
+        return None
+    if mode not in MODES:
+        print(f"Warning: Unknown profile mode '{mode}', expected one of {', '.join(MODES)}.")
+        return None
+    only = [s.strip() for s in os.getenv(PROFILE_STEPS_ENV, "").split(",") if s.strip()]
+    if only and not any(step_name.startswith(s) for s in only):
+        return None
+    return mode
+
+
+def _output_prefix(step_name):
+    profile_dir = os.getenv(PROFILE_DIR_ENV, "profiles")
+    os.makedirs(profile_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(profile_dir, f"{step_name}_{stamp}")
+
+
+def _write_allocations(snapshot, peak, path):
+    lines = [f"Peak traced memory: {peak / 1024 / 1024:.1f} MB", "", "Top allocation sites:"]
+    for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _run_cprofile(func, prefix):
+    # Imported here: every step starts through run_entry, and most runs do not profile.
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    tracemalloc.start(10)
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        profiler.dump_stats(f"{prefix}.prof")
+        _write_allocations(snapshot, peak, f"{prefix}_alloc.txt")
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        with open(f"{prefix}_top.txt", "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+        print(f"Profile saved to {prefix}.prof (allocations: {prefix}_alloc.txt)")
+
+
+class SamplingProfiler:
+    """
+    Low-overhead profiler for long runs: a background thread snapshots the
+    stack of every other thread every `interval` seconds, so time spent in
+    worker threads (e.g. Step 5's LLM requests) shows up, not just the main
+    thread waiting on them. Each stack starts with its thread's name, with
+    pool numbering dropped so workers of every pool aggregate. Output is
+    collapsed-stack text usable by flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread_samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                # "ThreadPoolExecutor-3_1" -> "ThreadPoolExecutor", "Thread-5 (run)" -> "Thread (run)".
+                stack = [re.sub(r"-\d+(?:_\d+)?", "", names.get(thread_id, "thread"))]
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                self.stacks[";".join([stack[0]] + stack[:0:-1])] += 1
+                self.thread_samples += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, prefix):
+        with open(f"{prefix}.folded", "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        inclusive = Counter()
+        own = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            # Drop line numbers so one function aggregates across lines.
+            names = [frames[0]] + [frame.rsplit(":", 1)[0] for frame in frames[1:]]
+            own[names[-1]] += count
+            for name in set(names):
+                inclusive[name] += count
+
+        # Shares are of thread samples: with N busy threads, N stacks per sample.
+        total = self.thread_samples or 1
+        lines = [
+            f"{self.samples} samples every {self.interval * 1000:.0f} ms, {self.thread_samples} thread stacks",
+            "",
+            "Top functions (self):",
+        ]
+        lines += [f"{count / total:7.1%}  {name}" for name, count in own.most_common(TOP_FUNCTIONS)]
+        lines += ["", "Top functions (inclusive):"]
+        lines += [f"{count / total:7.1%}  {name}" for name, count in inclusive.most_common(TOP_FUNCTIONS)]
+        with open(f"{prefix}_top.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _run_sampling(func, prefix):
+    sampler = SamplingProfiler(interval=float(os.getenv(PROFILE_INTERVAL_ENV, "0.01")))
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        return func()
+    finally:
+        sampler.stop()
+        sampler.write(prefix)
+        print(
+            f"Sampled {sampler.thread_samples} thread stacks ({sampler.samples} samples) "
+            f"over {time.perf_counter() - start:.1f}s; "
+            f"saved to {prefix}.folded"
+        )
+
+
+def _wants_help(argv):
+    return any(arg in ("-h", "--help") for arg in argv[1:])
+
+
+def run_entry(func, step_name):
+    """
+    Step entry point wrapper. Runs `func` normally, or under a profiler when
+    --profile[=cprofile|sampling] is passed or PIPELINE_PROFILE is set.
+    --help prints usage without running the step.
+    """
+    if _wants_help(sys.argv):
+        print(f"usage: python steps/{step_name}.py [--profile[={'|'.join(MODES)}]]")
+        print()
+        print(f"Runs pipeline step {step_name} in the current directory (reads and writes data/).")
+        print("Settings come from .env and the environment; see README.md.")
+        return None
+    mode = _selected_mode(step_name)
+    if mode is None:
+        return func()
+    prefix = _output_prefix(step_name)
+    print(f"Profiling {step_name} ({mode})...")
+    if mode == "sampling":
+        return _run_sampling(func, prefix)
+    return _run_cprofile(func, prefix)
@@ -0,0 +1,158 @@
+import math
+import os
+import re
+import threading
+
+URL_PATTERN = re.compile(
+    r"(?:https?://|www\.)\S+|\b[\w-]+\.(?:com|net|org|ly|gg|io|me|tv|be|co|ru)(?:/\S*)?",
+    re.IGNORECASE,
+)
+TIMESTAMP_PATTERN = re.compile(r"\(?\b\d{1,2}:\d{2}(?::\d{2})?\b\)?\s*[-–—:|]?\s*")
+EMAIL_PATTERN = re.compile(r"\S+@\S+\.\w+")
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?|•])\s+|\s+[|•►▶➤→]\s+")
+# URLs are swapped for this placeholder until the boilerplate pass is done,
+# so "follow me" can tell a link in its clause from real content. Step 5's
+# clean_text removes control characters, so it never occurs in the input.
+LINK_PLACEHOLDER = "\x00"
+SOCIAL_PLATFORMS = r"instagram|twitter|tiktok|discord|facebook|telegram|patreon|twitch|linkedin|snapchat"
+
+# Call-to-action / sponsor / housekeeping phrases. Each match is cut from the
+# marker to the end of its clause, so the content around it survives even in
+# descriptions whose line breaks were collapsed (Step 4) into one sentence.
+# Platform names only count inside such a phrase ("follow us on Instagram",
+# "Twitter: @name"), not when the video is about them. "Follow/join us" only
+# counts with a link, @handle or platform name in the same clause, so "Join us
+# for the 2024 season preview" stays.
+BOILERPLATE_MARKERS = (
+    r"(?:(?:please|and|also|don'?t forget to|make sure to|be sure to)\s+)?(?:like\s+(?:and|&)\s+)?subscrib(?:e|ing)\b",
+    r"(?:follow|find|join|add)\s+(?:me|us)\b(?=[^.!?;|•]*(?:" + LINK_PLACEHOLDER + r"|@\w|\b(?:" + SOCIAL_PLATFORMS + r")\b))",
+    r"(?:my|our)\s+(?:" + SOCIAL_PLATFORMS + r")\b",
+    r"(?:" + SOCIAL_PLATFORMS + r")\s*:",
+    r"(?:on|via)\s+patreon\b",
+    r"(?:this\s+video\s+is\s+|video\s+)?sponsored\s+by\b",
+    r"today'?s\s+sponsor\b",
+    r"thanks\s+to\s+\S+\s+for\s+sponsoring\b",
+    r"(?:use|promo|discount)\s+code\b",
+    r"affiliate\s+links?\b",
+    r"merch\s+(?:store|shop)\b",
+    r"(?:get|buy|grab)\s+(?:the\s+|our\s+|my\s+)?merch\b",
+    r"business\s+(?:inquiries|enquiries)\b",
+    r"all\s+rights\s+reserved\b",
+    r"copyright\s*(?:©|\(c\)|\d{4})",
+    r"подпис(?:ывайтесь|ывайся|аться|ку)\b",
+    r"подпиши(?:сь|тесь)\b",
+    r"промокод\w*",
+    r"на\s+правах\s+рекламы\b",
+    r"(?:наш|мой)\s+телеграм\w*",
+    r"телеграм\w*\s*:",
+)
+BOILERPLATE_PATTERN = re.compile(
+    r"\b(?:" + "|".join(BOILERPLATE_MARKERS) + r")[^.!?;|•]*",
+    re.IGNORECASE,
+)
+
+DEFAULT_DESCRIPTION_TOKENS = 200
+DEFAULT_TAGS_TOKENS = 60
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate without a tokenizer: ~4 characters per token for
+    ASCII text, ~2 for other scripts (Cyrillic splits into more tokens).
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other_chars = len(text) - ascii_chars
+    return math.ceil(ascii_chars / 4 + other_chars / 2)
+
+
+def truncate_to_tokens(text, budget):
+    if budget <= 0 or not text:
+        return ""
+    if estimate_tokens(text) <= budget:
+        return text
+    words = text.split(" ")
+    kept = []
+    used = 0
+    for word in words:
+        cost = estimate_tokens(word + " ")
+        if used + cost > budget:
+            break
+        kept.append(word)
+        used += cost
+    return " ".join(kept).rstrip(" ,;:-")
+
+
+def strip_noise(text):
+    """Removes URLs, emails, chapter timestamps and boilerplate clauses."""
+    if not text:
+        return ""
+    text = EMAIL_PATTERN.sub(" ", text)
+    text = URL_PATTERN.sub(" " + LINK_PLACEHOLDER + " ", text)
+    text = TIMESTAMP_PATTERN.sub(" ", text)
+
+    text = BOILERPLATE_PATTERN.sub(" ", text).replace(LINK_PLACEHOLDER, " ")
+
+    kept = []
+    for sentence in SENTENCE_SPLIT_PATTERN.split(text):
+        sentence = sentence.strip(" -–—|•:")
+        # Skip what is left of a clause that was cut out (a lone "." or "!").
+        if sentence.strip(".!?;,"):
+            kept.append(sentence)
+    text = re.sub(r"\s+", " ", " ".join(kept)).strip()
+    return re.sub(r"\s*([;,])(?:\s*[;,])+", r"\1", text)
+
+
+def compact_description(description, budget=None):
+    if budget is None:
+        budget = int(os.getenv("PROMPT_DESCRIPTION_TOKENS", DEFAULT_DESCRIPTION_TOKENS))
+    return truncate_to_tokens(strip_noise(description), budget)
+
+
+def compact_tags(tags, budget=None):
+    if budget is None:
+        budget = int(os.getenv("PROMPT_TAGS_TOKENS", DEFAULT_TAGS_TOKENS))
+    # Tags are already short phrases; dedupe case-insensitively before truncating.
+    seen = set()
+    unique = []
+    for tag in (tags or "").split(";"):
+        tag = tag.strip()
+        if tag and tag.lower() not in seen:
+            seen.add(tag.lower())
+            unique.append(tag)
+    return truncate_to_tokens("; ".join(unique), budget)
+
+
+class PromptStats:
+    """Running totals of estimated prompt tokens for one run."""
+
+    def __init__(self):
+        self.prompts = 0
+        self.full_tokens = 0
+        self.compact_tokens = 0
+        self.requests = 0
+        self.sent_tokens = 0
+        self._lock = threading.Lock()
+
+    def record_prompt(self, full_prompt, compact_prompt):
+        full, compact = estimate_tokens(full_prompt), estimate_tokens(compact_prompt)
+        with self._lock:
+            self.prompts += 1
+            self.full_tokens += full
+            self.compact_tokens += compact
+
+    def record_request(self, prompt):
+        # Called once per API request, so retries are counted too.
+        tokens = estimate_tokens(prompt)
+        with self._lock:
+            self.requests += 1
+            self.sent_tokens += tokens
+
+    def summary(self):
+        saved = self.full_tokens - self.compact_tokens
+        pct = (saved / self.full_tokens * 100) if self.full_tokens else 0
+        return (
+            f"Estimated prompt tokens sent: {self.sent_tokens} over {self.requests} requests "
+            f"for {self.prompts} videos; compaction saved {saved} ({pct:.1f}%)."
+        )
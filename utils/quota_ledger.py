@@ -0,0 +1,282 @@
+import datetime
+import hashlib
+import json
+import os
+import time
+
+from utils.rate_limiter import locked_file
+
+try:
+    from zoneinfo import ZoneInfo
+
+    QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+except Exception:
+    # No tz database available (e.g. Windows without tzdata); PST is close enough.
+    QUOTA_TZ = datetime.timezone(datetime.timedelta(hours=-8))
+
+DEFAULT_LEDGER_PATH = os.path.join("data", "youtube_quota.json")
+DEFAULT_DAILY_LIMIT = 10000
+DEFAULT_CEILING = 9000
+
+# Quota cost per call of the YouTube Data API methods we use.
+METHOD_COSTS = {
+    "videos.list": 1,
+    "channels.list": 1,
+}
+
+
+# API error reasons (error.errors[].reason / error.details[].reason) that take
+# a key out of the pool: for the rest of the quota day, or for the whole run.
+QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+KEY_REJECTED_REASONS = {"keyInvalid", "keyExpired", "API_KEY_INVALID", "accessNotConfigured", "ipRefererBlocked"}
+RATE_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+
+class QuotaCeilingReached(Exception):
+    pass
+
+
+class NoUsableApiKey(Exception):
+    pass
+
+
+def quota_day(now=None):
+    """YouTube Data API quota resets at midnight Pacific Time."""
+    now = now or datetime.datetime.now(QUOTA_TZ)
+    return now.astimezone(QUOTA_TZ).date().isoformat()
+
+
+def seconds_until_reset(now=None):
+    now = (now or datetime.datetime.now(QUOTA_TZ)).astimezone(QUOTA_TZ)
+    tomorrow = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=5, microsecond=0)
+    return max((tomorrow - now).total_seconds(), 0)
+
+
+class QuotaLedger:
+    """
+    Tracks YouTube Data API quota units and bytes transferred, both for the
+    current run and for the current quota day (persisted across runs), and
+    stops spending before the daily ceiling is hit.
+    """
+
+    def __init__(self, path=None, ceiling=None, on_ceiling=None):
+        self.path = path or os.getenv("YOUTUBE_QUOTA_LEDGER", DEFAULT_LEDGER_PATH)
+        self.ceiling = int(ceiling if ceiling is not None else os.getenv("YOUTUBE_QUOTA_CEILING", DEFAULT_CEILING))
+        self.on_ceiling = (on_ceiling or os.getenv("YOUTUBE_QUOTA_ON_CEILING", "wait")).lower()
+        self.run = {"units": 0, "calls": 0, "bytes": 0, "bytes_decompressed": 0}
+        self.day = self._load()
+
+    def _empty_day(self):
+        return {"day": quota_day(), "units": 0, "calls": 0, "bytes": 0}
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("day") == quota_day():
+                    return data
+            except (OSError, ValueError):
+                pass
+        return self._empty_day()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.day, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _roll_day(self):
+        if self.day["day"] != quota_day():
+            self.day = self._empty_day()
+
+    def remaining(self):
+        self._roll_day()
+        return self.ceiling - self.day["units"]
+
+    def _locked(self):
+        # Several pipelines (batch mode) may share one ledger file; re-read it under a lock.
+        return locked_file(f"{self.path}.lock")
+
+    def try_reserve(self, method):
+        """Charges `method` if it fits under today's ceiling; returns its cost, or None if it does not."""
+        cost = METHOD_COSTS.get(method, 1)
+        with self._locked():
+            self.day = self._load()
+            if self.remaining() < cost:
+                return None
+            self.day["units"] += cost
+            self.day["calls"] += 1
+            self._save()
+        self.run["units"] += cost
+        self.run["calls"] += 1
+        return cost
+
+    def mark_exhausted(self):
+        """The API reported the key out of quota (e.g. also used elsewhere): no more calls today."""
+        with self._locked():
+            self.day = self._load()
+            self.day["units"] = max(self.day["units"], self.ceiling)
+            self._save()
+
+    def reserve(self, method):
+        """
+        Call before each API request. Pauses until the quota day resets (or
+        raises QuotaCeilingReached when YOUTUBE_QUOTA_ON_CEILING=stop) if the
+        request would take today's usage past the ceiling.
+        """
+        while True:
+            cost = self.try_reserve(method)
+            if cost is not None:
+                return cost
+            if self.on_ceiling != "wait":
+                raise QuotaCeilingReached(
+                    f"YouTube quota ceiling reached ({self.day['units']}/{self.ceiling} units today)"
+                )
+            wait = seconds_until_reset()
+            print(
+                f"YouTube quota ceiling reached ({self.day['units']}/{self.ceiling} units). "
+                f"Pausing {wait / 3600:.1f}h until the daily reset..."
+            )
+            time.sleep(wait)
+
+    def record_bytes(self, wire_bytes, decompressed_bytes):
+        with self._locked():
+            self.day = self._load()
+            self.day["bytes"] += wire_bytes
+            self._save()
+        self.run["bytes"] += wire_bytes
+        self.run["bytes_decompressed"] += decompressed_bytes
+
+    def summary(self):
+        return (
+            f"YouTube API quota: {self.run['units']} units this run ({self.run['calls']} calls), "
+            f"{self.day['units']}/{self.ceiling} today; "
+            f"{self.run['bytes'] / 1024:.1f} KB transferred "
+            f"({self.run['bytes_decompressed'] / 1024:.1f} KB uncompressed)."
+        )
+
+
+def key_label(key):
+    """Short, log-safe name for an API key."""
+    return f"...{key[-4:]}"
+
+
+def key_ledger_path(path, key):
+    """Per-key ledger next to `path`, named by a hash of the key (never the key itself)."""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(key.encode('utf-8')).hexdigest()[:10]}{ext or '.json'}"
+
+
+class PooledKey:
+    def __init__(self, key, ledger):
+        self.key = key
+        self.label = key_label(key)
+        self.ledger = ledger
+        self.cooldown_until = 0.0
+        self.rejected = None
+
+
+class ApiKeyPool:
+    """
+    Several YouTube Data API keys (YOU_TUBE_API_KEYS, comma-separated, plus
+    YOU_TUBE_API_KEY), each with its own quota ledger and ceiling. Every
+    call goes to the usable key with the most quota left today. A key the
+    API reports out of quota is skipped until the daily reset. A key it
+    rejects (invalid, API not enabled) is dropped for the run. A
+    rate-limited key cools down while the others carry on.
+
+    With a single key the ledger stays at YOUTUBE_QUOTA_LEDGER; with several,
+    each key gets <ledger>.<key hash>.json next to it.
+    """
+
+    def __init__(self, keys, ledger_path=None, ceiling=None, on_ceiling=None):
+        keys = list(dict.fromkeys(key.strip() for key in keys if key and key.strip()))
+        path = ledger_path or os.getenv("YOUTUBE_QUOTA_LEDGER", DEFAULT_LEDGER_PATH)
+        self.on_ceiling = (on_ceiling or os.getenv("YOUTUBE_QUOTA_ON_CEILING", "wait")).lower()
+        self.keys = [
+            PooledKey(key, QuotaLedger(
+                path=path if len(keys) == 1 else key_ledger_path(path, key),
+                ceiling=ceiling,
+                on_ceiling="stop",
+            ))
+            for key in keys
+        ]
+
+    @classmethod
+    def from_env(cls):
+        keys = os.getenv("YOU_TUBE_API_KEYS", "").split(",") + [os.getenv("YOU_TUBE_API_KEY", "")]
+        return cls(keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def remaining(self):
+        return sum(entry.ledger.remaining() for entry in self.keys if entry.rejected is None)
+
+    def acquire(self, method):
+        """
+        Picks a key for one `method` call and charges it; returns (PooledKey,
+        cost). Waits out cooldowns. When every key is at its ceiling, pauses
+        until the daily reset (or raises QuotaCeilingReached with
+        YOUTUBE_QUOTA_ON_CEILING=stop).
+        """
+        while True:
+            usable = [entry for entry in self.keys if entry.rejected is None]
+            if not usable:
+                reasons = ", ".join(f"{entry.label}: {entry.rejected}" for entry in self.keys)
+                raise NoUsableApiKey(f"Every YouTube API key was rejected ({reasons or 'no keys configured'})")
+            now = time.time()
+            ready = [entry for entry in usable if entry.cooldown_until <= now]
+            for entry in sorted(ready, key=lambda entry: entry.ledger.remaining(), reverse=True):
+                cost = entry.ledger.try_reserve(method)
+                if cost is not None:
+                    return entry, cost
+            cooling = [entry.cooldown_until for entry in usable if entry.cooldown_until > now]
+            if cooling:
+                time.sleep(min(cooling) - now)
+                continue
+            if self.on_ceiling != "wait":
+                raise QuotaCeilingReached(f"YouTube quota ceiling reached on all {len(usable)} API keys")
+            wait = seconds_until_reset()
+            print(f"YouTube quota ceiling reached on all {len(usable)} API keys. Pausing {wait / 3600:.1f}h until the daily reset...")
+            time.sleep(wait)
+
+    def drop(self, entry, reasons):
+        """
+        Takes `entry` out of rotation if the API error `reasons` say it is out
+        of quota or unusable; returns True if it did (the call should go to
+        another key).
+        """
+        if reasons & QUOTA_REASONS:
+            entry.ledger.mark_exhausted()
+            print(f"YouTube API key {entry.label} is out of quota for today; switching keys.")
+            return True
+        if reasons & KEY_REJECTED_REASONS:
+            entry.rejected = ", ".join(sorted(reasons & KEY_REJECTED_REASONS))
+            print(f"YouTube API key {entry.label} was rejected ({entry.rejected}); dropping it for this run.")
+            return True
+        return False
+
+    def cool_down(self, entry, seconds):
+        entry.cooldown_until = max(entry.cooldown_until, time.time() + seconds)
+
+    def record_bytes(self, entry, wire_bytes, decompressed_bytes):
+        entry.ledger.record_bytes(wire_bytes, decompressed_bytes)
+
+    def summary(self):
+        if len(self.keys) == 1:
+            return self.keys[0].ledger.summary()
+        lines = [f"YouTube API quota across {len(self.keys)} keys:"]
+        for entry in self.keys:
+            ledger = entry.ledger
+            state = f", rejected ({entry.rejected})" if entry.rejected else ""
+            lines.append(
+                f"  {entry.label}: {ledger.run['units']} units this run, "
+                f"{ledger.day['units']}/{ledger.ceiling} today{state}"
+            )
+        wire = sum(entry.ledger.run["bytes"] for entry in self.keys)
+        raw = sum(entry.ledger.run["bytes_decompressed"] for entry in self.keys)
+        lines.append(f"  {wire / 1024:.1f} KB transferred ({raw / 1024:.1f} KB uncompressed).")
+        return "\n".join(lines)
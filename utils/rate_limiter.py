@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no flock; limits then only hold within one process.
+    fcntl = None
+
+RATE_LIMIT_DIR_ENV = "RATE_LIMIT_DIR"
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def locked_file(path):
+    """
+    Exclusive lock on `path` (created if missing) shared by every thread and
+    process using the same file. Yields the open file for read/modify/write.
+    """
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with thread_lock:
+        with open(path, "a+", encoding="utf-8") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                yield f
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _read_json(f, default):
+    f.seek(0)
+    text = f.read()
+    try:
+        return json.loads(text) if text else default
+    except ValueError:
+        return default
+
+
+def _write_json(f, data):
+    f.seek(0)
+    f.truncate()
+    json.dump(data, f)
+    f.flush()
+
+
+class RateLimiter:
+    """
+    Token bucket of `rate` requests per second with bursts up to `burst`.
+    With a state directory the bucket lives in `<dir>/<name>.json` under an
+    flock, so concurrent pipeline processes (batch mode) share one limit.
+    """
+
+    def __init__(self, name, rate, burst=None, state_dir=None):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+        self.path = os.path.join(state_dir, f"{name}.json") if state_dir else None
+        self._lock = threading.Lock()
+        self._state = {"tokens": self.burst, "updated": time.time()}
+        self.waited_seconds = 0.0
+
+    def _take(self, state):
+        """Refills and tries to take a token; returns seconds to wait (0 when taken)."""
+        now = time.time()
+        tokens = min(self.burst, state["tokens"] + (now - state["updated"]) * self.rate)
+        state["updated"] = now
+        if tokens >= 1:
+            state["tokens"] = tokens - 1
+            return 0.0
+        state["tokens"] = tokens
+        return (1 - tokens) / self.rate
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            if self.path:
+                with locked_file(self.path) as f:
+                    state = _read_json(f, {"tokens": self.burst, "updated": time.time()})
+                    wait = self._take(state)
+                    _write_json(f, state)
+            else:
+                with self._lock:
+                    wait = self._take(self._state)
+            if not wait:
+                return
+            with self._lock:
+                self.waited_seconds += wait
+            time.sleep(wait)
+
+
+def get_rate_limiter(name, default_rate=None):
+    """
+    Limiter for `name` from `<NAME>_RATE_LIMIT` (requests per second) and
+    optional `<NAME>_RATE_BURST`, or None when no limit is configured.
+    One limiter per name and settings per process, so a changed environment
+    (e.g. a daemon job) gets a limiter for its own settings.
+    """
+    prefix = name.upper()
+    rate = os.getenv(f"{prefix}_RATE_LIMIT", default_rate)
+    if not rate or float(rate) <= 0:
+        return None
+    state_dir = os.getenv(RATE_LIMIT_DIR_ENV)
+    return _rate_limiter(
+        name,
+        float(rate),
+        os.getenv(f"{prefix}_RATE_BURST"),
+        os.path.abspath(state_dir) if state_dir else None,
+    )
+
+
+@lru_cache(maxsize=None)
+def _rate_limiter(name, rate, burst, state_dir):
+    return RateLimiter(name, rate, burst=burst, state_dir=state_dir)
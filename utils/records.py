@@ -0,0 +1,110 @@
+import csv
+import sys
+from itertools import islice
+
+# Low-cardinality columns: every row shares one string object per distinct
+# value (sys.intern) instead of holding its own copy.
+INTERNED_FIELDS = frozenset([
+    "Date",
+    "FirstWatched",
+    "LastWatched",
+    "Channel",
+    "ChannelID",
+    "Duration",
+    "OriginalLanguage",
+    "Category",
+    "ChannelCountry",
+    "ChannelTopics",
+    "ChannelSubscribers",
+])
+
+
+class RecordSchema:
+    """Column layout shared by every Record read from one CSV."""
+
+    def __init__(self, fieldnames):
+        self.fields = list(fieldnames)
+        self.index = {name: i for i, name in enumerate(self.fields)}
+        self.interned = [i for i, name in enumerate(self.fields) if name in INTERNED_FIELDS]
+
+    def make(self, values):
+        if len(values) < len(self.fields):
+            values.extend([""] * (len(self.fields) - len(values)))
+        for i in self.interned:
+            values[i] = sys.intern(values[i])
+        return Record(self, values)
+
+
+class Record:
+    """
+    One CSV row as a list of values plus a shared schema, instead of a dict
+    per row. Supports the dict operations the steps use (`row["X"]`,
+    `row.get("X")`, assignment to known columns) and can be passed to
+    csv.DictWriter directly.
+    """
+
+    __slots__ = ("schema", "values")
+
+    def __init__(self, schema, values):
+        self.schema = schema
+        self.values = values
+
+    def __getitem__(self, key):
+        return self.values[self.schema.index[key]]
+
+    def __setitem__(self, key, value):
+        if key in INTERNED_FIELDS and isinstance(value, str):
+            value = sys.intern(value)
+        self.values[self.schema.index[key]] = value
+
+    def __contains__(self, key):
+        return key in self.schema.index
+
+    def get(self, key, default=None):
+        i = self.schema.index.get(key)
+        return default if i is None else self.values[i]
+
+    def keys(self):
+        return self.schema.index.keys()
+
+    def to_dict(self):
+        return dict(zip(self.schema.fields, self.values))
+
+
+def read_records(f, extra_fields=()):
+    """
+    Streams Records from an open CSV file. Columns in `extra_fields` that the
+    file lacks are added (empty), so steps can fill in their output columns.
+    Returns (input fieldnames, record iterator).
+    """
+    reader = csv.reader(f)
+    header = next(reader, None) or []
+    schema = RecordSchema(header + [name for name in extra_fields if name not in header])
+    return header, (schema.make(values) for values in reader)
+
+
+def remap_records(rows, fieldnames, extra_fields=()):
+    """
+    Like read_records, for rows handed over in-process by another step
+    (Records or dicts) instead of read from its CSV: re-creates them with this
+    step's columns. Returns (fieldnames, record iterator).
+    """
+    header = list(fieldnames)
+    schema = RecordSchema(header + [name for name in extra_fields if name not in header])
+    return header, (schema.make([row.get(name, "") for name in schema.fields]) for row in rows)
+
+
+def chunked(iterable, size):
+    """Yields lists of up to `size` items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def count_records(path):
+    """Number of data rows in a CSV (streams the file; rows may contain quoted newlines)."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
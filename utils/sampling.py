@@ -0,0 +1,167 @@
+import csv
+import hashlib
+import math
+import os
+
+PREVIEW_ENV = "PIPELINE_PREVIEW"
+DEFAULT_PREVIEW_SIZE = 500
+SAMPLE_FIELDS = ["Stratum", "SampleWeight"]
+# Two-sided 95% normal interval.
+Z_95 = 1.96
+# Month strata are only used when each can get about this many rows; with
+# fewer, the per-stratum variances (and so the intervals) are unreliable.
+MIN_STRATUM_SAMPLE = 30
+
+
+def preview_enabled():
+    return os.getenv(PREVIEW_ENV, "0") == "1"
+
+
+def data_file(name):
+    """data/<name>, or data/<stem>_preview<ext> when the pipeline runs in preview mode."""
+    if preview_enabled():
+        stem, ext = os.path.splitext(name)
+        name = f"{stem}_preview{ext}"
+    return os.path.join("data", name)
+
+
+def chart_dir():
+    return os.path.join("output", "preview") if preview_enabled() else "output"
+
+
+def stratum_key(row, by_year=False):
+    """Watch month (or year) plus format: taste and Shorts share both drift over time."""
+    date = row.get("FirstWatched") or row.get("Date") or ""
+    period = date[:4] if by_year else date[:7]
+    kind = "short" if "/shorts/" in (row.get("Link") or "") else "video"
+    return f"{period or 'unknown'}|{kind}"
+
+
+def allocate(sizes, total):
+    """
+    Proportional allocation of `total` sample slots over strata {key: size},
+    at least one per stratum (so every stratum is represented), with the
+    remaining slots handed out by largest remainder.
+    """
+    population = sum(sizes.values())
+    if total >= population:
+        return dict(sizes)
+    allocation = {key: 1 for key in sizes}
+    remaining = total - len(sizes)
+    if remaining <= 0:
+        return allocation
+    spare = {key: size - 1 for key, size in sizes.items()}
+    spare_total = sum(spare.values())
+    shares = {key: remaining * size / spare_total for key, size in spare.items()}
+    for key, share in shares.items():
+        allocation[key] += int(share)
+    leftover = remaining - sum(int(share) for share in shares.values())
+    by_remainder = sorted(shares, key=lambda key: (shares[key] - int(shares[key]), key), reverse=True)
+    for key in by_remainder[:leftover]:
+        allocation[key] += 1
+    return allocation
+
+
+def _rank(video_id, seed):
+    return hashlib.sha1(f"{seed}:{video_id}".encode("utf-8")).hexdigest()
+
+
+def draw_sample(input_path, output_path, size, seed="preview"):
+    """
+    Writes a deterministic stratified sample of Step 3 output to `output_path`.
+
+    Rows are stratified by watch month and format, coarsened to years when
+    the sample is too small for MIN_STRATUM_SAMPLE rows per month stratum. Within a stratum the
+    videos with the lowest hash of seed+VideoID are kept, so the same history
+    and seed always give the same sample, and a grown history keeps most of
+    its earlier sample (and therefore its cached enrichment and labels).
+    Each row gets its Stratum and SampleWeight (stratum size / sampled rows).
+    Returns (population, sampled rows, strata).
+    """
+    with open(input_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames or [])
+        keys = [(row.get("VideoID", ""), stratum_key(row), stratum_key(row, by_year=True)) for row in reader]
+
+    by_year = len({month for _, month, _ in keys}) * MIN_STRATUM_SAMPLE > size
+    strata = {}
+    for position, (video_id, month, year) in enumerate(keys):
+        strata.setdefault(year if by_year else month, []).append((_rank(video_id, seed), position))
+
+    allocation = allocate({key: len(members) for key, members in strata.items()}, size)
+    selected = {}
+    for key, members in strata.items():
+        taken = sorted(members)[:allocation[key]]
+        weight = len(members) / len(taken)
+        for _, position in taken:
+            selected[position] = (key, weight)
+
+    out_fields = fieldnames + [name for name in SAMPLE_FIELDS if name not in fieldnames]
+    with open(input_path, "r", encoding="utf-8", newline="") as f_in, \
+            open(output_path, "w", newline="", encoding="utf-8") as f_out:
+        writer = csv.DictWriter(f_out, fieldnames=out_fields)
+        writer.writeheader()
+        for position, row in enumerate(csv.DictReader(f_in)):
+            if position in selected:
+                row["Stratum"], weight = selected[position]
+                row["SampleWeight"] = f"{weight:.6g}"
+                writer.writerow(row)
+    return len(keys), len(selected), len(strata)
+
+
+def stratified_totals(rows):
+    """
+    Estimated population totals with 95% confidence margins from a
+    stratified sample.
+
+    `rows` yields (stratum, weight, group, value) per sampled video, where
+    weight is the stratum's SampleWeight and value what is being totaled for
+    `group` (1 to count videos, watch seconds for time). Returns
+    {group: (estimate, margin)}; the interval is estimate +/- margin.
+    """
+    sampled = {}
+    weights = {}
+    sums = {}
+    for stratum, weight, group, value in rows:
+        sampled[stratum] = sampled.get(stratum, 0) + 1
+        weights[stratum] = weights.get(stratum, 0.0) + weight
+        entry = sums.setdefault(group, {}).setdefault(stratum, [0.0, 0.0])
+        entry[0] += value
+        entry[1] += value * value
+
+    sample_size = sum(sampled.values())
+    totals = {}
+    for group, by_stratum in sums.items():
+        estimate = 0.0
+        variance = 0.0
+        within_squares = 0.0
+        degrees = 0
+        single = []
+        for stratum, n in sampled.items():
+            population = weights[stratum]
+            total, squares = by_stratum.get(stratum, (0.0, 0.0))
+            mean = total / n
+            estimate += population * mean
+            if n > 1:
+                sample_variance = max(squares - n * mean * mean, 0.0) / (n - 1)
+                within_squares += (n - 1) * sample_variance
+                degrees += n - 1
+                correction = max(1 - n / population, 0.0)
+                variance += population * population * correction * sample_variance / n
+            else:
+                single.append(population)
+        if single:
+            # A stratum with one sampled video has no variance of its own. It
+            # borrows the larger of the pooled within-stratum variance and the
+            # variance over the whole sample, so sparse strata widen the interval.
+            group_total = sum(total for total, _ in by_stratum.values())
+            group_squares = sum(squares for _, squares in by_stratum.values())
+            if sample_size > 1:
+                overall = max(group_squares - group_total * group_total / sample_size, 0.0) / (sample_size - 1)
+            else:
+                overall = group_squares
+            borrowed = max(within_squares / degrees if degrees else 0.0, overall)
+            for population in single:
+                variance += population * population * max(1 - 1 / population, 0.0) * borrowed
+        totals[group] = (estimate, Z_95 * math.sqrt(variance))
+    return totals
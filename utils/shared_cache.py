@@ -0,0 +1,98 @@
+import json
+import os
+import sqlite3
+import time
+
+SHARED_CACHE_ENV = "SHARED_CACHE_PATH"
+
+# SQLite limits bound parameters per statement; stay well below it.
+CHUNK_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS video_metadata (
+    VideoID TEXT PRIMARY KEY,
+    details TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS video_categories (
+    VideoID TEXT PRIMARY KEY,
+    Category TEXT NOT NULL,
+    source TEXT,
+    categorized_at REAL NOT NULL
+);
+"""
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class SharedCache:
+    """
+    Video metadata and categories shared by several accounts' pipelines
+    (batch mode). Unlike the per-account warehouse it holds no watch
+    history, only facts about videos that are the same for everyone.
+    Safe for concurrent processes: WAL mode plus a generous busy timeout.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def _lookup(self, query, video_ids):
+        found = {}
+        for chunk in _chunks(video_ids):
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self.conn.execute(query.format(placeholders=placeholders), chunk).fetchall())
+        return found
+
+    def video_details(self, video_ids):
+        """Returns {VideoID: details dict} as produced by Step 4's fetch_video_details_batch."""
+        rows = self._lookup("SELECT VideoID, details FROM video_metadata WHERE VideoID IN ({placeholders})", video_ids)
+        return {vid: json.loads(details) for vid, details in rows.items()}
+
+    def store_video_details(self, details_by_id):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO video_metadata (VideoID, details, fetched_at) VALUES (?, ?, ?)",
+                [(vid, json.dumps(details, ensure_ascii=False), now) for vid, details in details_by_id.items()],
+            )
+
+    def categories(self, video_ids):
+        """Returns {VideoID: (Category, source)}."""
+        found = {}
+        for chunk in _chunks(video_ids):
+            placeholders = ",".join("?" * len(chunk))
+            for vid, category, source in self.conn.execute(
+                f"SELECT VideoID, Category, source FROM video_categories WHERE VideoID IN ({placeholders})", chunk
+            ):
+                found[vid] = (category, source or "")
+        return found
+
+    def store_categories(self, rows):
+        """`rows` are (VideoID, Category, source) tuples."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO video_categories (VideoID, Category, source, categorized_at) VALUES (?, ?, ?, ?)",
+                [(vid, category, source, now) for vid, category, source in rows],
+            )
+
+
+def open_shared_cache():
+    """Returns the SharedCache at SHARED_CACHE_PATH, or None when it is not set."""
+    path = os.getenv(SHARED_CACHE_ENV)
+    if not path:
+        return None
+    return SharedCache(path)
@@ -0,0 +1,23 @@
+import importlib.util
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STEPS_DIR = os.path.join(PROJECT_ROOT, "steps")
+
+_loaded = {}
+
+
+def load_step(name):
+    """
+    Imports a step script as a module. Step file names start with a digit
+    (e.g. "05_video_categorizer"), so they cannot be imported normally.
+    """
+    if name.endswith(".py"):
+        name = name[:-3]
+    if name not in _loaded:
+        path = os.path.join(STEPS_DIR, f"{name}.py")
+        spec = importlib.util.spec_from_file_location(f"step_{name}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded[name] = module
+    return _loaded[name]
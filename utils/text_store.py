@@ -0,0 +1,197 @@
+import json
+import os
+import sys
+import zlib
+from collections import OrderedDict
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from utils.video_ids import VideoIdMap
+except ImportError:
+    from utils.video_ids import VideoIdMap
+
+DEFAULT_TEXT_STORE_PATH = os.path.join("data", "text_store")
+TEXT_FIELDS = ("Description", "Tags")
+
+# Records per compressed block: large enough for zlib to find the repeated
+# boilerplate across descriptions, small enough that one lookup stays cheap.
+BLOCK_RECORDS = 64
+CACHED_BLOCKS = 16
+
+# Index columns: block offset, block length, slot in the block.
+INDEX_TYPECODES = "QIH"
+
+
+class TextStore:
+    """
+    Sidecar store for the long text fields (Description, Tags) keyed by
+    VideoID, so the pipeline CSVs and the warehouse stay narrow.
+
+    Layout under TEXT_STORE_PATH (default data/text_store/):
+    - blocks.bin: append-only zlib-compressed blocks of BLOCK_RECORDS
+      [VideoID, Description, Tags] records;
+    - index.bin: a JSON line with the dead-record count, then VideoID ->
+      (block offset, block length, slot) as sorted integer arrays
+      (utils/video_ids.VideoIdMap). An index.json from older runs is read
+      and replaced on save.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("TEXT_STORE_PATH", DEFAULT_TEXT_STORE_PATH)
+        self.blocks_path = os.path.join(self.path, "blocks.bin")
+        self.index_path = os.path.join(self.path, "index.bin")
+        self.legacy_index_path = os.path.join(self.path, "index.json")
+        self.index = VideoIdMap(INDEX_TYPECODES)
+        # Records superseded by a newer version of the same video, still taking space in blocks.bin.
+        self.dead = 0
+        self._dirty = False
+        try:
+            if os.path.exists(self.index_path):
+                self._load_index()
+            elif os.path.exists(self.legacy_index_path):
+                self._load_legacy_index()
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read text store index in {self.path}: {e}")
+        self._pending = []
+        self._cache = OrderedDict()
+        self._reader = None
+
+    def _load_index(self):
+        with open(self.index_path, "rb") as f:
+            self.dead = json.loads(f.readline()).get("dead", 0)
+            self.index = VideoIdMap.load(f)
+
+    def _load_legacy_index(self):
+        with open(self.legacy_index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for video_id, entry in data.get("index", {}).items():
+            self.index.set(video_id, *entry)
+        self.dead = data.get("dead", 0)
+        self._dirty = True
+
+    def __contains__(self, video_id):
+        return video_id in self.index or any(r[0] == video_id for r in self._pending)
+
+    def __len__(self):
+        return len(self.index)
+
+    def put(self, video_id, description, tags, replace=False):
+        """Stores a video's text. Existing entries are kept unless `replace`; returns True if written."""
+        if not video_id or (not replace and video_id in self):
+            return False
+        if video_id in self.index:
+            self.dead += 1
+        self._pending.append([video_id, description or "", tags or ""])
+        if len(self._pending) >= BLOCK_RECORDS:
+            self._flush_block()
+        return True
+
+    def _write_block(self, f, records, index):
+        payload = zlib.compress(json.dumps(records, ensure_ascii=False).encode("utf-8"), 6)
+        offset = f.tell()
+        f.write(payload)
+        for slot, record in enumerate(records):
+            index.set(record[0], offset, len(payload), slot)
+
+    def _flush_block(self):
+        if not self._pending:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.blocks_path, "ab") as f:
+            f.seek(0, os.SEEK_END)
+            self._write_block(f, self._pending, self.index)
+        self._pending = []
+        self._dirty = True
+
+    def _block(self, offset, length):
+        records = self._cache.get(offset)
+        if records is not None:
+            self._cache.move_to_end(offset)
+            return records
+        if self._reader is None:
+            self._reader = open(self.blocks_path, "rb")
+        self._reader.seek(offset)
+        records = json.loads(zlib.decompress(self._reader.read(length)).decode("utf-8"))
+        self._cache[offset] = records
+        if len(self._cache) > CACHED_BLOCKS:
+            self._cache.popitem(last=False)
+        return records
+
+    def get(self, video_id):
+        """Returns (description, tags); empty strings when nothing is stored for the video."""
+        self._flush_block()
+        entry = self.index.get(video_id)
+        if entry is None:
+            return "", ""
+        offset, length, slot = entry
+        _, description, tags = self._block(offset, length)[slot]
+        return description, tags
+
+    def get_many(self, video_ids):
+        """{VideoID: (description, tags)}, reading each needed block once."""
+        self._flush_block()
+        ordered = sorted(set(video_ids), key=lambda vid: self.index.get(vid, (-1,))[0])
+        return {vid: self.get(vid) for vid in ordered}
+
+    def compact(self):
+        """Rewrites blocks.bin with only the current version of each video."""
+        self._flush_block()
+        tmp_path = f"{self.blocks_path}.tmp"
+        new_index = VideoIdMap(INDEX_TYPECODES)
+        with open(tmp_path, "wb") as f:
+            batch = []
+            for vid, _ in sorted(self.index.items(), key=lambda item: item[1][0]):
+                description, tags = self.get(vid)
+                batch.append([vid, description, tags])
+                if len(batch) >= BLOCK_RECORDS:
+                    self._write_block(f, batch, new_index)
+                    batch = []
+            if batch:
+                self._write_block(f, batch, new_index)
+        if self._reader:
+            self._reader.close()
+            self._reader = None
+        os.replace(tmp_path, self.blocks_path)
+        self.index = new_index
+        self.dead = 0
+        self._cache.clear()
+        self._dirty = True
+
+    def save(self):
+        self._flush_block()
+        if self.dead > len(self.index):
+            self.compact()
+        if not self._dirty:
+            return
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps({"dead": self.dead}).encode("utf-8") + b"\n")
+            self.index.dump(f)
+        os.replace(tmp_path, self.index_path)
+        if os.path.exists(self.legacy_index_path):
+            os.remove(self.legacy_index_path)
+        self._dirty = False
+
+    def close(self):
+        self.save()
+        if self._reader:
+            self._reader.close()
+            self._reader = None
+
+
+def attach_text(rows, store=None):
+    """
+    Fills Description and Tags on dict rows read from the narrow CSVs, from
+    the text store. Rows that already carry the text (older CSVs) are kept.
+    """
+    missing = [row.get("VideoID", "") for row in rows if "Description" not in row]
+    if not missing:
+        return rows
+    if store is None:
+        store = TextStore()
+    texts = store.get_many(missing)
+    for row in rows:
+        if "Description" not in row:
+            row["Description"], row["Tags"] = texts.get(row.get("VideoID", ""), ("", ""))
+    return rows
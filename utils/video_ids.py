@@ -0,0 +1,138 @@
+import binascii
+import json
+import re
+from array import array
+from bisect import bisect_left
+
+# A VideoID is 11 base64url characters encoding 64 bits: the last character
+# only carries 4 bits, so it is one of these 16. Such IDs map losslessly to
+# an unsigned 64-bit integer.
+_VIDEO_ID = re.compile(r"[A-Za-z0-9_-]{10}[AEIMQUYcgkosw048]")
+_TO_STANDARD = bytes.maketrans(b"-_", b"+/")
+_TO_URLSAFE = bytes.maketrans(b"+/", b"-_")
+
+# New keys wait in a plain set/dict until there are this many (or a quarter
+# of the sorted part), then they are merged into the sorted arrays.
+MIN_MERGE = 4096
+
+
+def encode(video_id):
+    """The VideoID as a 64-bit integer, or None if it is not a well-formed ID."""
+    if len(video_id) != 11 or not _VIDEO_ID.fullmatch(video_id):
+        return None
+    return int.from_bytes(binascii.a2b_base64(video_id.encode("ascii").translate(_TO_STANDARD) + b"="), "big")
+
+
+def decode(code):
+    return binascii.b2a_base64(code.to_bytes(8, "big"), newline=False)[:11].translate(_TO_URLSAFE).decode("ascii")
+
+
+class VideoIdMap:
+    """
+    VideoID -> tuple of integers, stored as columns of typed arrays sorted by
+    the encoded ID (8 bytes per key plus the value columns, instead of a str
+    key and a list per entry). `typecodes` gives one array typecode per value
+    column, e.g. "QIH". Lookups are a binary search. Keys that are not
+    well-formed VideoIDs go to a small dict on the side.
+    """
+
+    def __init__(self, typecodes=""):
+        self.typecodes = typecodes
+        self.keys = array("Q")
+        self.columns = [array(t) for t in typecodes]
+        self._pending = {}
+        self._other = {}
+
+    def __len__(self):
+        return len(self.keys) + len(self._pending) + len(self._other)
+
+    def __contains__(self, video_id):
+        code = encode(video_id)
+        if code is None:
+            return video_id in self._other
+        return code in self._pending or self._position(code) is not None
+
+    def __iter__(self):
+        self._merge()
+        for code in self.keys:
+            yield decode(code)
+        yield from self._other
+
+    def _position(self, code):
+        i = bisect_left(self.keys, code)
+        if i < len(self.keys) and self.keys[i] == code:
+            return i
+        return None
+
+    def get(self, video_id, default=None):
+        code = encode(video_id)
+        if code is None:
+            return self._other.get(video_id, default)
+        value = self._pending.get(code)
+        if value is not None:
+            return value
+        i = self._position(code)
+        if i is None:
+            return default
+        return tuple(column[i] for column in self.columns)
+
+    def set(self, video_id, *values):
+        code = encode(video_id)
+        if code is None:
+            self._other[video_id] = values
+            return
+        i = None if code in self._pending else self._position(code)
+        if i is not None:
+            for column, value in zip(self.columns, values):
+                column[i] = value
+            return
+        self._pending[code] = values
+        if len(self._pending) >= max(MIN_MERGE, len(self.keys) // 4):
+            self._merge()
+
+    def items(self):
+        self._merge()
+        for i, code in enumerate(self.keys):
+            yield decode(code), tuple(column[i] for column in self.columns)
+        yield from self._other.items()
+
+    def _merge(self):
+        if not self._pending:
+            return
+        new_keys = sorted(self._pending)
+        keys = self.keys + array("Q", new_keys)
+        columns = [
+            column + array(column.typecode, (self._pending[code][n] for code in new_keys))
+            for n, column in enumerate(self.columns)
+        ]
+        self._pending = {}
+        # Both parts are sorted, so this sort is a single merge of two runs.
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = array("Q", map(keys.__getitem__, order))
+        self.columns = [array(column.typecode, map(column.__getitem__, order)) for column in columns]
+
+    def dump(self, f):
+        """Writes a one-line JSON header and the raw arrays to binary file `f`."""
+        self._merge()
+        header = {
+            "typecodes": self.typecodes,
+            "count": len(self.keys),
+            "other": {key: list(value) for key, value in self._other.items()},
+        }
+        f.write(json.dumps(header, separators=(",", ":")).encode("utf-8") + b"\n")
+        for values in [self.keys] + self.columns:
+            values.tofile(f)
+
+    @classmethod
+    def load(cls, f):
+        """Reads what dump() wrote; ValueError if the file is truncated."""
+        header = json.loads(f.readline())
+        table = cls(header["typecodes"])
+        try:
+            for values in [table.keys] + table.columns:
+                values.fromfile(f, header["count"])
+        except EOFError:
+            raise ValueError("truncated VideoID table")
+        table._other = {key: tuple(value) for key, value in header["other"].items()}
+        return table
+
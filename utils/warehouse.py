@@ -0,0 +1,383 @@
+import datetime
+import os
+import sqlite3
+import time
+from collections import Counter
+
+from utils.normalize import map_language, parse_duration_seconds
+
+DEFAULT_WAREHOUSE_PATH = os.path.join("data", "warehouse.sqlite")
+
+# SQLite limits bound parameters per statement; stay well below it.
+CHUNK_SIZE = 500
+
+ROLLUP_PERIODS = ("day", "week", "month")
+ROLLUP_DIMENSIONS = ("Channel", "Category", "LangGroup")
+
+
+ENRICHED_FIELDS = [
+    "Title",
+    "Channel",
+    "ChannelID",
+    "Duration",
+    "OriginalLanguage",
+    "ChannelSubscribers",
+    "ChannelCountry",
+    "ChannelTopics",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    VideoID TEXT PRIMARY KEY,
+    Title TEXT,
+    Link TEXT,
+    Channel TEXT,
+    ChannelID TEXT,
+    Duration TEXT,
+    DurationSeconds INTEGER,
+    OriginalLanguage TEXT,
+    LangGroup TEXT,
+    Category TEXT,
+    CategorySource TEXT,
+    ChannelSubscribers TEXT,
+    ChannelCountry TEXT,
+    ChannelTopics TEXT,
+    enriched_at REAL,
+    categorized_at REAL
+);
+CREATE TABLE IF NOT EXISTS watches (
+    VideoID TEXT NOT NULL,
+    WatchDate TEXT NOT NULL,
+    Views INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (VideoID, WatchDate)
+);
+CREATE INDEX IF NOT EXISTS idx_watches_date ON watches (WatchDate);
+CREATE INDEX IF NOT EXISTS idx_videos_channel ON videos (Channel);
+CREATE INDEX IF NOT EXISTS idx_videos_category ON videos (Category);
+CREATE INDEX IF NOT EXISTS idx_videos_language ON videos (LangGroup);
+CREATE TABLE IF NOT EXISTS rollups (
+    Period TEXT NOT NULL,
+    Bucket TEXT NOT NULL,
+    Dimension TEXT NOT NULL,
+    Value TEXT NOT NULL,
+    Views INTEGER NOT NULL,
+    Seconds INTEGER NOT NULL,
+    PRIMARY KEY (Period, Dimension, Bucket, Value)
+);
+CREATE TABLE IF NOT EXISTS dirty_dates (
+    WatchDate TEXT PRIMARY KEY
+);
+"""
+
+
+def period_start(day, period):
+    """'2025-03-13' -> the ISO date starting its day, week (Monday) or month bucket."""
+    date = datetime.date.fromisoformat(day)
+    if period == "week":
+        date -= datetime.timedelta(days=date.weekday())
+    elif period == "month":
+        date = date.replace(day=1)
+    return date.isoformat()
+
+
+def period_end(bucket, period):
+    """First day after the bucket starting at `bucket`."""
+    date = datetime.date.fromisoformat(bucket)
+    if period == "day":
+        date += datetime.timedelta(days=1)
+    elif period == "week":
+        date += datetime.timedelta(days=7)
+    else:
+        date = (date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return date.isoformat()
+
+
+def _is_iso_date(value):
+    try:
+        datetime.date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class Warehouse:
+    """
+    Local SQLite system of record for watch history. Every run upserts into
+    it by VideoID (videos) and VideoID + watch date (watches), so history
+    accumulates across monthly runs instead of being overwritten, and later
+    runs only enrich and categorize videos the warehouse has not seen.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("WAREHOUSE_PATH", DEFAULT_WAREHOUSE_PATH)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Warehouses from before CategorySource get the column; their labels keep an unknown (NULL) source.
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(videos)")}
+        if "CategorySource" not in columns:
+            self.conn.execute("ALTER TABLE videos ADD COLUMN CategorySource TEXT")
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    # --- Step 3: watch events -------------------------------------------------
+
+    def upsert_watches(self, video_id, title, link, watch_dates):
+        """
+        Records one video's views per date. Re-importing the same dates
+        replaces their counts, so re-running a month is idempotent.
+        """
+        self.conn.execute(
+            "INSERT INTO videos (VideoID, Title, Link) VALUES (?, ?, ?) "
+            "ON CONFLICT(VideoID) DO UPDATE SET Link = excluded.Link",
+            (video_id, title, link),
+        )
+        self.conn.executemany(
+            "INSERT INTO watches (VideoID, WatchDate, Views) VALUES (?, ?, ?) "
+            "ON CONFLICT(VideoID, WatchDate) DO UPDATE SET Views = excluded.Views",
+            [(video_id, date, views) for date, views in Counter(watch_dates).items()],
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO dirty_dates (WatchDate) VALUES (?)",
+            [(date,) for date in set(watch_dates)],
+        )
+
+    # --- Step 4: enrichment ---------------------------------------------------
+
+    def enriched(self, video_ids):
+        """Returns {VideoID: {field: value}} for videos that were already enriched."""
+        found = {}
+        columns = ", ".join(["VideoID"] + ENRICHED_FIELDS)
+        for chunk in _chunks(video_ids):
+            placeholders = ",".join("?" * len(chunk))
+            for row in self.conn.execute(
+                f"SELECT {columns} FROM videos WHERE enriched_at IS NOT NULL AND VideoID IN ({placeholders})",
+                chunk,
+            ):
+                found[row["VideoID"]] = {f: row[f] or "" for f in ENRICHED_FIELDS}
+        return found
+
+    def upsert_enrichment(self, rows):
+        now = time.time()
+        params = []
+        for row in rows:
+            values = [row.get(f, "") for f in ENRICHED_FIELDS]
+            params.append(
+                [row["VideoID"], row.get("Link", "")] + values + [
+                    parse_duration_seconds(row.get("Duration", "")),
+                    map_language(row.get("OriginalLanguage", "")),
+                    now,
+                ]
+            )
+        columns = ["VideoID", "Link"] + ENRICHED_FIELDS + ["DurationSeconds", "LangGroup", "enriched_at"]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns[2:])
+        self.conn.executemany(
+            f"INSERT INTO videos ({', '.join(columns)}) VALUES ({','.join('?' * len(columns))}) "
+            f"ON CONFLICT(VideoID) DO UPDATE SET {updates}",
+            params,
+        )
+        self._mark_videos_dirty(p[0] for p in params)
+        self.conn.commit()
+
+    def move_text_to(self, text_store):
+        """
+        Warehouses created before the text store kept Description and Tags
+        columns; moves their contents into `text_store` once and clears them.
+        Returns the number of videos moved.
+        """
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(videos)")}
+        if "Description" not in columns:
+            return 0
+        rows = self.conn.execute(
+            "SELECT VideoID, Description, Tags FROM videos WHERE Description IS NOT NULL OR Tags IS NOT NULL"
+        ).fetchall()
+        for row in rows:
+            text_store.put(row["VideoID"], row["Description"], row["Tags"])
+        text_store.save()
+        self.conn.execute("UPDATE videos SET Description = NULL, Tags = NULL")
+        self.conn.commit()
+        return len(rows)
+
+    # --- Step 5: categories ---------------------------------------------------
+
+    def categories(self, video_ids):
+        """Returns {VideoID: (Category, source)}; the source is "" for labels stored before it was recorded."""
+        found = {}
+        for chunk in _chunks(video_ids):
+            placeholders = ",".join("?" * len(chunk))
+            for row in self.conn.execute(
+                f"SELECT VideoID, Category, CategorySource FROM videos "
+                f"WHERE Category IS NOT NULL AND VideoID IN ({placeholders})",
+                chunk,
+            ):
+                found[row["VideoID"]] = (row["Category"], row["CategorySource"] or "")
+        return found
+
+    def upsert_categories(self, rows):
+        """`rows` are (VideoID, Category, source) tuples."""
+        now = time.time()
+        rows = list(rows)
+        self.conn.executemany(
+            "INSERT INTO videos (VideoID, Category, CategorySource, categorized_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(VideoID) DO UPDATE SET Category = excluded.Category, "
+            "CategorySource = excluded.CategorySource, categorized_at = excluded.categorized_at",
+            [(vid, category, source, now) for vid, category, source in rows],
+        )
+        self._mark_videos_dirty(vid for vid, _, _ in rows)
+        self.conn.commit()
+
+    # --- Rollups --------------------------------------------------------------
+
+    def _mark_videos_dirty(self, video_ids):
+        # A video's Channel/Category/LangGroup/duration changed: every day it was watched needs recomputing.
+        for chunk in _chunks(video_ids):
+            placeholders = ",".join("?" * len(chunk))
+            self.conn.execute(
+                f"INSERT OR IGNORE INTO dirty_dates (WatchDate) "
+                f"SELECT DISTINCT WatchDate FROM watches WHERE VideoID IN ({placeholders})",
+                chunk,
+            )
+
+    def refresh_rollups(self):
+        """
+        Brings the rollups up to date. Only days touched since the last refresh
+        (and the weeks and months containing them) are recomputed, so the cost
+        follows the size of the latest import, not of the whole history.
+        Returns the number of days recomputed.
+        """
+        if self.conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone() is None:
+            # First refresh on a warehouse created before rollups existed: backfill everything.
+            self.conn.execute("INSERT OR IGNORE INTO dirty_dates (WatchDate) SELECT DISTINCT WatchDate FROM watches")
+        days = [row[0] for row in self.conn.execute("SELECT WatchDate FROM dirty_dates ORDER BY WatchDate")]
+        if not days:
+            return 0
+        for chunk in _chunks(days):
+            placeholders = ",".join("?" * len(chunk))
+            self.conn.execute(
+                f"DELETE FROM rollups WHERE Period = 'day' AND Bucket IN ({placeholders})", chunk
+            )
+            for dimension in ROLLUP_DIMENSIONS:
+                self.conn.execute(
+                    f"""
+                    INSERT INTO rollups (Period, Bucket, Dimension, Value, Views, Seconds)
+                    SELECT 'day', w.WatchDate, ?, COALESCE(NULLIF(v.{dimension}, ''), 'Unknown'),
+                           SUM(w.Views), SUM(w.Views * COALESCE(v.DurationSeconds, 0))
+                    FROM watches w JOIN videos v ON v.VideoID = w.VideoID
+                    WHERE w.WatchDate IN ({placeholders})
+                    GROUP BY w.WatchDate, 3, 4
+                    """,
+                    [dimension] + chunk,
+                )
+
+        # Weeks and months are re-summed from the (much smaller) day rollups.
+        iso_days = [day for day in days if _is_iso_date(day)]
+        for period in ("week", "month"):
+            for bucket in sorted({period_start(day, period) for day in iso_days}):
+                bucket_end = period_end(bucket, period)
+                self.conn.execute("DELETE FROM rollups WHERE Period = ? AND Bucket = ?", (period, bucket))
+                for dimension in ROLLUP_DIMENSIONS:
+                    self.conn.execute(
+                        """
+                        INSERT INTO rollups (Period, Bucket, Dimension, Value, Views, Seconds)
+                        SELECT ?, ?, Dimension, Value, SUM(Views), SUM(Seconds)
+                        FROM rollups
+                        WHERE Period = 'day' AND Dimension = ? AND Bucket >= ? AND Bucket < ?
+                        GROUP BY Value
+                        """,
+                        (period, bucket, dimension, bucket, bucket_end),
+                    )
+
+        self.conn.execute("DELETE FROM dirty_dates")
+        self.conn.commit()
+        return len(days)
+
+    def rebuild_rollups(self):
+        self.conn.execute("DELETE FROM rollups")
+        return self.refresh_rollups()
+
+    def top(self, dimension, period=None, since=None, until=None, metric="Seconds", limit=10):
+        """Top values of a dimension by Views or Seconds over [since, until]."""
+        if metric not in ("Views", "Seconds"):
+            raise ValueError(f"Unknown metric {metric!r}; expected Views or Seconds")
+        where, params = self._rollup_filter(dimension, period or "day", since, until)
+        query = (
+            f"SELECT Value, SUM(Views) AS Views, SUM(Seconds) AS Seconds FROM rollups WHERE {where} "
+            f"GROUP BY Value ORDER BY {metric} DESC LIMIT ?"
+        )
+        return [dict(row) for row in self.conn.execute(query, params + [limit])]
+
+    def series(self, dimension, period="month", values=None, since=None, until=None):
+        """Time series of Views and Seconds per bucket for the given dimension values (all when None)."""
+        if since:
+            # Include the bucket that contains `since`, e.g. all of January for --since 2025-01-15.
+            since = period_start(since, period)
+        where, params = self._rollup_filter(dimension, period, since, until)
+        if values:
+            where += f" AND Value IN ({','.join('?' * len(values))})"
+            params += list(values)
+        query = (
+            f"SELECT Bucket, Value, Views, Seconds FROM rollups WHERE {where} ORDER BY Bucket, Value"
+        )
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def _rollup_filter(self, dimension, period, since, until):
+        if dimension not in ROLLUP_DIMENSIONS:
+            raise ValueError(f"Unknown dimension {dimension!r}; expected one of {', '.join(ROLLUP_DIMENSIONS)}")
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Unknown period {period!r}; expected one of {', '.join(ROLLUP_PERIODS)}")
+        where = ["Period = ?", "Dimension = ?"]
+        params = [period, dimension]
+        if since:
+            where.append("Bucket >= ?")
+            params.append(since)
+        if until:
+            where.append("Bucket <= ?")
+            params.append(until)
+        return " AND ".join(where), params
+
+    # --- Step 6 / exports -----------------------------------------------------
+
+    def history(self, since=None, until=None):
+        """
+        Yields one row per video watched in [since, until] with the same
+        columns as 05_categorized.csv, including ViewCount and watch dates.
+        """
+        where = []
+        params = []
+        if since:
+            where.append("w.WatchDate >= ?")
+            params.append(since)
+        if until:
+            where.append("w.WatchDate <= ?")
+            params.append(until)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        query = f"""
+            SELECT v.*, SUM(w.Views) AS ViewCount, MIN(w.WatchDate) AS FirstWatched,
+                   MAX(w.WatchDate) AS LastWatched, GROUP_CONCAT(w.WatchDate, ';') AS WatchDates
+            FROM watches w JOIN videos v ON v.VideoID = w.VideoID
+            {clause}
+            GROUP BY v.VideoID
+            ORDER BY LastWatched DESC
+        """
+        for row in self.conn.execute(query, params):
+            item = dict(row)
+            item["Date"] = item["LastWatched"]
+            yield item
+
+
+def open_warehouse():
+    """Returns a Warehouse, or None when WAREHOUSE=off."""
+    if os.getenv("WAREHOUSE", "on").lower() in ("0", "off", "false", "no"):
+        return None
+    return Warehouse()